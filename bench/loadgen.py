@@ -0,0 +1,365 @@
+#!/usr/bin/python3
+"""
+A load generator for the game server.
+
+Opens a number of simulated telnet clients ("bots") against a server.  Each
+bot creates an account and a character through the account menu, plays the
+character, and then issues a random mix of commands until time runs out.  At
+the end we report the round trip latency of the bots' commands and, if we
+started the server ourselves, the timings of each phase of its loop from its
+metrics file.
+
+Usage:
+
+    $ python3 bench/loadgen.py --bots 500 --duration 60 --spawn
+
+With `--spawn` the server is started in a temporary directory holding a copy of
+the data directory, so the bots' accounts and characters don't end up in the
+real one.  Without it, the bots connect to a server that's already running at
+`--host` and `--port`.  Arguments for the spawned server go after a `--`:
+
+    $ python3 bench/loadgen.py --bots 500 --duration 60 --spawn -- --workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Telnet commands (IAC sequences) to strip out of what the server sends.  We
+# never agree to any options, so the server never compresses our output.
+TELNET_COMMAND = re.compile(rb'\xff\xfa.*?\xff\xf0|\xff[\xfb-\xfe].|\xff[\xf0-\xf9]', re.S)
+
+# Prompts, eg. "> " or "Hungry:Tired> ", at the start of a line of output.
+PROMPT = re.compile(r'^(?:[\w:]*> )+')
+
+# The commands bots choose from, by kind.  Movement picks a direction at
+# random.
+COMMANDS = {
+    'look': ['look'],
+    'move': ['north', 'south', 'east', 'west'],
+    'say': ['say Hello there!', 'say Has anyone seen any serviceberries?'],
+    'harvest': ['harvest plant', 'harvest tree'],
+    'craft': ['craft knapper', 'craft cordage']
+}
+
+DEFAULT_MIX = 'look:4,move:4,say:1,harvest:1,craft:1'
+
+
+def parseMix(mix):
+    """
+    Parse a command mix of the form `kind:weight,kind:weight`.
+
+    Returns
+    -------
+    (list, list):   The kinds of command and their weights.
+    """
+
+    kinds = []
+    weights = []
+    for entry in mix.split(','):
+        kind, weight = entry.split(':')
+        if kind not in COMMANDS:
+            raise ValueError("Unknown command kind '%s'.  Choose from: %s" % (kind, ', '.join(COMMANDS)))
+        kinds.append(kind)
+        weights.append(float(weight))
+    return kinds, weights
+
+
+def percentile(values, fraction):
+    'The value at `fraction` of the way through the sorted `values`.'
+
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Statistics:
+    'What the bots have measured.'
+
+    def __init__(self):
+        self.latencies = []
+        self.commands = 0
+        self.timeouts = 0
+        self.connected = 0
+        self.playing = 0
+        self.errors = 0
+        self.metrics = None
+
+
+class Bot:
+    """
+    A simulated player.  Bots only ever have one command outstanding: they
+    wait for the server's prompt before thinking about the next one.
+    """
+
+    def __init__(self, name, arguments, kinds, weights, statistics, others):
+        self.name = name
+        self.password = name + '-password'
+
+        # Matches a line of output about another bot, eg. that they've
+        # arrived or said something, rather than in reply to our command.
+        self.others = others
+
+        self.arguments = arguments
+        self.kinds = kinds
+        self.weights = weights
+        self.statistics = statistics
+
+        self.reader = None
+        self.writer = None
+        self.buffer = ""
+
+    async def receive(self, timeout):
+        data = await asyncio.wait_for(self.reader.read(4096), timeout)
+        if not data:
+            raise ConnectionError("The server closed the connection.")
+        self.buffer += TELNET_COMMAND.sub(b'', data).decode('utf-8', 'replace')
+
+    async def drain(self):
+        'Throw away anything the server has sent that we haven\'t read.'
+
+        while True:
+            try:
+                await self.receive(0.001)
+            except asyncio.TimeoutError:
+                break
+        self.buffer = ""
+
+    def hasReply(self):
+        'Whether the output so far has a line in reply to our command.'
+
+        for line in self.buffer.split('\n'):
+            line = PROMPT.sub('', line.strip('\r '))
+            if line and not self.others.match(line):
+                return True
+        return False
+
+    async def waitForReply(self, timeout=None):
+        """
+        Read until the server replies to the command we sent.  Prompts, and
+        what other bots are doing, don't count.
+        """
+
+        timeout = timeout or self.arguments.timeout
+        deadline = time.monotonic() + timeout
+        while not self.hasReply():
+            await self.receive(max(deadline - time.monotonic(), 0.001))
+
+    async def waitFor(self, ending, timeout=None):
+        """
+        Read until the output ends with `ending`, usually a prompt, and clear
+        the buffer.
+        """
+
+        timeout = timeout or self.arguments.timeout
+        deadline = time.monotonic() + timeout
+        while not self.buffer.endswith(ending):
+            await self.receive(max(deadline - time.monotonic(), 0.001))
+        self.buffer = ""
+
+    async def send(self, line):
+        self.writer.write((line + "\n").encode())
+        await self.writer.drain()
+
+    async def login(self):
+        'Create an account and a character, then start playing.'
+
+        self.reader, self.writer = await asyncio.open_connection(self.arguments.host, self.arguments.port)
+        self.statistics.connected += 1
+
+        steps = [
+            ("Account Name: ", "new"),
+            ("Enter New Account Name: ", self.name),
+            ("Enter New Password: ", self.password),
+            ("Confirm Password: ", self.password),
+            ("> ", "create " + self.name),
+            ("> ", "play " + self.name)
+        ]
+        for prompt, line in steps:
+            await self.waitFor(prompt)
+            await self.send(line)
+        await self.waitFor("> ")
+
+        self.statistics.playing += 1
+
+    async def play(self, deadline):
+        while time.monotonic() < deadline:
+            kind = random.choices(self.kinds, self.weights)[0]
+            command = random.choice(COMMANDS[kind])
+
+            # Anything that arrived while we were thinking, like other bots
+            # talking and the prompts after it, isn't a reply to this command.
+            await self.drain()
+
+            start = time.monotonic()
+            await self.send(command)
+            self.statistics.commands += 1
+
+            # The round trip is up to the first output in reply.  Actions
+            # like harvesting keep going for a while after that, so then
+            # wait for the prompt to come back.
+            try:
+                await self.waitForReply()
+                self.statistics.latencies.append(time.monotonic() - start)
+                await self.waitFor("> ")
+            except asyncio.TimeoutError:
+                self.statistics.timeouts += 1
+                self.buffer = ""
+
+            await asyncio.sleep(random.uniform(0, 2 * self.arguments.think_time))
+
+    async def run(self, delay, deadline):
+        await asyncio.sleep(delay)
+        try:
+            await self.login()
+            await self.play(deadline)
+        except (ConnectionError, OSError, asyncio.TimeoutError) as error:
+            self.statistics.errors += 1
+            if self.arguments.verbose:
+                print("%s: %r" % (self.name, error), file=sys.stderr)
+        finally:
+            if self.writer:
+                self.writer.close()
+
+
+def startServer(arguments, directory):
+    """
+    Start a server in `directory`, with a copy of the data directory, and wait
+    for it to start listening.
+    """
+
+    shutil.copytree(arguments.data, os.path.join(directory, 'data'))
+
+    server = subprocess.Popen([sys.executable, '-u', os.path.join(ROOT, 'main.py'), '--port', str(arguments.port),
+                               '--metrics-file', 'metrics.json', '--metrics-interval', '1']
+                              + arguments.server_arguments,
+                              cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in server.stdout:
+        if line.startswith('Starting up the server'):
+            return server
+
+    raise RuntimeError("The server exited before it started listening.")
+
+
+def drainServerOutput(server):
+    'Keep reading the server\'s output, so that it never blocks on a full pipe.'
+
+    for line in server.stdout:
+        pass
+
+
+def readMetrics(directory):
+    'Read the spawned server\'s last metrics file, if it wrote one.'
+
+    try:
+        with open(os.path.join(directory, 'metrics.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+async def generateLoad(arguments, statistics):
+    kinds, weights = parseMix(arguments.mix)
+
+    tag = ''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for i in range(4))
+    others = re.compile(r'bot%s\d+\b' % tag, re.I)
+    bots = [Bot('bot%s%d' % (tag, index), arguments, kinds, weights, statistics, others)
+            for index in range(arguments.bots)]
+
+    # Spread the bots' arrival over the ramp up, and then keep them all
+    # playing until the end of the run.
+    deadline = time.monotonic() + arguments.ramp + arguments.duration
+    await asyncio.gather(*[bot.run(index * arguments.ramp / arguments.bots, deadline)
+                           for index, bot in enumerate(bots)])
+
+
+def report(statistics, elapsed):
+    latencies = sorted(statistics.latencies)
+    print("Bots: {0:,d} connected, {1:,d} playing, {2:,d} errors".format(
+        statistics.connected, statistics.playing, statistics.errors))
+    print("Commands: {0:,d} sent in {1:.1f} s, {2:,d} timed out".format(statistics.commands, elapsed, statistics.timeouts))
+    print("Round trip (ms): p50 {0:.1f} -- p95 {1:.1f} -- p99 {2:.1f} -- max {3:.1f}".format(
+        *[1000 * value for value in (percentile(latencies, 0.5), percentile(latencies, 0.95),
+                                     percentile(latencies, 0.99), latencies[-1] if latencies else 0)]))
+
+    if statistics.metrics:
+        print("Server loop phases (ms):")
+        phases = list(statistics.metrics['phases'].items()) + [('loop', statistics.metrics['loop'])]
+        for name, phase in phases:
+            print("\t{0:<14} p50 {1:8.3f} -- p95 {2:8.3f} -- p99 {3:8.3f} -- max {4:8.3f}".format(
+                name, phase['p50'] / 1e6, phase['p95'] / 1e6, phase['p99'] / 1e6, phase['max'] / 1e6))
+        print("Server counters: " + ", ".join("%s %s" % item for item in statistics.metrics['counters'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='loadgen', description='Generate load against the Muddy Reality server.')
+
+    parser.add_argument('-H', '--host', default='127.0.0.1', help="The host the server is on.")
+    parser.add_argument('-p', '--port', type=int, default=3000, help="The port the server is on.")
+
+    parser.add_argument('--bots', type=int, default=50, help="How many bots to connect.")
+    parser.add_argument('--duration', type=float, default=60, help="How many seconds to play for, once connected.")
+    parser.add_argument('--ramp', type=float, default=10, help="How many seconds to spread the bots' arrival over.")
+    parser.add_argument('--think-time', dest='think_time', type=float, default=1.0,
+                        help="The average number of seconds a bot waits between commands.")
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help="How many seconds a bot will wait for a response.")
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help="Relative weights of each kind of command, as `kind:weight,...`.  Kinds are: "
+                        + ', '.join(COMMANDS))
+
+    parser.add_argument('--spawn', action='store_true',
+                        help="Start a server on a copy of the data directory, and report its loop timings.")
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data'),
+                        help="The data directory to copy for the spawned server.")
+    parser.add_argument('server_arguments', nargs=argparse.REMAINDER,
+                        help="Extra arguments for the spawned server, after a `--`, eg. `-- --workers 2`.")
+
+    parser.add_argument('-v', '--verbose', action='store_true', help="Report each bot's errors.")
+
+    arguments = parser.parse_args()
+    if arguments.server_arguments[:1] == ['--']:
+        arguments.server_arguments = arguments.server_arguments[1:]
+
+    statistics = Statistics()
+
+    server = None
+    directory = None
+    if arguments.spawn:
+        directory = tempfile.mkdtemp(prefix='loadgen-')
+        server = startServer(arguments, directory)
+        threading.Thread(target=drainServerOutput, args=(server,), daemon=True).start()
+
+    start = time.monotonic()
+    try:
+        asyncio.run(generateLoad(arguments, statistics))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.monotonic() - start
+        if server:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            statistics.metrics = readMetrics(directory)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report(statistics, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""
+Measure how much memory the game's rooms and items take.
+
+Generates a square world of rooms in a temporary directory, each with exits to
+its neighbours and a few items drawn from the real item prototypes in
+`data/items`, then loads it into a Store and reports, with tracemalloc:
+
+* the bytes held per room, not counting its items
+* the bytes held per item instance
+
+Usage:
+
+    $ python3 bench/memory.py --rooms 10000 --items 5
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game.store.backends.files import FileBackend  # noqa: E402
+from game.store.store import Store  # noqa: E402
+
+
+def generate(backend, width, items):
+    'Fill `backend` with a `width` by `width` world, with `items` items in each room.'
+
+    grid = [[row * width + column + 1 for column in range(width)] for row in range(width)]
+    backend.saveWorld({'name': 'memory', 'width': width, 'roomWidth': 100, 'rooms': grid})
+
+    prototypes = sorted(data['name'] for data in backend.load('items'))
+
+    records = []
+    for row in range(width):
+        for column in range(width):
+            id = grid[row][column]
+
+            exits = {}
+            for direction, x, y in (('north', 0, -1), ('south', 0, 1), ('east', 1, 0), ('west', -1, 0)):
+                if 0 <= row + y < width and 0 <= column + x < width:
+                    exits[direction] = {'is_door': False, 'is_open': True, 'direction': direction,
+                                        'room_to': grid[row + y][column + x]}
+
+            records.append(('rooms', id, {
+                'id': id, 'title': 'Room %d' % id, 'description': 'A room in the forest.  ' * 8,
+                'color': [34, 139, 34], 'waterType': 'none', 'water': 0, 'waterVelocity': 0, 'exits': exits,
+                'items': [prototypes[(id + index) % len(prototypes)] for index in range(items)], 'occupants': []
+            }))
+    backend.saveMany(records)
+    return [id for row in grid for id in row]
+
+
+def measure(callback):
+    'Call `callback`, and return what it returned and how many bytes it left allocated.'
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = callback()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='memory', description="Measure the memory used by rooms and items.")
+
+    parser.add_argument('--rooms', type=int, default=10000, help="Roughly how many rooms to generate.")
+    parser.add_argument('--items', type=int, default=5, help="How many items to put in each room.")
+
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='memory-')
+    try:
+        data = os.path.join(directory, 'data')
+        for kind in ('items', 'npcs'):
+            shutil.copytree(os.path.join(ROOT, 'data', kind), os.path.join(data, kind))
+
+        width = max(int(arguments.rooms ** 0.5), 1)
+        ids = generate(FileBackend(data, 'memory'), width, arguments.items)
+
+        # Load the prototypes, but leave the rooms until we're measuring.
+        store = Store('memory', '', FileBackend(data, 'memory'), lazy=True)
+        store.load()
+
+        rooms, total = measure(lambda: [store.rooms.getById(id) for id in ids])
+        instances = [item.getId() for room in rooms for item in room.items]
+        items, item_bytes = measure(lambda: [store.items.instance(id) for id in instances])
+
+        per_item = item_bytes / max(len(items), 1)
+        per_room = (total - per_item * len(instances)) / max(len(rooms), 1)
+
+        print("{0:,d} rooms with {1:,d} items took {2:,.1f} MB.".format(len(rooms), len(instances), total / 2**20))
+        print("{0:>10,.0f} bytes per room, not counting its items".format(per_room))
+        print("{0:>10,.0f} bytes per item instance".format(per_item))
+
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
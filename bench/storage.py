@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+"""
+Compare the storage backends.
+
+Builds a synthetic game's worth of data (a world, rooms, items, NPCs,
+characters and accounts) in a temporary directory, imports it into a SQLite
+database, and then times each backend:
+
+* loading every model, as `Store.load()` does at startup
+* saving a batch of characters, as the heartbeat does every game hour
+* saving characters one at a time, as quitting and logging out do
+
+Usage:
+
+    $ python3 bench/storage.py --rooms 10000 --characters 2000
+
+Pass `--data` to time a copy of a real data directory instead.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game.store.backends.backend import StorageBackend  # noqa: E402
+from game.store.backends.backend import copyStorage  # noqa: E402
+from game.store.backends.files import FileBackend  # noqa: E402
+from game.store.backends.sqlite import SQLiteBackend  # noqa: E402
+from game.store.models.character import PlayerCharacter  # noqa: E402
+
+
+def generate(backend, arguments):
+    'Fill `backend` with synthetic data.'
+
+    width = max(int(arguments.rooms ** 0.5), 1)
+    backend.saveWorld({'name': arguments.world, 'width': width, 'roomWidth': 1,
+                       'rooms': [[row * width + column + 1 for column in range(width)] for row in range(width)]})
+
+    backend.saveMany([('rooms', id, {
+        'id': id, 'title': 'Room %d' % id, 'description': 'A room in the forest.  ' * 8, 'color': [34, 139, 34],
+        'waterType': 'none', 'water': 0, 'waterVelocity': 0,
+        'exits': {'east': {'is_door': False, 'is_open': True, 'direction': 'east', 'room_to': id + 1}},
+        'items': ['rock', 'stick'], 'occupants': []
+    }) for id in range(1, arguments.rooms + 1)])
+
+    backend.saveMany([('items', 'item%d' % index, {'name': 'item%d' % index, 'description': 'an item'})
+                      for index in range(arguments.items)])
+    backend.saveMany([('npcs', 'npc%d' % index, {'name': 'npc%d' % index, 'description': 'an animal'})
+                      for index in range(arguments.items)])
+
+    backend.saveMany([('characters', data['name'], data) for data in characters(arguments.characters)])
+    backend.saveMany([('accounts', 'account%d' % index, {
+        'name': 'account%d' % index, 'password_hash': '$2b$12$' + 'x' * 53, 'characters': ['character%d' % index]
+    }) for index in range(arguments.characters)])
+
+
+def characters(count):
+    'Json for `count` characters, as the game would save them.'
+
+    result = []
+    for index in range(count):
+        character = PlayerCharacter()
+        character.setId('character%d' % index)
+        character.room = None
+        result.append(character.toJson())
+    return result
+
+
+def timeLoad(backend):
+    start = time.perf_counter()
+    backend.loadWorld()
+    for kind in StorageBackend.KINDS:
+        for data in backend.load(kind):
+            pass
+    return time.perf_counter() - start
+
+
+def timeBatchSave(backend, records):
+    start = time.perf_counter()
+    backend.saveMany(records)
+    return time.perf_counter() - start
+
+
+def timeSingleSaves(backend, records):
+    start = time.perf_counter()
+    for kind, id, data in records:
+        backend.save(kind, id, data)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='storage', description='Compare the storage backends.')
+
+    parser.add_argument('--rooms', type=int, default=10000, help="How many rooms to generate.")
+    parser.add_argument('--items', type=int, default=200, help="How many item and NPC prototypes to generate.")
+    parser.add_argument('--characters', type=int, default=1000,
+                        help="How many characters and accounts to generate, and save in each batch.")
+    parser.add_argument('--singles', type=int, default=200, help="How many characters to save one at a time.")
+    parser.add_argument('--data', default=None, help="Time a copy of this data directory instead.")
+    parser.add_argument('--world', default='base', help="The world to load from --data.")
+    parser.add_argument('--fsync', action='store_true', help="Have the file backend fsync each file.")
+
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='storage-')
+    try:
+        data = os.path.join(directory, 'data')
+        files = FileBackend(data, arguments.world, fsync=arguments.fsync)
+        if arguments.data:
+            shutil.copytree(arguments.data, data)
+        else:
+            generate(files, arguments)
+
+        database = SQLiteBackend(os.path.join(directory, 'game.sqlite3'), arguments.world)
+        start = time.perf_counter()
+        counts = copyStorage(files, database)
+        elapsed = time.perf_counter() - start
+        print("Imported %s in %.2f s." % (", ".join("%d %s" % (count, kind) for kind, count in counts.items()), elapsed))
+
+        batch = [('characters', data['name'], data) for data in characters(arguments.characters)]
+        singles = batch[:arguments.singles]
+
+        print("{0:<10}{1:>12}{2:>20}{3:>20}".format('backend', 'load (s)', 'batch save (ms)', 'single save (ms)'))
+        for name, backend in (('file', files), ('sqlite', database)):
+            load = timeLoad(backend)
+            batchSave = timeBatchSave(backend, batch)
+            singleSave = timeSingleSaves(backend, singles)
+            print("{0:<10}{1:>12.3f}{2:>20.1f}{3:>20.3f}".format(
+                name, load, 1000 * batchSave, 1000 * singleSave / max(len(singles), 1)))
+        print("Batches are %d characters.  Single saves are the mean of %d." % (len(batch), len(singles)))
+
+        database.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""
+Convert the game's data between storage backends.
+
+Import the json data directory into a SQLite database for `main.py --storage
+sqlite`:
+
+    $ python3 convert.py import --data data/ --database data/game.sqlite3
+
+Export a database back out to the json layout, which the world generator and
+other tools read and write:
+
+    $ python3 convert.py export --database data/game.sqlite3 --data exported/
+"""
+
+import argparse
+import os
+import sys
+
+from game.store.backends.backend import copyStorage
+from game.store.backends.files import FileBackend
+from game.store.backends.sqlite import SQLiteBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='convert', description="Convert the game's data between storage backends.")
+
+    parser.add_argument('direction', choices=['import', 'export'],
+                        help="`import` copies the data directory into the database, `export` copies the database "
+                        "out to the data directory.")
+    parser.add_argument('--data', default='data/', help="The data directory.")
+    parser.add_argument('--database', default=None,
+                        help="The SQLite database.  Defaults to game.sqlite3 in the data directory.")
+    parser.add_argument('--world', default='base', help="The name of the world to convert.")
+
+    arguments = parser.parse_args()
+
+    files = FileBackend(arguments.data, arguments.world)
+    database = SQLiteBackend(arguments.database or os.path.join(arguments.data, 'game.sqlite3'), arguments.world)
+
+    try:
+        if arguments.direction == 'import':
+            counts = copyStorage(files, database)
+        else:
+            counts = copyStorage(database, files)
+    except FileNotFoundError as error:
+        print("Error! %s" % error, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        database.close()
+
+    copied = ", ".join("%d %s" % (count, kind) for kind, count in counts.items())
+    print("Copied the world %s and %s." % (arguments.world, copied))
+
+
+if __name__ == '__main__':
+    main()
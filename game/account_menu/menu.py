@@ -60,11 +60,7 @@ quit                - Leave the game.
                 player.character.player = player
                 player.status = player.STATUS_GAME
 
-                # If they aren't in the game world yet, send em to room 1.
-                if not player.character.room:
-                    self.library.movement.enter(player.character, self.store.rooms.getById(1))
-                else:
-                    self.library.movement.enter(player.character, player.character.room)
+                self.library.movement.enterGame(player.character)
 
                 player.write("Welcome back, %s!" % player.character.name.title())
                 player.write(self.library.room.describe(player.character.room, player), wrap=False)
@@ -86,6 +82,7 @@ quit                - Leave the game.
             player.character = self.store.characters.create(name)
             self.store.saveCharacter(player.character)
             player.account.addCharacter(player.character)
+            self.store.saveAccount(player.account)
             player.character = None
 
             return self.NAME 
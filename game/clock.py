@@ -0,0 +1,98 @@
+import time
+
+
+class TickClock:
+    """
+    Keeps the game loop's ticks on a fixed schedule, using the monotonic
+    clock.
+
+    Each tick is due a fixed length after the one before it was due, rather
+    than after it finished, so time spent running ticks doesn't make the
+    schedule drift.  When the loop falls behind, the ticks it missed are still
+    due, and are run back to back to catch up so that game time keeps pace
+    with real time.  If it falls so far behind that more than `max_catch_up`
+    ticks are due at once, the rest are dropped rather than letting the game
+    stall while it catches up.
+    """
+
+    def __init__(self, ticks_a_second, clock=time.monotonic, max_catch_up=5):
+        """
+        Initialize the clock, with the first tick due immediately.
+
+        Parameters
+        ----------
+        ticks_a_second: float
+            How many ticks to run a second.
+        clock:  callable (Optional)
+            Returns the current time in seconds.  Defaults to
+            `time.monotonic()`.
+        max_catch_up:   int (Optional)
+            The most ticks to run back to back when catching up.
+        """
+
+        self.tick_length = 1.0 / ticks_a_second
+        self.clock = clock
+        self.max_catch_up = max(int(max_catch_up), 1)
+
+        self.next_tick = self.clock()
+
+        # How many times we've run more than one tick to catch up, how many
+        # extra ticks that took, and how many ticks we've had to drop.
+        self.overruns = 0
+        self.caught_up = 0
+        self.dropped = 0
+
+    def lag(self):
+        """
+        How far behind schedule we are.
+
+        Returns
+        -------
+        float:  Seconds since the next tick was due, or 0 if it isn't yet.
+        """
+
+        return max(self.clock() - self.next_tick, 0.0)
+
+    def remaining(self):
+        """
+        How long until the next tick is due.
+
+        Returns
+        -------
+        float:  Seconds until the next tick, or 0 if it's due.
+        """
+
+        return max(self.next_tick - self.clock(), 0.0)
+
+    def isDue(self):
+        return self.clock() >= self.next_tick
+
+    def dueTicks(self):
+        """
+        Count the ticks that are due and schedule the tick after them.  Ticks
+        past `max_catch_up` are dropped.
+
+        Returns
+        -------
+        int:    How many ticks to run now, 0 if none are due.
+        """
+
+        lag = self.clock() - self.next_tick
+        if lag < 0:
+            return 0
+
+        due = int(lag / self.tick_length) + 1
+        if due > 1:
+            self.overruns += 1
+        if due > self.max_catch_up:
+            self.dropped += due - self.max_catch_up
+            due = self.max_catch_up
+            # Start again from the most recent tick, so the ticks we're
+            # dropping aren't counted as lag next time.
+            self.next_tick += (int(lag / self.tick_length) - due + 1) * self.tick_length
+        self.caught_up += due - 1
+
+        self.next_tick += due * self.tick_length
+        return due
+
+# End TickClock
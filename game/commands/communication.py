@@ -4,6 +4,8 @@ from game.interpreters.command.command import Command
 class Say(Command):
     'Say something to the room.'
 
+    RATE_CLASS = 'communication'
+
     def describe(self):
         "See Command.describe()"
 
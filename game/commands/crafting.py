@@ -6,6 +6,8 @@ from game.interpreters.command.command import Command
 class Craft(Command):
     'Create a new item from materials in inventory or room.'
 
+    RATE_CLASS = 'crafting'
+
     def describe(self):
         return "craft - create new items from a set of materials"
 
@@ -103,6 +105,7 @@ Attempt to craft a material or tool with materials or tools.  If the [target] ca
 
         # Add the craft target to the inventory.
         player.character.inventory.append(crafted)
+        player.character.markDirty()
 
         # Success message.
         player.write("You craft %s." % crafted.name)
@@ -112,6 +115,8 @@ Attempt to craft a material or tool with materials or tools.  If the [target] ca
 class Harvest(Command):
     'Harvest materials.'
 
+    RATE_CLASS = 'crafting'
+
     def describe(self):
         return "harvest - harvest materials"
 
@@ -174,6 +179,10 @@ Harvest materials from an object in your environment.  The object can be either
         else:
             harvest.harvested = True
 
+        player.character.markDirty()
+        if not in_inventory:
+            self.store.markRoomDirty(player.character.room)
+
         player.write("\nYou %s %s from %s." % (harvest.action, results, item.description))
         self.library.room.writeToRoom(player.character, 
                                       "%s %s from %s." %
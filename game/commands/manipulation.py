@@ -86,6 +86,8 @@ Get an item described by [item] from the current room and add it to your invento
             if item.can_pick_up:
                 player.character.room.items.remove(item)
                 player.character.inventory.append(item)
+                player.character.markDirty()
+                self.store.markRoomDirty(player.character.room)
                 player.write("You pick up " + item.description + ".")
                 self.library.room.writeToRoom(player.character, player.character.name + ' picks up ' + item.description + '.')
             else:
@@ -120,6 +122,8 @@ Drop an item described by [item] from your inventory and leave it in the current
         if item: 
             player.character.inventory.remove(item)
             player.character.room.items.append(item)
+            player.character.markDirty()
+            self.store.markRoomDirty(player.character.room)
             player.write("You drop " + item.description + ".")
             self.library.room.writeToRoom(player.character, player.character.name + ' drops ' + item.description + '.')
         else:
@@ -153,6 +157,7 @@ Wield an item described by [item] as a weapon.
             if "MeleeWeapon" in item.traits:
                 player.character.inventory.remove(item)
                 player.character.equipment['wield'] = item
+                player.character.markDirty()
                 player.write("You wield " + item.name + ".")
                 self.library.room.writeToRoom(player.character, player.character.name + ' wields ' + item.description + '.')
             else:
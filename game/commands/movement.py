@@ -4,6 +4,8 @@ from game.interpreters.command.command import Command
 class North(Command):
     'Go north'
 
+    RATE_CLASS = 'movement'
+
     def describe(self):
         return "north - travel to the north"
 
@@ -21,6 +23,8 @@ Go to the room to the north, if possible.
 class East(Command):
     'Go east'
 
+    RATE_CLASS = 'movement'
+
     def describe(self):
         return "east - travel to the east"
 
@@ -38,6 +42,8 @@ Go to the room to the east, if possible.
 class South(Command):
     'Go south'
 
+    RATE_CLASS = 'movement'
+
     def describe(self):
         return "south - travel to the south"
 
@@ -55,6 +61,8 @@ Go to the room to the south, if possible.
 class West(Command):
     'Go west'
 
+    RATE_CLASS = 'movement'
+
     def describe(self):
         return "west - travel to the west"
 
@@ -72,6 +80,8 @@ Go to the room to the west, if possible.
 class Up(Command):
     'Go up'
 
+    RATE_CLASS = 'movement'
+
     def describe(self):
         return "up - travel up"
 
@@ -89,6 +99,8 @@ Go to the room above, if possible.
 class Down(Command):
     'Go down'
 
+    RATE_CLASS = 'movement'
+
     def describe(self):
         return "down - travel down"
 
@@ -32,6 +32,7 @@ Attempt to eat an item described by [item] as food.
 
             player.character.inventory.remove(item)
             player.character.reserves.calories += item.traits["Food"].calories
+            player.character.markDirty()
             player.write("You eat " + item.description + ".")
             self.library.room.writeToRoom(player.character, player.character.name + ' eats ' + item.description + '.')
         else:
@@ -58,6 +59,7 @@ class Drink(Command):
                 return 
 
             player.character.reserves.thirst += 500
+            player.character.markDirty()
 
             player.write("You drink from the fresh water.")
             self.library.room.writeToRoom(player.character, player.character.name + " drinks from the fresh water.")
@@ -90,6 +92,7 @@ Your character sits down to rest.
             return
 
         player.character.position = Character.POSITION_RESTING
+        player.character.markDirty()
         player.write('You sit down to rest.')
         self.library.room.writeToRoom(player.character, "%s sits down to rest." % player.character.name.title())
 
@@ -118,6 +121,7 @@ Will put your character to sleep.  You will awaken once refreshed.
 
         if player.character.reserves.sleep / player.character.reserves.max_sleep <= 0.25:
             player.character.position = Character.POSITION_SLEEPING
+            player.character.markDirty()
             player.write('You go to sleep.')
         else:
             player.write("You don't feel tired enough to sleep right now.")
@@ -145,5 +149,6 @@ You will attempt to wake up before fully refreshed.
             player.write("You are too tired to wake.")
         else:
             player.character.position = Character.POSITION_STANDING
+            player.character.markDirty()
             player.write("You wake up.")
 
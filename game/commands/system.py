@@ -14,12 +14,10 @@ Your character will leave the game and you will return to the account menu where
         """
 
     def execute(self, player, arguments):
-        self.store.saveCharacter(player.character)
-
         player.write('You leave the game.')
-        self.library.room.writeToRoom(player.character, player.character.name + ' leaves the game.')
+        self.library.movement.leaveGame(player.character)
+        self.store.saveCharacter(player.character)
 
-        player.character.player = None
         player.character = None
 
         player.status = player.STATUS_ACCOUNT
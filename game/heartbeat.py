@@ -1,60 +1,162 @@
+import itertools
+
+from game.scheduler import Scheduler
+
+
 class Heartbeat:
 
-    def __init__(self, store, library):
+    def __init__(self, store, library, scheduler=None):
+        """
+        Initialize the heartbeat and register the game's periodic jobs with
+        the scheduler.
+
+        Parameters
+        ----------
+        store:  Store
+            The game store.
+        library:    Library
+            The game library.
+        scheduler:  Scheduler (Optional)
+            The scheduler to register jobs with.  Other systems can register
+            their own events with it, keyed on `world.time.loop`.  A new one is
+            created if not given.
+        """
+
         self.store = store
         self.library = library
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+
+        time = self.store.world.time
+
+        # Rather than doing each job for every player on the same loop, which
+        # makes for a spike every game minute and a bigger one every game
+        # hour, the per player jobs are spread across the loops, as is saving
+        # the rooms.  See `beat()`.
+        self.scheduler.every(1, self.beat, time.loop)
+
+        # Page rooms in ahead of the players, and out behind them, once per
+        # game minute.
+        if self.store.rooms.chunk_size:
+            self.scheduler.every(time.loops_a_minute, self.pageRooms, time.loop)
 
     def heartbeat(self):
         """
-        A method called on every loop that can be used for actions that need to
-        take place every so many loops.  Used to control autonomous timing in
-        the game world.
-
-        Parameters
-        ----------
-        loop_counter:   integer
-            An integer loop counter recording which iteration of the game loop
-            this is.  Reset to 0 when it hits max_integer.
+        Called on every loop to run whatever the scheduler has due on the
+        current loop.  Used to control autonomous timing in the game world.
 
         Returns
         -------
         void
         """
 
+        self.scheduler.run(self.store.world.time.loop)
+
+    def beat(self):
+        """
+        Do this loop's share of the per minute and per hour jobs.
+
+        Every player's work is done on the loops that match their phase, so
+        each loop does the jobs for the shard of players whose turn it is, and
+        every player still gets them done once per minute or hour.  Jobs with
+        no players this loop are skipped.  The rooms that have changed are
+        saved a few at a time, so that they've all been saved by the end of
+        each game hour.
+
+        Jobs run in the order they're listed here.
+        """
+
         time = self.store.world.time
 
+        hourly = self.shard(time.loops_an_hour)
+        minutely = self.shard(time.loops_a_minute)
+
         # Save characters once per game hour, real life minute.
-        if time.loop % time.loops_an_hour == 0:
-            self.saveCharacters()
+        if hourly:
+            self.saveCharacters(hourly)
+
+        # Save any rooms that have changed once per game hour.
+        if self.store.dirty_rooms:
+            remaining = -time.loop % time.loops_an_hour + 1
+            self.saveRooms(-(-len(self.store.dirty_rooms) // remaining))
 
         # Advance any actions or action timers.
-        if time.loop % time.loops_a_minute == 0:
-            self.advanceActions()
+        if minutely:
+            self.advanceActions(minutely)
 
         # Do reserves calculations once per game minute.
-        if time.loop % time.loops_a_minute == 0:
-            self.calculateReserves()
+        if minutely:
+            self.calculateReserves(minutely)
 
         # Do sleep calculations once per game hour.
-        if time.loop % time.loops_an_hour == 0:
-            self.calculateSleep()
+        if hourly:
+            self.calculateSleep(hourly)
 
-    def saveCharacters(self):
+    def shard(self, interval):
         """
-        Save all the characters currently playing the game.
+        Find the players whose turn it is on the current loop, for a job that
+        each player needs done once every `interval` loops.
+
+        Parameters
+        ----------
+        interval:   int
+            How many loops the job is spread across.
+
+        Returns
+        -------
+        list:   The players whose `phase` falls on this loop.
         """
 
-        for player in self.store.players:
-            if not player.character:
+        return self.store.players.shard(interval, self.store.world.time.loop % interval)
+
+    def saveCharacters(self, players=None):
+        """
+        Save the characters currently playing the game that have changed
+        since they were last saved.
+
+        Parameters
+        ----------
+        players:    list (Optional)
+            The players to do it for.  Defaults to everyone in the game.
+        """
+
+        for player in self.store.players if players is None else players:
+            if not player.character or not player.character.isDirty():
                 continue
             self.store.saveCharacter(player.character)
 
-    def advanceActions(self):
+    def saveRooms(self, count=None):
+        """
+        Save the rooms that have changed since they were last saved.
+
+        Parameters
+        ----------
+        count:  int (Optional)
+            The most rooms to save.  Defaults to all of them.
+        """
+
+        for room in list(itertools.islice(self.store.dirty_rooms, count)):
+            self.store.saveRoom(room)
+
+    def pageRooms(self):
+        """
+        Load the chunks of rooms around the players and evict the ones they've
+        left behind.
+        """
+
+        self.store.rooms.page([player.character.room for player in self.store.players
+                               if player.character and player.character.room])
+
+    def advanceActions(self, players=None):
         """
         Advance any player actions currently in progress.
+
+        Parameters
+        ----------
+        players:    list (Optional)
+            The players to do it for.  Defaults to everyone in the game.
         """
 
-        for player in self.store.players:
+        for player in self.store.players if players is None else players:
             if not player.character:
                 continue
             if not player.character.action:
@@ -72,26 +174,20 @@ class Heartbeat:
                 player.character.action_time = 0
                 player.prompt.is_off = False
 
-    def calculateReserves(self):
+    def calculateReserves(self, players=None):
         """
         Calculate any changes in character reserves (aside from sleep).
-        """
 
-        for player in self.store.players:
-            character = player.character
-            if not character:
-                continue
-
-            self.library.character.adjustCalories(character, -2)
-            self.library.character.adjustThirst(character, -2)
+        Parameters
+        ----------
+        players:    list (Optional)
+            The players to do it for.  Defaults to everyone in the game.
+        """
 
-            if character.position == character.POSITION_STANDING:
-                self.library.character.adjustWind(character, 3)
-            elif character.position == character.POSITION_RESTING:
-                self.library.character.adjustWind(character, 5)
-                self.library.character.adjustEnergy(character, 100)
+        players = self.store.players if players is None else players
+        self.library.character.drainReserves([player.character for player in players if player.character])
 
-    def calculateSleep(self):
+    def calculateSleep(self, players=None):
         """
         Do sleep calculations. 
         
@@ -108,9 +204,14 @@ class Heartbeat:
         asleep that increases steadily up to 248 hours spent awake past the 16
         hours rested (16+248 = 264), the record number of hours any human has
         remained awake.
+
+        Parameters
+        ----------
+        players:    list (Optional)
+            The players to do it for.  Defaults to everyone in the game.
         """
 
-        for player in self.store.players:
+        for player in self.store.players if players is None else players:
             if not player.character:
                 continue
 
@@ -3,6 +3,9 @@ class Command:
     A base class for commands used by the CommandInterpreter. 
     """
 
+    # The class of command this is, for rate limiting.  See `RateLimiter`.
+    RATE_CLASS = 'general'
+
     def __init__(self, library, store):
         """
         Initialize the command.
@@ -1,3 +1,6 @@
+from game.interpreters.command.limiter import RateLimiter
+
+
 class CommandInterpreter:
     """
     A command interpreter that parses player input using a `command arguments`
@@ -5,9 +8,13 @@ class CommandInterpreter:
     object that handles parsing the `arguments` and performing any resulting
     actions.  The interpreter takes a dictionary of `Command` objects keyed by
     their associated `command` strings and uses that to interpret player input.
+
+    Each player's commands are rate limited by class, see `RateLimiter`, so
+    that a player flooding the game with commands can't drive up the cost of
+    every loop.
     """
 
-    def __init__(self, commands, library, store):
+    def __init__(self, commands, library, store, limits=None):
         """
         Initialize the interpreter.
 
@@ -19,12 +26,19 @@ class CommandInterpreter:
             The game library.
         store:  Store
             The game store.
+        limits: dict[string] => (float, int) (Optional)
+            Rate limits for each class of command.  Defaults to
+            `RateLimiter.DEFAULT_LIMITS`.
         """
 
         self.store = store 
         self.library = library
         self.commands = commands
 
+        self.limits = limits
+        # How many commands have been refused for going over the rate limits.
+        self.throttled = 0
+
     def findCommand(self, input):
         """
         Find the command matching `input`.
@@ -78,6 +92,14 @@ class CommandInterpreter:
 
         command_object = self.findCommand(command)
         if command_object:
+            if player.limiter is None:
+                player.limiter = RateLimiter(self.limits)
+
+            if not player.limiter.allow(command_object.RATE_CLASS):
+                self.throttled += 1
+                player.write("Slow down!  You're trying to do too much at once.")
+                return
+
             command_object.execute(player, arguments)
         else:
             player.write("I don't think you can do that...")
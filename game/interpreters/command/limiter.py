@@ -0,0 +1,110 @@
+import time
+
+
+class TokenBucket:
+    """
+    A token bucket.  Holds up to `burst` tokens and refills at `rate` tokens a
+    second.  Each action takes a token, and an action that finds the bucket
+    empty is refused.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Initialize the bucket, full.
+
+        Parameters
+        ----------
+        rate:   float
+            How many tokens are added to the bucket a second.
+        burst:  int
+            The most tokens the bucket can hold.
+        """
+
+        self.rate = rate
+        self.burst = burst
+
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """
+        Take a token from the bucket, if one is available.
+
+        Parameters
+        ----------
+        now:    float (Optional)
+            The current `time.monotonic()` time.  Looked up if not given.
+
+        Returns
+        -------
+        boolean:    True if a token was taken, False if the bucket was empty.
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class RateLimiter:
+    """
+    Limits how quickly a single player can issue commands, with a separate
+    TokenBucket for each class of command.  Commands declare their class with
+    `Command.RATE_CLASS`.
+    """
+
+    # The default limits for each class of command, as (rate, burst) pairs:
+    # `burst` commands may be issued at once, after which they're allowed at
+    # `rate` a second.
+    DEFAULT_LIMITS = {
+        'movement': (4, 10),
+        'communication': (2, 5),
+        'crafting': (1, 3),
+        'general': (5, 10)
+    }
+
+    def __init__(self, limits=None):
+        """
+        Initialize the limiter.
+
+        Parameters
+        ----------
+        limits: dict[string] => (float, int) (Optional)
+            (rate, burst) pairs keyed by command class.  Defaults to
+            `DEFAULT_LIMITS`.  Classes without a limit aren't limited.
+        """
+
+        self.limits = limits if limits is not None else self.DEFAULT_LIMITS
+        self.buckets = {}
+
+    def allow(self, rate_class, now=None):
+        """
+        Check whether a command of `rate_class` may be executed now, taking a
+        token from its bucket if so.
+
+        Parameters
+        ----------
+        rate_class: string
+            The command's class.
+        now:    float (Optional)
+            The current `time.monotonic()` time.
+
+        Returns
+        -------
+        boolean:    True if the command may be executed.
+        """
+
+        bucket = self.buckets.get(rate_class)
+        if bucket is None:
+            if rate_class not in self.limits:
+                return True
+            rate, burst = self.limits[rate_class]
+            bucket = self.buckets[rate_class] = TokenBucket(rate, burst)
+
+        return bucket.take(now)
@@ -1,5 +1,9 @@
 import random
 
+import numpy as np
+
+from game.store.models.character import Character
+
 class CharacterLibrary:
     """
     A library containing behavior for acting on and interacting with Characters. 
@@ -22,7 +26,8 @@ class CharacterLibrary:
 
     def kill(self, character):
         """
-        Kill a character and send their player back to the account menu.
+        Kill a character and, if they're played, send their player back to
+        the account menu.
 
         Parameters
         ----------
@@ -34,10 +39,13 @@ class CharacterLibrary:
         CharacterLibrary:   Returns `self` to allow chaining.
         """
 
-        player = character.player
+        character.position = character.POSITION_DEAD
+        character.markDirty()
+
+        # Only player characters have a player.
+        player = getattr(character, 'player', None)
         if player:
             player.write("You have died.")
-            character.position = character.POSITION_DEAD
 
             player.character = None
             character.player = None
@@ -63,6 +71,7 @@ class CharacterLibrary:
         """
 
         character.reserves.sleep += amount
+        character.markDirty()
 
         if character.position == character.POSITION_SLEEPING and character.reserves.sleep >= 16:
             character.position = character.POSITION_STANDING
@@ -95,6 +104,7 @@ class CharacterLibrary:
         """
 
         character.reserves.calories += amount
+        character.markDirty()
         if character.reserves.calories < 0:
             # Reduce the character's stamina by the amount they are starving.
             # If the stamina reaches 0, the character dies.
@@ -128,6 +138,7 @@ class CharacterLibrary:
         if character.reserves.thirst > character.reserves.max_thirst:
             return False
         character.reserves.thirst += amount
+        character.markDirty()
         if character.reserves.thirst < 0:
             character.attributes.stamina = character.attributes.max_stamina + 4 * (character.reserves.thirst / character.reserves.max_thirst)
             self.calculateReserves(character)
@@ -155,6 +166,7 @@ class CharacterLibrary:
         if character.reserves.wind + amount < 0:
             return False
         character.reserves.wind = min(character.reserves.wind + amount, character.reserves.max_wind)
+        character.markDirty()
         return True
 
     def adjustEnergy(self, character, amount):
@@ -177,6 +189,7 @@ class CharacterLibrary:
         if character.reserves.energy + amount < 0:
             return False
         character.reserves.energy = min(character.reserves.energy + amount, character.reserves.max_energy)
+        character.markDirty()
         return True
 
     def calculateReserves(self, character):
@@ -189,6 +202,8 @@ class CharacterLibrary:
             The character who's reserves we want to calculate.
         """
 
+        character.markDirty()
+
         character.reserves.max_energy = character.attributes.stamina * 1000
         if character.reserves.energy >= character.reserves.max_energy:
             character.reserves.energy = character.reserves.max_energy
@@ -196,3 +211,80 @@ class CharacterLibrary:
         character.reserves.max_wind = character.attributes.stamina * 3
         if character.reserves.wind >= character.reserves.max_wind:
             character.reserves.wind = character.reserves.max_wind
+
+    def drainReserves(self, characters):
+        """
+        Do a game minute's worth of reserve drain and recovery for each of
+        `characters` at once, on their rows of the store's ReservesTable.
+        Everyone burns calories and water, characters who are standing catch
+        their breath, and characters who are resting recover wind and energy.
+
+        This has the same effects as calling `adjustCalories()`,
+        `adjustThirst()`, `adjustWind()` and `adjustEnergy()` for each
+        character in turn.  Characters who starve or die of thirst are killed
+        once the arrays have been updated.
+
+        Parameters
+        ----------
+        characters: list<Character>
+            The characters to update.  NPCs may be included.
+        """
+
+        if not characters:
+            return
+
+        for character in characters:
+            character.markDirty()
+
+        table = self.store.reserves
+        rows = table.rows(characters)
+        columns = table.columns
+
+        stamina = columns['stamina']
+        max_stamina = columns['max_stamina']
+
+        def calculateMaximums(rows):
+            # As `calculateReserves()`.
+            columns['max_energy'][rows] = stamina[rows] * 1000
+            columns['energy'][rows] = np.minimum(columns['energy'][rows], columns['max_energy'][rows])
+            columns['max_wind'][rows] = stamina[rows] * 3
+            columns['wind'][rows] = np.minimum(columns['wind'][rows], columns['max_wind'][rows])
+
+        # Calories.  Starving characters lose stamina.
+        calories = columns['calories'][rows] - 2
+        columns['calories'][rows] = calories
+
+        starving = rows[calories < 0]
+        stamina[starving] = max_stamina[starving] + calories[calories < 0] / columns['max_calories'][starving]
+        calculateMaximums(starving)
+        dead = (calories < 0) & (stamina[rows] <= 0)
+
+        # Thirst.  Characters who've drunk more than their fill don't get
+        # thirstier, and those who are dehydrated lose stamina.
+        thirst = columns['thirst'][rows]
+        drinking = thirst <= columns['max_thirst'][rows]
+        thirst = np.where(drinking, thirst - 2, thirst)
+        columns['thirst'][rows] = thirst
+
+        dehydrated = drinking & (thirst < 0)
+        parched = rows[dehydrated]
+        stamina[parched] = max_stamina[parched] + 4 * (thirst[dehydrated] / columns['max_thirst'][parched])
+        calculateMaximums(parched)
+        dead |= dehydrated & (stamina[rows] <= 0)
+
+        for index in np.flatnonzero(dead):
+            self.kill(characters[index])
+
+        # Wind and energy, by position.  Anyone who just died is no longer
+        # standing or resting.
+        positions = [character.position for character in characters]
+        standing = np.array([position == Character.POSITION_STANDING for position in positions])
+        resting = np.array([position == Character.POSITION_RESTING for position in positions])
+
+        wind = columns['wind'][rows] + np.where(resting, 5, 3)
+        recovering = (standing | resting) & (wind >= 0)
+        columns['wind'][rows[recovering]] = np.minimum(wind[recovering], columns['max_wind'][rows[recovering]])
+
+        energy = columns['energy'][rows] + 100
+        recovering = resting & (energy >= 0)
+        columns['energy'][rows[recovering]] = np.minimum(energy[recovering], columns['max_energy'][rows[recovering]])
@@ -87,12 +87,42 @@ class MovementLibrary:
     def enter(self, character, room, speed='', direction=''):
         room.occupants.append(character)
         character.room = room
+        character.markDirty()
+
+        # Rooms only save the NPCs in them.
+        if not character.is_player_character:
+            self.store.markRoomDirty(room)
 
         if direction:
             self.library.room.writeToRoom(character, character.name.title() + " enters from the " + room.INVERT_DIRECTION[direction] + ".")
         else:
             self.library.room.writeToRoom(character, character.name.title() + " enters.")
 
+    def enterGame(self, character):
+        """
+        Put a character into the game world, in the room they left it from,
+        or the first room if they haven't played before or their room is gone.
+        """
+
+        room = self.store.rooms.getById(character.room) if character.room else None
+        if room is None:
+            room = self.store.rooms.getById(1)
+        self.enter(character, room)
+
+    def leaveGame(self, character):
+        """
+        Take a character out of the game world when their player leaves.  The
+        character keeps the id of their room, rather than the room, so that
+        the room can be paged out while they're gone.
+        """
+
+        room = character.room
+        if room is not None:
+            self.library.room.writeToRoom(character, character.name + ' leaves the game.')
+            room.occupants.remove(character)
+            character.room = room.getId()
+        character.player = None
+
     def leave(self, character, room, speed='', direction=''):
         if direction:
             self.library.room.writeToRoom(character, character.name.title() + " leaves to the " + direction + ".")
@@ -101,3 +131,7 @@ class MovementLibrary:
 
         room.occupants.remove(character)
         character.room = None
+        character.markDirty()
+
+        if not character.is_player_character:
+            self.store.markRoomDirty(room)
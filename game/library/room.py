@@ -82,7 +82,8 @@ class RoomLibrary:
     def writeToRoom(self, character, text):
         """
         Write a message to all occupants with players sharing the character's
-        room, excluding character.
+        room, excluding character.  The message is non-essential, so it is
+        dropped for any occupant whose connection is backed up.
 
         Parameters
         ----------
@@ -99,7 +100,7 @@ class RoomLibrary:
         for occupant in character.room.occupants:
             if occupant != character and isinstance(occupant, PlayerCharacter) \
                     and occupant.player and occupant.position != occupant.POSITION_SLEEPING: 
-                occupant.player.write(text)
+                occupant.player.write(text, essential=False)
 
     def findOccupantByKeywords(self, room, keywords):
         """
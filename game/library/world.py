@@ -13,22 +13,22 @@ class TimeLibrary:
         ## Time of day based on hour.
         if time.hour == 7:
             for player in self.store.players:
-                player.write("It is dawn.")
+                player.write("It is dawn.", essential=False)
         elif time.hour == 8:
             for player in self.store.players:
-                player.write("It is morning.")
+                player.write("It is morning.", essential=False)
         elif time.hour == 12:
             for player in self.store.players:
-                player.write("It is noon.")
+                player.write("It is noon.", essential=False)
         elif time.hour == 13:
             for player in self.store.players:
-                player.write("It is afternoon.")
+                player.write("It is afternoon.", essential=False)
         elif time.hour == 19:
             for player in self.store.players:
-                player.write("It is dusk.")
+                player.write("It is dusk.", essential=False)
         elif time.hour == 20:
             for player in self.store.players:
-                player.write("It is night.")
+                player.write("It is night.", essential=False)
 
 
     def loop(self):
@@ -1,9 +1,12 @@
+import itertools
 from textwrap import TextWrapper
 
 
 class Prompt:
     "A player's current prompt and methods necessary to set it."
 
+    __slots__ = ('is_in_buffer', 'is_needed', 'is_off', 'default', 'current')
+
     def __init__(self):
 
         # Does the player currently have a prompt in their output buffer?
@@ -30,6 +33,12 @@ class Player:
     STATUS_ACCOUNT = 'account'
     STATUS_GAME = 'game'
 
+    # The account states a player is in before they've logged in.
+    LOGIN_STATES = ('welcome-screen', 'get-account-password')
+
+    # Hands out each player's phase, round robin.
+    phases = itertools.count()
+
     def __init__(self, socket, account_interpreter, game_interpreter):
         """
         Initialize the player with their socket and references to interpreters.
@@ -62,6 +71,12 @@ class Player:
 
         self.prompt = Prompt()
 
+        # The player's command rate limits, created by the CommandInterpreter.
+        self.limiter = None
+
+        # Spreads the player's periodic work across loops, see Heartbeat.
+        self.phase = next(Player.phases)
+
     def writePrompt(self):
         """
         Update the player's current prompt based on their character's state (if
@@ -131,6 +146,17 @@ class Player:
             self.last_account_state = self.current_account_state
             self.current_account_state = None
 
+    def isLoggingIn(self):
+        """
+        Is the player still logging in?
+
+        Returns
+        -------
+        boolean:    True if the player hasn't gotten past the login screens.
+        """
+
+        return self.status == self.STATUS_ACCOUNT and self.current_account_state in self.LOGIN_STATES
+
     def interpret(self):
         """
         Interpret the player's input, using the interpreter appropriate to the
@@ -184,7 +210,7 @@ class Player:
 
         return self.socket.hasInput()
 
-    def write(self, text, wrap=True):
+    def write(self, text, wrap=True, essential=True):
         """
         Write output to this player's client socket.
 
@@ -195,6 +221,10 @@ class Player:
         wrap:   boolean (Optional), Default: True
             Whether or not we should wrap the text to 80 characters.  Defaults
             to `True`.
+        essential:  boolean (Optional), Default: True
+            Whether the player needs to see this output.  Non-essential output,
+            such as room broadcasts, is dropped while the player's connection
+            is backed up.  Defaults to `True`.
 
         Returns
         Player: Returns the current player to allow chaining.
@@ -208,7 +238,7 @@ class Player:
 
         # Add the output to the player output batch.  It will be send and
         # cleared in the next cycle.
-        self.socket.appendToOutputBuffer(text)
+        self.socket.appendToOutputBuffer(text, essential)
         return self
 
     def read(self):
@@ -263,3 +293,85 @@ class Player:
     def enableEcho(self):
         # self.socket.enableEcho()
         pass
+
+
+class Players:
+    """
+    The players in the game.
+
+    Also keeps the players sorted into shards by their phase, so that a job
+    that's spread across `interval` loops can pick out the players whose turn
+    it is without looking at every player on every loop.  The shards for an
+    interval are built the first time they're asked for, and kept up to date
+    as players are added and removed after that.
+    """
+
+    def __init__(self, players=()):
+        # A dict rather than a set, to keep the players in the order they
+        # joined.
+        self.players = dict.fromkeys(players)
+
+        # The players in order, as a tuple, so that they can be iterated over
+        # and indexed without copying them each time, and without the
+        # iteration breaking if a player joins or leaves part way through.
+        # Rebuilt the next time it's needed after a player joins or leaves.
+        self.ordered = None
+
+        # The shards for each interval: a dict of players keyed by phase %
+        # interval.
+        self.shards = {}
+
+    def __iter__(self):
+        return iter(self.inOrder())
+
+    def __len__(self):
+        return len(self.players)
+
+    def __contains__(self, player):
+        return player in self.players
+
+    def __getitem__(self, index):
+        return self.inOrder()[index]
+
+    def inOrder(self):
+        if self.ordered is None:
+            self.ordered = tuple(self.players)
+        return self.ordered
+
+    def append(self, player):
+        self.players[player] = None
+        self.ordered = None
+        for interval, shards in self.shards.items():
+            shards.setdefault(player.phase % interval, {})[player] = None
+
+    def remove(self, player):
+        del self.players[player]
+        self.ordered = None
+        for interval, shards in self.shards.items():
+            shards[player.phase % interval].pop(player, None)
+
+    def shard(self, interval, offset):
+        """
+        Find the players whose phase is `offset` in a cycle of `interval`
+        loops.
+
+        Parameters
+        ----------
+        interval:   int
+            How many loops the cycle is.
+        offset: int
+            The loop in the cycle.
+
+        Returns
+        -------
+        list:   The players whose `phase % interval` is `offset`.
+        """
+
+        shards = self.shards.get(interval)
+        if shards is None:
+            shards = self.shards[interval] = {}
+            for player in self.players:
+                shards.setdefault(player.phase % interval, {})[player] = None
+        return list(shards.get(offset, ()))
+
+# End Players
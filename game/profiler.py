@@ -0,0 +1,241 @@
+import json
+import os
+import time
+
+
+class Histogram:
+    """
+    A histogram of timings with fixed, logarithmically sized buckets, in the
+    style of HdrHistogram.  Each power of two range is split into
+    `SUB_BUCKETS` equal buckets, so a recorded value is off by at most
+    1/`SUB_BUCKETS` of itself, and recording is a couple of integer operations
+    no matter how many values have been recorded.
+    """
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    # Enough buckets for values up to 2^48 ns, or about three days.
+    BUCKETS = 48 * SUB_BUCKETS
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def bucket(self, value):
+        'The index of the bucket `value` falls in.'
+
+        if value < 2 * self.SUB_BUCKETS:
+            return value
+
+        shift = value.bit_length() - self.SUB_BUCKET_BITS - 1
+        return min((shift + 1) * self.SUB_BUCKETS + (value >> shift) - self.SUB_BUCKETS, self.BUCKETS - 1)
+
+    def bucketValue(self, index):
+        'The largest value that falls in bucket `index`.'
+
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+
+        shift = index // self.SUB_BUCKETS - 1
+        top = index % self.SUB_BUCKETS + self.SUB_BUCKETS
+        return ((top + 1) << shift) - 1
+
+    def record(self, value):
+        """
+        Record a value.
+
+        Parameters
+        ----------
+        value:  int
+            The value to record, eg. a time in nanoseconds.
+        """
+
+        value = max(int(value), 0)
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """
+        Find the value that `fraction` of the recorded values are at or below.
+
+        Parameters
+        ----------
+        fraction:   float
+            Between 0 and 1, eg. 0.99 for the 99th percentile.
+
+        Returns
+        -------
+        int:    The percentile's value, or 0 if nothing has been recorded.
+        """
+
+        if not self.count:
+            return 0
+
+        target = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.bucketValue(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total // self.count if self.count else 0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max
+        }
+
+
+class Profiler:
+    """
+    Times each phase of the game loop.  Call `start()` at the top of each pass
+    through the loop, `mark()` with a phase's name as each phase finishes, and
+    `finish()` at the end of a tick.  Each phase's times, and the loop's, go
+    into their own Histogram.  Time spent idle, eg. waiting on the poll, is
+    marked with `idle()` instead, so that it's left out of the loop's time.
+
+    The loop may pass several times between ticks, eg. to handle input as it
+    arrives.  A phase's time is added up over all of the passes since the last
+    tick and recorded once, by `finish()`, so that every phase is counted once
+    a tick, just like the loop.
+
+    Attributes
+    ----------
+    dumpRequested: boolean
+        Set to have the loop print a report at the end of the current tick,
+        eg. from a signal handler.
+    """
+
+    def __init__(self, metricsFile=None, metricsInterval=60):
+        """
+        Initialize the profiler.
+
+        Parameters
+        ----------
+        metricsFile:    string (Optional)
+            A file to periodically write the histograms to, as json.
+        metricsInterval:    float
+            How often, in seconds, to write the metrics file.
+        """
+
+        self.phases = {}
+        self.loop = Histogram()
+
+        self.metricsFile = metricsFile
+        self.metricsInterval = metricsInterval
+        self.nextWrite = time.monotonic() + metricsInterval
+
+        self.dumpRequested = False
+
+        # The time spent in each phase, and busy, since the last tick.
+        self.pending = {}
+        self.busy = 0
+        self.phaseStart = 0
+
+    def start(self):
+        self.phaseStart = time.perf_counter_ns()
+
+    def mark(self, phase):
+        """
+        Add the time since the last mark, or since the start of the pass, to
+        the time spent in `phase` this tick.
+        """
+
+        now = time.perf_counter_ns()
+        elapsed = now - self.phaseStart
+        self.pending[phase] = self.pending.get(phase, 0) + elapsed
+        self.busy += elapsed
+        self.phaseStart = now
+        return elapsed
+
+    def idle(self, phase):
+        """
+        Like `mark()`, but the time spent in `phase` isn't counted in the
+        loop's time.
+        """
+
+        elapsed = self.mark(phase)
+        self.busy -= elapsed
+
+    def finish(self, counters=None):
+        """
+        Record each phase's time, and the loop's, since the last tick, then
+        print a report if one has been asked for and write the metrics file if
+        it's due.
+
+        Parameters
+        ----------
+        counters:   dict (Optional)
+            Other metrics to include in the metrics file.
+        """
+
+        for phase, elapsed in self.pending.items():
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram()
+            histogram.record(elapsed)
+
+        self.loop.record(self.busy + time.perf_counter_ns() - self.phaseStart)
+        self.pending.clear()
+        self.busy = 0
+
+        if self.dumpRequested:
+            self.dumpRequested = False
+            print(self.report())
+
+        if self.metricsFile and time.monotonic() >= self.nextWrite:
+            self.nextWrite = time.monotonic() + self.metricsInterval
+            self.writeMetrics(counters)
+
+    def requestDump(self, signum=None, frame=None):
+        'Ask for a report at the end of the current tick.  Usable as a signal handler.'
+
+        self.dumpRequested = True
+
+    def report(self):
+        """
+        Build a table of each phase's timings, in milliseconds.
+
+        Returns
+        -------
+        string: The report.
+        """
+
+        lines = ["Loop phase timings (ms):",
+                 "\t{0:<14}{1:>10}{2:>10}{3:>10}{4:>10}{5:>10}".format('phase', 'count', 'p50', 'p95', 'p99', 'max')]
+        for name, histogram in list(self.phases.items()) + [('loop', self.loop)]:
+            summary = histogram.summary()
+            lines.append("\t{0:<14}{1:>10,d}{2:>10.3f}{3:>10.3f}{4:>10.3f}{5:>10.3f}".format(
+                name, summary['count'], summary['p50'] / 1e6, summary['p95'] / 1e6, summary['p99'] / 1e6,
+                summary['max'] / 1e6))
+        return "\n".join(lines)
+
+    def writeMetrics(self, counters=None):
+        """
+        Write the histogram summaries, in nanoseconds, to the metrics file.
+        The file is replaced atomically, so readers never see half of it.
+        """
+
+        metrics = {
+            'time': time.time(),
+            'phases': {name: histogram.summary() for name, histogram in self.phases.items()},
+            'loop': self.loop.summary(),
+            'counters': counters or {}
+        }
+
+        temporary = self.metricsFile + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(metrics, file, indent=4)
+        os.replace(temporary, self.metricsFile)
+
+# End Profiler
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+
+
+class Event:
+    """
+    A job registered with the Scheduler.
+
+    Attributes
+    ----------
+    loop:   int
+        The loop the event is next due on.
+    callback:   callable
+        Called, with no arguments, when the event is due.
+    interval:   int
+        How many loops between runs of a recurring event, or None for an event
+        that only runs once.
+    cancelled:  boolean
+        Set by `Scheduler.cancel()`.  Cancelled events are dropped when they
+        come up, rather than being dug out of the queue.
+    """
+
+    def __init__(self, loop, callback, interval, sequence):
+        self.loop = loop
+        self.callback = callback
+        self.interval = interval
+        self.sequence = sequence
+        self.cancelled = False
+
+    def __lt__(self, other):
+        # Events due on the same loop run in the order they were first
+        # scheduled, recurring events included.
+        return (self.loop, self.sequence) < (other.loop, other.sequence)
+
+
+class Scheduler:
+    """
+    Runs jobs on the loop they're due, keyed on the world's loop counter.
+
+    Events are kept in a heap ordered by the loop they're due on, so each loop
+    only looks at the front of the heap and does work in proportion to the
+    events that are actually due, rather than checking every job (or every
+    player) each loop.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, loop, callback, interval=None):
+        """
+        Schedule `callback` to run on `loop`.
+
+        Parameters
+        ----------
+        loop:   int
+            The loop to run the event on.  An event scheduled for a loop
+            that's already passed runs on the next call to `run()`.
+        callback:   callable
+            Called, with no arguments, when the event is due.
+        interval:   int (Optional)
+            If given, run the event again every `interval` loops.
+
+        Returns
+        -------
+        Event:  The event, which can be passed to `cancel()`.
+        """
+
+        if interval is not None and interval < 1:
+            raise ValueError("A recurring event's interval must be at least one loop.")
+
+        event = Event(loop, callback, interval, next(self.sequence))
+        heapq.heappush(self.queue, event)
+        return event
+
+    def every(self, interval, callback, now=0):
+        """
+        Schedule `callback` to run on every loop that's a multiple of
+        `interval`, starting with the first one after `now`.
+
+        Parameters
+        ----------
+        interval:   int
+            How many loops between runs.
+        callback:   callable
+            Called, with no arguments, when the event is due.
+        now:    int
+            The current loop.
+
+        Returns
+        -------
+        Event:  The event, which can be passed to `cancel()`.
+        """
+
+        return self.schedule((now // interval + 1) * interval, callback, interval)
+
+    def cancel(self, event):
+        event.cancelled = True
+
+    def nextDue(self):
+        """
+        The loop the next event is due on.
+
+        Returns
+        -------
+        int:    The loop, or None if nothing is scheduled.
+        """
+
+        while self.queue and self.queue[0].cancelled:
+            heapq.heappop(self.queue)
+        return self.queue[0].loop if self.queue else None
+
+    def run(self, loop):
+        """
+        Run every event that's due on or before `loop`.  Recurring events are
+        scheduled again for their next multiple of their interval after `loop`,
+        so an event that's fallen behind runs once rather than once for each
+        interval it missed.
+
+        Parameters
+        ----------
+        loop:   int
+            The current loop.
+
+        Returns
+        -------
+        int:    How many events ran.
+        """
+
+        ran = 0
+        while self.queue and self.queue[0].loop <= loop:
+            event = heapq.heappop(self.queue)
+            if event.cancelled:
+                continue
+
+            event.callback()
+            ran += 1
+
+            if event.interval is not None and not event.cancelled:
+                event.loop += ((loop - event.loop) // event.interval + 1) * event.interval
+                heapq.heappush(self.queue, event)
+        return ran
+
+# End Scheduler
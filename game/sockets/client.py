@@ -1,4 +1,10 @@
-import telnetlib
+import codecs
+import time
+import zlib
+from collections import deque
+
+from game.sockets import telnet
+from game.sockets.telnet import TelnetProtocol
 
 ###
 # ClientSocket
@@ -12,6 +18,22 @@ import telnetlib
 class ClientSocket:
     'A wrapper around the client socket.'
 
+    # The longest line of input we'll accept.  Anything longer is discarded up
+    # to the next newline.
+    MAX_LINE_LENGTH = 4096
+
+    # The most lines of input we'll hold for a client.  The game only handles
+    # one line a loop, so a client sending faster than that has anything past
+    # this dropped.
+    MAX_INPUT_QUEUE = 32
+
+    # Settings for MCCP2 compression.  The window and memory level are smaller
+    # than zlib's defaults to keep each connection's compressor to tens of
+    # kilobytes rather than hundreds, at a small cost in compression.
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_WBITS = 12
+    COMPRESSION_MEM_LEVEL = 5
+
     ###
     # Constructor for the client socket.  Take a tuple as returned from ``socket.accept()`` and save
     # both the socket and address for later use.  Also take the parent server socket that accepted
@@ -27,49 +49,184 @@ class ClientSocket:
         # this client closes, so that it can maintain its list.
         self.server = server
 
-        # A queue of messages coming in.
-        self.inputQueue = []
+        # A queue of complete lines of input coming in, oldest first.
+        self.inputQueue = deque()
+
+        # Input is decoded incrementally, so that a multibyte character split
+        # across two reads is decoded once the rest of it arrives, and then
+        # framed into lines.  Whatever follows the last newline waits here
+        # until the rest of its line arrives.
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.partialLine = ""
 
-        # We'll use this to clear the output buffer.
-        self.outputBufferReset = ""
+        # Set while we're throwing away the rest of a line that ran past
+        # MAX_LINE_LENGTH.
+        self.isDiscardingLine = False
 
-        # A buffer of output to go out.
-        self.outputBuffer = self.outputBufferReset 
+        # How many lines of input we've dropped because the queue was full, or
+        # because they were too long.
+        self.droppedInput = 0
+
+        # When the client connected and when it last sent us input, for the
+        # server's idle and login timeouts.
+        self.connectedAt = time.monotonic()
+        self.lastActivity = self.connectedAt
+
+        # A buffer of encoded output to go out.  Output is encoded once, as it
+        # is appended, and `outputOffset` tracks how much of the buffer the
+        # socket has already accepted, so that a partial send can pick up
+        # where it left off on the next writable event.
+        self.outputBuffer = bytearray()
+        self.outputOffset = 0
+
+        # The telnet protocol layer, and the compressor for our output once the
+        # client agrees to MCCP2.  Compressed output is only flushed when we
+        # write, so `isCompressionPending` tracks whether the compressor is
+        # holding output that hasn't made it into the buffer yet.
+        self.telnet = TelnetProtocol(self)
+        self.compressor = None
+        self.isCompressionPending = False
 
         self.player = None
 
-    def appendToOutputBuffer(self, output):
-        self.outputBuffer += output
+        # Set once the connection has been closed, so that the server can skip
+        # any events still pending for it.
+        self.isClosed = False
+
+        # Backpressure.  A client whose unsent output climbs above the
+        # server's high water mark is congested, and non-essential output to it
+        # is dropped until it drains back below the low water mark.  A client
+        # that sits above the hard limit for too long is evicted by the
+        # server.  `stalledSince` records when it crossed the hard limit.
+        self.isCongested = False
+        self.stalledSince = None
+        self.droppedOutput = 0
+
+    def appendToOutputBuffer(self, output, essential=True):
+        if not output or self.isClosed:
+            return
+
+        if self.isCongested and not essential:
+            # The congestion state may be stale if output drained somewhere
+            # we didn't see, so check it again before dropping anything.
+            self.checkCongestion()
+            if self.isCongested:
+                self.droppedOutput += 1
+                self.server.droppedOutput += 1
+                return
+
+        self.appendRawOutput(output.encode())
+
+    ###
+    # Append already encoded output, such as telnet commands, to the output buffer.
+    ###
+    def appendRawOutput(self, data):
+        if self.isClosed:
+            return
+
+        # Only ask the server to watch for writability when the buffer goes
+        # from empty to non-empty.
+        if not self.hasOutput():
+            self.server.watchWrite(self)
+
+        if self.compressor:
+            data = self.compressor.compress(data)
+            self.isCompressionPending = True
+
+        self.outputBuffer += data
+        self.checkCongestion()
+
+    ###
+    # Start compressing everything we send.  Called by the telnet layer once the client agrees
+    # to MCCP2.
+    ###
+    def startCompression(self):
+        if not self.compressor:
+            self.compressor = zlib.compressobj(self.COMPRESSION_LEVEL, zlib.DEFLATED,
+                                               self.COMPRESSION_WBITS, self.COMPRESSION_MEM_LEVEL)
+
+    ###
+    # End the compressed stream and go back to sending plain output.
+    ###
+    def stopCompression(self):
+        if self.compressor:
+            end = self.compressor.flush(zlib.Z_FINISH)
+            self.compressor = None
+            self.isCompressionPending = False
+            self.appendRawOutput(end)
+
+    ###
+    # Move anything the compressor is holding into the output buffer.  We only do this when we
+    # write, so that everything written in a loop is compressed together.
+    ###
+    def flushCompression(self):
+        if self.isCompressionPending:
+            self.outputBuffer += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.isCompressionPending = False
+
+    ###
+    # How many bytes of output are waiting to go out to the client?
+    ###
+    def outputSize(self):
+        return len(self.outputBuffer) - self.outputOffset
+
+    ###
+    # Update the congestion state after the amount of pending output has changed.
+    ###
+    def checkCongestion(self):
+        size = self.outputSize()
+
+        if not self.isCongested and size > self.server.outputHighWater:
+            self.isCongested = True
+        elif self.isCongested and size <= self.server.outputLowWater:
+            self.isCongested = False
+
+        if self.stalledSince is None and size > self.server.outputHardLimit:
+            self.stalledSince = time.monotonic()
+            self.server.stalled.add(self)
+        elif self.stalledSince is not None and size <= self.server.outputHardLimit:
+            self.stalledSince = None
+            self.server.stalled.discard(self)
 
     def clearOutputBuffer(self):
-        self.outputBuffer = self.outputBufferReset 
+        self.outputBuffer.clear()
+        self.outputOffset = 0
         return self
 
     ###
     # Is the output buffer empty?
     ###
     def outputBufferIsClear(self):
-        return self.outputBuffer == self.outputBufferReset 
+        return not self.hasOutput()
 
     ###
     # Do we have output that needs to be written?
     ###
     def hasOutput(self):
-        return self.outputBuffer != self.outputBufferReset 
+        return self.isCompressionPending or self.outputOffset < len(self.outputBuffer)
 
     def hasInput(self):
         return self.inputQueue
 
     def popInput(self):
-        return self.inputQueue.pop()
+        return self.inputQueue.popleft()
 
+    ###
+    # Start the connection, opening telnet negotiations with the client.  Called by the server once
+    # it is ready to watch the connection.
+    ###
+    def open(self):
+        self.telnet.start()
+
+    ###
+    # Ask the client to stop echoing what it types by telling it we'll handle echoing, which we
+    # then don't do.  Used while the client enters a password.
+    ###
     def disableEcho(self):
-        seq = telnetlib.IAC + telnetlib.DONT + telnetlib.ECHO
-        self.socket.send(seq)
+        self.telnet.will(telnet.ECHO)
 
     def enableEcho(self):
-        seq = telnetlib.IAC + telnetlib.WILL + telnetlib.ECHO
-        self.socket.send(seq)
+        self.telnet.wont(telnet.ECHO)
 
     ###
     # Read whatever text currently exists on this socket, and place it in the Player's input queue,
@@ -77,30 +234,119 @@ class ClientSocket:
     ###
 
     def read(self):
-        data = self.socket.recv(4096)
+        try:
+            data = self.socket.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionError:
+            # The peer reset the connection.
+            self.close()
+            return
+
         if data:
-            decoded = data.decode()
-            self.inputQueue.append(decoded)
-            if self.player:
-                self.player.prompt.is_needed = True
+            self.receive(data)
         else:
             # We're in an error state.  Close down the socket.
             self.close()
 
     ###
-    # Take the next batch of text from the player's output queue and write it out to the socket.
+    # Process a chunk of raw bytes received from the connection, queueing up the input it contains.
+    # Kept separate from ``read()`` so that connections which aren't driven by the selector can
+    # share the same input handling.
+    ###
+    def receive(self, data):
+        self.receiveText(self.telnet.feed(data))
+
+    ###
+    # Decode a chunk of input with any protocol framing already removed, and split it into lines.
+    ###
+    def receiveText(self, data):
+        if not data:
+            return
+
+        self.lastActivity = time.monotonic()
+
+        lines = (self.partialLine + self.decoder.decode(data)).split('\n')
+        self.partialLine = lines.pop()
+
+        received = False
+        for line in lines:
+            if self.isDiscardingLine:
+                # The start of this line was already thrown away.
+                self.isDiscardingLine = False
+                continue
+
+            line = line.rstrip('\r')
+            if len(line) > self.MAX_LINE_LENGTH:
+                self.discardLine()
+                continue
+
+            if len(self.inputQueue) >= self.MAX_INPUT_QUEUE:
+                self.droppedInput += 1
+                continue
+
+            self.inputQueue.append(line)
+            received = True
+
+        if self.isDiscardingLine:
+            self.partialLine = ""
+        elif len(self.partialLine) > self.MAX_LINE_LENGTH:
+            # Throw the line away now, and the rest of it as it arrives,
+            # rather than holding it until it ends.
+            self.partialLine = ""
+            self.discardLine()
+            self.isDiscardingLine = True
+
+        if received and self.player:
+            self.player.prompt.is_needed = True
+
+    ###
+    # Tell the client a line of its input was too long, and has been thrown away.
+    ###
+    def discardLine(self):
+        self.droppedInput += 1
+        self.appendToOutputBuffer("\nThat line was too long, and has been ignored.\n")
+
+    ###
+    # Write as much of the output buffer out to the socket as it will take.  Anything it doesn't
+    # take stays in the buffer and is retried on the next writable event.
     ###
 
     def write(self):
-        if self.hasOutput():
-            self.socket.send(self.outputBuffer.encode())
+        self.flushCompression()
+        if not self.hasOutput():
+            return
+
+        try:
+            with memoryview(self.outputBuffer) as view, view[self.outputOffset:] as unsent:
+                sent = self.socket.send(unsent)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionError:
+            self.close()
+            return
+
+        self.outputOffset += sent
+        if self.outputOffset >= len(self.outputBuffer):
             self.clearOutputBuffer()
+            self.server.unwatchWrite(self)
+            self.outputFlushed()
+        elif self.outputOffset > len(self.outputBuffer) // 2:
+            # Drop what's already been sent once it makes up most of the
+            # buffer, so that a slow client doesn't hold on to it forever.
+            del self.outputBuffer[:self.outputOffset]
+            self.outputOffset = 0
+        self.checkCongestion()
 
-            if self.player and self.player.prompt.is_in_buffer:
-                self.player.prompt.is_needed = False 
-                self.player.prompt.is_in_buffer = False
-            elif self.player:
-                self.player.is_needed = True
+    ###
+    # Update the player's prompt state once everything in the output buffer has gone out.
+    ###
+    def outputFlushed(self):
+        if self.player and self.player.prompt.is_in_buffer:
+            self.player.prompt.is_needed = False 
+            self.player.prompt.is_in_buffer = False
+        elif self.player:
+            self.player.is_needed = True
 
     ###
     # Handle any errors, closing the connection if necessary.
@@ -108,16 +354,29 @@ class ClientSocket:
     def handleError(self):
         self.close() 
 
+    ###
+    # Let the client know it's being disconnected for being idle, and close the connection.
+    ###
+    def timeOut(self):
+        self.appendToOutputBuffer("\nYou have been idle for too long.  Goodbye!\n")
+        self.write()
+        self.close()
+
     ###
     # Close the connection to this socket
     ###
     def close(self):
-        self.socket.close()
+        if self.isClosed:
+            return
+
+        self.isClosed = True
+        self.server.stalled.discard(self)
         self.server.remove(self)
+        self.socket.close()
 
     ###
     # Return the descriptor (file number) of the wrapped socket.  This way we can use our sockets
-    # directly in ``select()`` and get them back, rather than having to do some sort of mapping
+    # directly with the server's selector and get them back, rather than having to do some sort of mapping
     # between the wrapped sockets and their parents.
     ###
     def fileno(self):
@@ -1,57 +1,185 @@
-import socket, select
+import socket, selectors, time
 from game.sockets.client import ClientSocket
+from game.sockets.timers import ConnectionTimeouts
+
+
+class BaseServerSocket:
+    """
+    What every kind of server the game loop runs on has in common: its list
+    of clients, the backpressure limits on their output, their idle and login
+    timeouts, and the counters that go with them.
+    """
+
+    # Default backpressure limits on each client's unsent output, in bytes.
+    OUTPUT_LOW_WATER = 16 * 1024
+    OUTPUT_HIGH_WATER = 64 * 1024
+    OUTPUT_HARD_LIMIT = 1024 * 1024
+
+    # How long, in seconds, a client may sit above the hard limit before it is
+    # evicted.
+    STALL_TIMEOUT = 30
+
+    # How long, in seconds, a client may go without sending any input, and how
+    # long it has to log in.
+    IDLE_TIMEOUT = 60 * 60
+    LOGIN_TIMEOUT = 2 * 60
+
+    def __init__(self, outputLowWater=OUTPUT_LOW_WATER, outputHighWater=OUTPUT_HIGH_WATER,
+                 outputHardLimit=OUTPUT_HARD_LIMIT, stallTimeout=STALL_TIMEOUT, idleTimeout=IDLE_TIMEOUT,
+                 loginTimeout=LOGIN_TIMEOUT):
+        # Initialize the list of connected sockets.
+        self.clients = []
 
+        # Backpressure limits, see ClientSocket.checkCongestion().
+        self.outputLowWater = outputLowWater
+        self.outputHighWater = outputHighWater
+        self.outputHardLimit = outputHardLimit
+        self.stallTimeout = stallTimeout
+
+        # Clients currently above the hard limit, and counters for monitoring.
+        self.stalled = set()
+        self.droppedOutput = 0
+        self.evictedClients = 0
+
+        # Idle and login timeouts, and a counter of the clients they've closed.
+        self.timeouts = ConnectionTimeouts(idleTimeout, loginTimeout)
+        self.timedOutClients = 0
+
+    # Disconnect any clients that have been stuck above the output hard limit
+    # for longer than the stall timeout.
+    def evictStalledClients(self):
+        now = time.monotonic()
+        for client in list(self.stalled):
+            client.checkCongestion()
+            if client.stalledSince is not None and now - client.stalledSince > self.stallTimeout:
+                client.close()
+                self.evictedClients += 1
+
+    # Disconnect any clients that have been idle for too long, or that haven't
+    # logged in in time.
+    def expireIdleClients(self):
+        for client in self.timeouts.expire():
+            client.timeOut()
+            self.timedOutClients += 1
 
-class ServerSocket:
-    'A socket server class, wrapping our select and polling logic.'
+    # Remove a socket from the client list
+    def remove(self, client):
+        self.timeouts.remove(client)
+        self.clients.remove(client)
 
-    def __init__(self, host, port):
-        # Create our server socket that will be used to accept new connections
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server.setblocking(0)
-        self.server.bind((host, port))
-        self.server.listen(5)
+# End BaseServerSocket
 
+
+class ServerSocket(BaseServerSocket):
+    'A socket server class, wrapping our selector and polling logic.'
+
+    def __init__(self, host, port, reusePort=False, **limits):
+        """
+        Initialize the server and start listening on `port`.
+
+        Parameters
+        ----------
+        host:   string
+            The host to listen on.
+        port:   int
+            The port to listen on.
+        reusePort:  boolean
+            Let several processes listen on the same port.  See `addListener()`.
+        limits: dict
+            Backpressure limits and timeouts, see BaseServerSocket.
+        """
+
+        super(ServerSocket, self).__init__(**limits)
         self.isOpen = True
 
-        # Initialize the list of connected sockets, which is used for select polling.
-        self.clients = []
+        # The selector holds a persistent registration for each listening
+        # socket and for every connected client.  Clients are always
+        # registered for reading and are only registered for writing while they
+        # have output waiting, so idle connections cost nothing per poll.
+        self.selector = selectors.DefaultSelector()
+
+        # The sockets we accept connections on, each mapped to the class that
+        # wraps the connections accepted on it.
+        self.listeners = {}
+
+        # Create our server socket that will be used to accept new connections
+        self.server = self.addListener(host, port, ClientSocket, reusePort)
 
         # Reset the lists we use for polling our clients and determining which clients are in
-        # various ready states. 
+        # various ready states.
         self.resetPollSets()
 
+    def addListener(self, host, port, clientClass, reusePort=False):
+        """
+        Start accepting connections on another port.
+
+        Parameters
+        ----------
+        host:   string
+            The host to listen on.
+        port:   int
+            The port to listen on.
+        clientClass:    class
+            The ClientSocket class to wrap connections accepted on this port
+            in.
+        reusePort:  boolean
+            Let several processes listen on the same port, with the kernel
+            spreading new connections between them.
+
+        Returns
+        -------
+        socket: The listening socket.
+        """
+
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setblocking(0)
+
+        # Let us restart while connections from the last run are still in
+        # TIME_WAIT.
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reusePort:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        listener.bind((host, port))
+        listener.listen(5)
+
+        self.selector.register(listener, selectors.EVENT_READ)
+        self.listeners[listener] = clientClass
+        return listener
+
     def resetPollSets(self):
-        # Poll lists, populated by select and read by the input handling methods.
+        # Poll lists, populated by the selector and read by the input handling methods.
         self.readable = []
         self.writeable = []
         self.erroring = []
         self.newConnections = False
 
-    def poll(self):
-        readSet = list(self.clients)
-        readSet.append(self.server)
-
-        writeSet = list(self.clients)
-        errorSet = list(self.clients)
+    # Returns whether anything was ready.
+    def poll(self, timeout=None):
+        ready = self.selector.select(timeout)
+        for key, events in ready:
+            if key.fileobj in self.listeners:
+                self.newConnections = True
+                continue
 
-        self.readable, self.writeable, self.erroring = select.select(readSet, writeSet, errorSet)
+            if events & selectors.EVENT_READ:
+                self.readable.append(key.fileobj)
+            if events & selectors.EVENT_WRITE:
+                self.writeable.append(key.fileobj)
+        return len(ready) > 0
 
     def handleReadSet(self):
         while self.readable:
             client = self.readable.pop()
-            if client is not self.server:
+            if not client.isClosed:
                 client.read()
-            elif client is self.server:
-                self.newConnections = True
 
     def handleWriteSet(self):
         while self.writeable:
             client = self.writeable.pop()
-            if client.hasOutput():
+            if not client.isClosed and client.hasOutput():
                 client.write()
 
-    def handleErrorSet(self): 
+    def handleErrorSet(self):
         while self.erroring:
             client = self.erroring.pop()
             client.handleError()
@@ -59,23 +187,42 @@ class ServerSocket:
     def hasNewConnection(self):
         return self.newConnections
 
+    # Accept a waiting connection from whichever listener has one.
     def accept(self):
-        try:
-            client = ClientSocket(self.server.accept(), self)
-        except socket.error: 
+        for listener, clientClass in self.listeners.items():
+            try:
+                client = clientClass(listener.accept(), self)
+                break
+            except socket.error:
+                continue
+        else:
             return None
 
         self.clients.append(client)
+        self.selector.register(client, selectors.EVENT_READ)
+        self.timeouts.add(client)
+        client.open()
         return client
 
+    # Turn on write interest for a client that has output waiting.
+    def watchWrite(self, client):
+        self.selector.modify(client, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    # Turn off write interest for a client that has flushed its output.
+    def unwatchWrite(self, client):
+        self.selector.modify(client, selectors.EVENT_READ)
+
     # Remove a socket from the client list
     def remove(self, client):
-        self.clients.remove(client)
+        self.selector.unregister(client)
+        super(ServerSocket, self).remove(client)
 
     def shutdown(self):
-        for client in self.clients:
+        for client in list(self.clients):
             client.close()
-        self.server.close()
+        self.selector.close()
+        for listener in self.listeners:
+            listener.close()
         self.isOpen = False
 
 # End ServerSocket
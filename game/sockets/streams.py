@@ -0,0 +1,164 @@
+import asyncio
+from collections import deque
+
+from game.sockets.client import ClientSocket
+from game.sockets.server import BaseServerSocket
+
+
+class StreamClientSocket(ClientSocket):
+    """
+    A ClientSocket driven by asyncio streams rather than by the selector in
+    ServerSocket.
+
+    Input is read by a coroutine as soon as it arrives and output is handed to
+    the stream's transport as soon as the event loop gets control back, so
+    neither has to wait for the next pass of the game loop.  The rest of the
+    ClientSocket interface is unchanged, so Player and the interpreters don't
+    need to know which kind of connection they are talking to.
+    """
+
+    def __init__(self, reader, writer, server):
+        """
+        Initialize the client socket.
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader
+            The stream we read the connection's input from.
+        writer: asyncio.StreamWriter
+            The stream we write the connection's output to.
+        server: StreamServerSocket
+            The server that accepted this connection.
+        """
+
+        self.reader = reader
+        self.writer = writer
+
+        super(StreamClientSocket, self).__init__(
+            (writer.get_extra_info('socket'), writer.get_extra_info('peername')), server)
+
+    async def run(self):
+        """
+        Read from the connection until the peer hangs up.
+        """
+
+        try:
+            while not self.isClosed:
+                data = await self.reader.read(4096)
+                if not data:
+                    break
+                self.receive(data)
+        except ConnectionError:
+            pass
+        finally:
+            self.close()
+
+    def read(self):
+        # Reading is driven by `run()`.
+        pass
+
+    def outputSize(self):
+        # Output we've handed off is still pending until the transport has
+        # actually sent it.
+        return super(StreamClientSocket, self).outputSize() + self.writer.transport.get_write_buffer_size()
+
+    def write(self):
+        self.flushCompression()
+        if self.hasOutput():
+            # Hand the whole buffer to the transport, which buffers whatever
+            # the socket won't take right now, and start a fresh one.
+            output = self.outputBuffer
+            self.outputBuffer = bytearray()
+            self.outputOffset = 0
+            self.writer.write(output)
+            self.outputFlushed()
+            self.checkCongestion()
+
+    def close(self):
+        if self.isClosed:
+            return
+
+        self.isClosed = True
+        self.server.stalled.discard(self)
+        self.server.remove(self)
+        self.writer.close()
+
+
+class StreamServerSocket(BaseServerSocket):
+    """
+    An asyncio based server with the same interface the game loop uses on
+    ServerSocket.
+
+    Connections are accepted by asyncio as they arrive and queued until the
+    game loop picks them up with `accept()`.  There is nothing to poll, so the
+    polling methods are no-ops.
+    """
+
+    def __init__(self, host, port, **limits):
+        super(StreamServerSocket, self).__init__(**limits)
+
+        self.host = host
+        self.port = port
+
+        self.server = None
+        self.isOpen = False
+
+        self.pending = deque()
+
+    async def start(self):
+        """
+        Start listening for connections on the running event loop.
+        """
+
+        self.server = await asyncio.start_server(self.handleConnection, self.host or None, self.port)
+        self.isOpen = True
+
+    async def handleConnection(self, reader, writer):
+        client = StreamClientSocket(reader, writer, self)
+        self.clients.append(client)
+        self.pending.append(client)
+        self.timeouts.add(client)
+        client.open()
+        await client.run()
+
+    def resetPollSets(self):
+        pass
+
+    def poll(self, timeout=None):
+        return False
+
+    def handleReadSet(self):
+        pass
+
+    def handleWriteSet(self):
+        pass
+
+    def handleErrorSet(self):
+        pass
+
+    def hasNewConnection(self):
+        return len(self.pending) > 0
+
+    def accept(self):
+        while self.pending:
+            client = self.pending.popleft()
+            if not client.isClosed:
+                return client
+        return None
+
+    # Flush a client's output as soon as the event loop regains control,
+    # batching everything written during the current tick into one write.
+    def watchWrite(self, client):
+        asyncio.get_running_loop().call_soon(client.write)
+
+    def unwatchWrite(self, client):
+        pass
+
+    def shutdown(self):
+        for client in list(self.clients):
+            client.close()
+        if self.server:
+            self.server.close()
+        self.isOpen = False
+
+# End StreamServerSocket
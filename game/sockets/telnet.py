@@ -0,0 +1,258 @@
+###
+# Telnet
+#
+# The telnet protocol layer.  Separates telnet commands from the text in a connection's input
+# stream and negotiates the telnet options we support with the client:
+#
+# - NAWS (RFC 1073): The client tells us the size of its window.
+# - TTYPE (RFC 1091): The client tells us what kind of terminal it is.
+# - MCCP2: The client agrees to let us zlib compress everything we send it.
+# - ECHO (RFC 857): Used to turn off the client's local echo while it enters a password.
+###
+
+# Telnet commands (RFC 854).
+SE = 240
+NOP = 241
+GA = 249
+SB = 250
+WILL = 251
+WONT = 252
+DO = 253
+DONT = 254
+IAC = 255
+
+# Telnet options.
+ECHO = 1
+SGA = 3
+TTYPE = 24
+NAWS = 31
+COMPRESS2 = 86
+
+# TTYPE subnegotiation commands.
+TTYPE_IS = 0
+TTYPE_SEND = 1
+
+
+class TelnetProtocol:
+    """
+    Parses telnet commands out of a connection's input and negotiates options
+    with the client on the connection's behalf.
+
+    The parser is a small state machine, so commands split across reads are
+    handled correctly.  Negotiation replies are queued on the connection's
+    output with `ClientSocket.appendRawOutput()`, and MCCP2 is started and
+    stopped with `ClientSocket.startCompression()` and
+    `ClientSocket.stopCompression()`.
+
+    Attributes
+    ----------
+    width: int
+        The width of the client's window, if it told us with NAWS.
+    height: int
+        The height of the client's window, if it told us with NAWS.
+    terminal_type: string
+        The client's terminal type, if it told us with TTYPE.
+    """
+
+    STATE_DATA = 'data'
+    STATE_IAC = 'iac'
+    STATE_OPTION = 'option'
+    STATE_SUBNEGOTIATION = 'subnegotiation'
+    STATE_SUBNEGOTIATION_IAC = 'subnegotiation-iac'
+
+    # The longest subnegotiation we'll buffer.  Anything longer is junk.
+    MAX_SUBNEGOTIATION_LENGTH = 256
+
+    # The options we ask the client to perform (DO).
+    REQUESTED = (NAWS, TTYPE)
+
+    def __init__(self, connection):
+        """
+        Initialize the protocol.
+
+        Parameters
+        ----------
+        connection: ClientSocket
+            The connection we're speaking telnet on.
+        """
+
+        self.connection = connection
+
+        self.state = self.STATE_DATA
+        self.command = None
+        self.subnegotiation = bytearray()
+
+        # The options we've offered to perform and are waiting on the client to
+        # accept, and the options currently enabled on our side and on the
+        # client's side.
+        self.offered = set()
+        self.local = set()
+        self.remote = set()
+
+        self.width = None
+        self.height = None
+        self.terminal_type = None
+
+    def start(self):
+        """
+        Open negotiations by offering compression and asking for the client's
+        window size and terminal type.
+        """
+
+        self.will(COMPRESS2)
+        self.send(DO, NAWS)
+        self.send(DO, TTYPE)
+
+    def send(self, command, option):
+        self.connection.appendRawOutput(bytes((IAC, command, option)))
+
+    def sendSubnegotiation(self, option, payload=b''):
+        self.connection.appendRawOutput(bytes((IAC, SB, option)) + payload + bytes((IAC, SE)))
+
+    def will(self, option):
+        """
+        Tell the client we'll perform `option`, eg. `will(ECHO)` to take over
+        echoing from the client.
+        """
+
+        if option not in self.local and option not in self.offered:
+            self.offered.add(option)
+            self.send(WILL, option)
+
+    def wont(self, option):
+        """
+        Tell the client we'll stop performing `option`.
+        """
+
+        if option in self.local or option in self.offered:
+            self.local.discard(option)
+            self.offered.discard(option)
+            self.send(WONT, option)
+
+    def feed(self, data):
+        """
+        Process a chunk of raw input, handling any telnet commands in it.
+
+        Parameters
+        ----------
+        data:   bytes
+            Raw bytes read from the connection.
+
+        Returns
+        -------
+        bytes:  The input with all telnet commands removed.
+        """
+
+        # Most input is plain text, so don't walk it byte by byte.
+        if self.state == self.STATE_DATA and IAC not in data:
+            return data
+
+        text = bytearray()
+        position = 0
+        length = len(data)
+        while position < length:
+            if self.state == self.STATE_DATA:
+                next_iac = data.find(IAC, position)
+                if next_iac == -1:
+                    text += data[position:]
+                    break
+                text += data[position:next_iac]
+                position = next_iac + 1
+                self.state = self.STATE_IAC
+                continue
+
+            byte = data[position]
+            position += 1
+
+            if self.state == self.STATE_IAC:
+                if byte == IAC:
+                    # An escaped 255 data byte.
+                    text.append(IAC)
+                    self.state = self.STATE_DATA
+                elif byte in (WILL, WONT, DO, DONT):
+                    self.command = byte
+                    self.state = self.STATE_OPTION
+                elif byte == SB:
+                    self.subnegotiation.clear()
+                    self.state = self.STATE_SUBNEGOTIATION
+                else:
+                    # NOP, GA, and the rest carry nothing we need.
+                    self.state = self.STATE_DATA
+
+            elif self.state == self.STATE_OPTION:
+                self.negotiate(self.command, byte)
+                self.state = self.STATE_DATA
+
+            elif self.state == self.STATE_SUBNEGOTIATION:
+                if byte == IAC:
+                    self.state = self.STATE_SUBNEGOTIATION_IAC
+                elif len(self.subnegotiation) < self.MAX_SUBNEGOTIATION_LENGTH:
+                    self.subnegotiation.append(byte)
+
+            elif self.state == self.STATE_SUBNEGOTIATION_IAC:
+                if byte == SE:
+                    self.subnegotiate(bytes(self.subnegotiation))
+                    self.state = self.STATE_DATA
+                else:
+                    # IAC IAC is an escaped 255 inside the subnegotiation.
+                    if len(self.subnegotiation) < self.MAX_SUBNEGOTIATION_LENGTH:
+                        self.subnegotiation.append(byte)
+                    self.state = self.STATE_SUBNEGOTIATION
+
+        return bytes(text)
+
+    def negotiate(self, command, option):
+        """
+        Respond to the client's side of an option negotiation.  Only replies
+        when the option's state actually changes, so that we never end up in a
+        negotiation loop with the client.
+        """
+
+        if command == DO:
+            if option in self.offered:
+                self.offered.discard(option)
+                self.local.add(option)
+                if option == COMPRESS2:
+                    # The client has agreed to compression.  Everything after
+                    # the subnegotiation that starts it is compressed.
+                    self.sendSubnegotiation(COMPRESS2)
+                    self.connection.startCompression()
+            elif option not in self.local:
+                self.send(WONT, option)
+
+        elif command == DONT:
+            if option in self.offered:
+                self.offered.discard(option)
+            elif option in self.local:
+                self.local.discard(option)
+                if option == COMPRESS2:
+                    self.connection.stopCompression()
+                self.send(WONT, option)
+
+        elif command == WILL:
+            if option not in self.REQUESTED:
+                self.send(DONT, option)
+            elif option not in self.remote:
+                self.remote.add(option)
+                if option == TTYPE:
+                    self.sendSubnegotiation(TTYPE, bytes((TTYPE_SEND,)))
+
+        elif command == WONT:
+            self.remote.discard(option)
+
+    def subnegotiate(self, payload):
+        """
+        Handle a completed subnegotiation from the client.
+        """
+
+        if not payload:
+            return
+
+        option = payload[0]
+        if option == NAWS and len(payload) >= 5:
+            self.width = (payload[1] << 8) | payload[2]
+            self.height = (payload[3] << 8) | payload[4]
+        elif option == TTYPE and len(payload) >= 2 and payload[1] == TTYPE_IS:
+            self.terminal_type = payload[2:].decode('ascii', 'replace')
+
+# End TelnetProtocol
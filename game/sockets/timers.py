@@ -0,0 +1,189 @@
+import time
+
+###
+# Timers
+#
+# Connection housekeeping.  Idle and login timeouts are kept on a hashed timer wheel, so that
+# checking them costs time in proportion to the timers that are due, rather than to the number of
+# connections.
+###
+
+
+class TimerWheel:
+    """
+    A hashed timer wheel.  Timers are hashed into a ring of slots by their
+    deadline, and each check only visits the slots that the clock has moved
+    past since the last one.  Every timer in a slot the clock has passed is
+    due, unless it's a turn or more of the wheel away, so the wheel should
+    have enough slots to cover the longest timer.  Timers further out than
+    that still work, but are looked at each time the wheel comes around.
+
+    A slot is only checked once the clock has moved past all of it, so timers
+    expire up to `resolution` seconds late.
+
+    Timers are keyed by the object they're for, and each object has at most
+    one timer.
+    """
+
+    def __init__(self, resolution=1.0, slots=64, now=None):
+        """
+        Initialize the wheel.
+
+        Parameters
+        ----------
+        resolution: float
+            The time, in seconds, covered by each slot.
+        slots:  int
+            The number of slots in the wheel.
+        now:    float (Optional)
+            The current `time.monotonic()` time.
+        """
+
+        self.resolution = resolution
+        self.slots = [dict() for index in range(slots)]
+
+        # The slot each timer is in, so they can be cancelled.
+        self.timers = {}
+
+        if now is None:
+            now = time.monotonic()
+
+        # The first tick whose slot hasn't been checked.
+        self.tick = int(now // resolution)
+
+    def __len__(self):
+        return len(self.timers)
+
+    def schedule(self, key, deadline):
+        """
+        Set the timer for `key`, replacing any timer it already had.
+
+        Parameters
+        ----------
+        key:    object
+            What the timer is for.
+        deadline:   float
+            The `time.monotonic()` time at which the timer expires.
+        """
+
+        self.cancel(key)
+
+        # A timer that's already due goes in the first slot we haven't
+        # checked, so the next check that passes it finds it.  Each timer
+        # keeps its tick, so we know which turn of the wheel it's due on.
+        tick = max(int(deadline // self.resolution), self.tick)
+        slot = tick % len(self.slots)
+        self.slots[slot][key] = tick
+        self.timers[key] = slot
+
+    def cancel(self, key):
+        slot = self.timers.pop(key, None)
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def expire(self, now=None):
+        """
+        Remove and return the timers that are due.
+
+        Parameters
+        ----------
+        now:    float (Optional)
+            The current `time.monotonic()` time.
+
+        Returns
+        -------
+        list:   The keys of the expired timers.
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        expired = []
+        target = int(now // self.resolution)
+
+        # Visit every slot we've moved all the way past, but never go around
+        # the wheel more than once.
+        tick = max(self.tick, target - len(self.slots))
+        while tick < target:
+            slot = self.slots[tick % len(self.slots)]
+            for key, due in list(slot.items()):
+                if due < target:
+                    del slot[key]
+                    del self.timers[key]
+                    expired.append(key)
+            tick += 1
+
+        self.tick = max(self.tick, target)
+        return expired
+
+
+class ConnectionTimeouts:
+    """
+    Tracks when each connection should be closed for having been idle too
+    long, or for not having logged in within the login timeout.
+
+    Connections record their `lastActivity`, but their timers aren't moved
+    every time they send input.  Instead, when a timer expires we check the
+    connection's actual deadline, and set the timer again if that's later.
+    """
+
+    def __init__(self, idleTimeout, loginTimeout, resolution=1.0):
+        """
+        Initialize the timeouts.
+
+        Parameters
+        ----------
+        idleTimeout:    float
+            How many seconds a connection may go without sending input.
+        loginTimeout:   float
+            How many seconds a connection has to log in.
+        resolution: float
+            How precisely to keep time, in seconds.
+        """
+
+        self.idleTimeout = idleTimeout
+        self.loginTimeout = loginTimeout
+
+        # Enough slots that no timer is more than a turn of the wheel away.
+        slots = int(max(idleTimeout, loginTimeout) / resolution) + 2
+        self.wheel = TimerWheel(resolution, slots)
+
+    def deadline(self, client):
+        deadline = client.lastActivity + self.idleTimeout
+        if client.player is None or client.player.isLoggingIn():
+            deadline = min(deadline, client.connectedAt + self.loginTimeout)
+        return deadline
+
+    def add(self, client):
+        self.wheel.schedule(client, self.deadline(client))
+
+    def remove(self, client):
+        self.wheel.cancel(client)
+
+    def expire(self, now=None):
+        """
+        Find the connections whose time is up.
+
+        Parameters
+        ----------
+        now:    float (Optional)
+            The current `time.monotonic()` time.
+
+        Returns
+        -------
+        list:   The connections that should be closed.
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        expired = []
+        for client in self.wheel.expire(now):
+            deadline = self.deadline(client)
+            if deadline <= now:
+                expired.append(client)
+            else:
+                self.wheel.schedule(client, deadline)
+        return expired
+
+# End ConnectionTimeouts
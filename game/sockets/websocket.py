@@ -0,0 +1,262 @@
+import base64
+import hashlib
+
+from game.sockets.client import ClientSocket
+
+###
+# WebSocket
+#
+# A ClientSocket for browser clients connecting with WebSockets (RFC 6455) instead of telnet.  The
+# connection starts with an HTTP upgrade handshake, after which input and output travel in frames.
+# Each text message from the client is treated as a line of input.  Output is gathered up as it's
+# appended and sent as a single text frame each time the connection is written, so a player gets one
+# frame a loop rather than one per `Player.write()`.
+###
+
+# The GUID the handshake mixes into the client's key (RFC 6455, section 1.3).
+HANDSHAKE_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Frame opcodes.
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+# Close status codes.
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+
+def encodeFrame(opcode, payload):
+    """
+    Build an unmasked, unfragmented frame, as sent by a server.
+
+    Parameters
+    ----------
+    opcode: int
+        The frame's opcode.
+    payload:    bytes
+        The frame's payload.
+
+    Returns
+    -------
+    bytes:  The encoded frame.
+    """
+
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 65536:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, 'big')
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, 'big')
+    return header + payload
+
+
+def unmask(mask, payload):
+    'Remove the client\'s masking from a frame payload.'
+
+    length = len(payload)
+    if not length:
+        return b''
+
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+
+
+class WebSocketClientSocket(ClientSocket):
+    'A client socket speaking the WebSocket protocol.'
+
+    # The longest handshake request we'll accept.
+    MAX_HANDSHAKE_LENGTH = 8192
+
+    # The longest frame payload we'll accept.  Commands are short, so anything
+    # this big is junk.
+    MAX_PAYLOAD_LENGTH = 65536
+
+    def __init__(self, socket_tuple, server):
+        super(WebSocketClientSocket, self).__init__(socket_tuple, server)
+
+        # Raw input waiting on the rest of the handshake or of a frame.
+        self.inputBuffer = bytearray()
+        self.isHandshakeComplete = False
+
+        # Whether the text received so far in the current message ended a
+        # line.
+        self.isLineEnded = True
+
+        # Encoded text waiting to go out in the next frame.  Held back until
+        # the handshake is complete.
+        self.pendingText = bytearray()
+
+    # Browsers don't speak telnet.
+    def open(self):
+        pass
+
+    def disableEcho(self):
+        pass
+
+    def enableEcho(self):
+        pass
+
+    def appendRawOutput(self, data):
+        if self.isClosed:
+            return
+
+        if self.isHandshakeComplete and not self.hasOutput():
+            self.server.watchWrite(self)
+
+        self.pendingText += data
+        self.checkCongestion()
+
+    ###
+    # Append a frame, or the handshake response, to the output buffer.  Any pending text is framed
+    # first so that output stays in order.
+    ###
+    def appendFrame(self, data):
+        if self.isClosed:
+            return
+
+        if not self.hasOutput():
+            self.server.watchWrite(self)
+
+        self.flushText()
+        self.outputBuffer += data
+
+    ###
+    # Wrap the text waiting to go out in a frame.
+    ###
+    def flushText(self):
+        if self.isHandshakeComplete and self.pendingText:
+            self.outputBuffer += encodeFrame(OPCODE_TEXT, bytes(self.pendingText))
+            self.pendingText.clear()
+
+    def outputSize(self):
+        return super(WebSocketClientSocket, self).outputSize() + len(self.pendingText)
+
+    def hasOutput(self):
+        return ((self.isHandshakeComplete and len(self.pendingText) > 0)
+                or super(WebSocketClientSocket, self).hasOutput())
+
+    def write(self):
+        self.flushText()
+        super(WebSocketClientSocket, self).write()
+
+    def receive(self, data):
+        self.inputBuffer += data
+
+        if not self.isHandshakeComplete:
+            self.handshake()
+
+        while self.isHandshakeComplete and not self.isClosed:
+            if not self.receiveFrame():
+                break
+
+    ###
+    # Answer the client's HTTP upgrade request once all of it has arrived.
+    ###
+    def handshake(self):
+        end = self.inputBuffer.find(b"\r\n\r\n")
+        if end == -1:
+            if len(self.inputBuffer) > self.MAX_HANDSHAKE_LENGTH:
+                self.reject()
+            return
+
+        request = bytes(self.inputBuffer[:end]).decode('latin-1').split("\r\n")
+        del self.inputBuffer[:end + 4]
+
+        headers = {}
+        for line in request[1:]:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+
+        key = headers.get('sec-websocket-key')
+        if (not request[0].startswith("GET ") or headers.get('upgrade', '').lower() != 'websocket'
+                or not key):
+            self.reject()
+            return
+
+        accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + HANDSHAKE_GUID).digest())
+        self.appendFrame(b"HTTP/1.1 101 Switching Protocols\r\n"
+                         b"Upgrade: websocket\r\n"
+                         b"Connection: Upgrade\r\n"
+                         b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        self.isHandshakeComplete = True
+
+    def reject(self):
+        self.appendFrame(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+        self.write()
+        self.close()
+
+    ###
+    # Process the next complete frame in the input buffer.  Returns False if there isn't one yet.
+    ###
+    def receiveFrame(self):
+        buffer = self.inputBuffer
+        if len(buffer) < 2:
+            return False
+
+        isFinal = buffer[0] & 0x80
+        opcode = buffer[0] & 0x0F
+        isMasked = buffer[1] & 0x80
+        length = buffer[1] & 0x7F
+
+        position = 2
+        if length == 126:
+            if len(buffer) < 4:
+                return False
+            length = int.from_bytes(buffer[2:4], 'big')
+            position = 4
+        elif length == 127:
+            if len(buffer) < 10:
+                return False
+            length = int.from_bytes(buffer[2:10], 'big')
+            position = 10
+
+        # Clients must mask everything they send.
+        if not isMasked:
+            self.fail(CLOSE_PROTOCOL_ERROR)
+            return False
+
+        if length > self.MAX_PAYLOAD_LENGTH:
+            self.fail(CLOSE_TOO_BIG)
+            return False
+
+        end = position + 4 + length
+        if len(buffer) < end:
+            return False
+
+        payload = unmask(bytes(buffer[position:position + 4]), bytes(buffer[position + 4:end]))
+        del buffer[:end]
+
+        if opcode in (OPCODE_TEXT, OPCODE_BINARY, OPCODE_CONTINUATION):
+            if payload:
+                self.receiveText(payload)
+                self.isLineEnded = payload.endswith(b"\n")
+
+            # A message is a line, whether or not the client ended it with a
+            # newline.
+            if isFinal and not self.isLineEnded:
+                self.receiveText(b"\n")
+                self.isLineEnded = True
+        elif opcode == OPCODE_PING:
+            self.appendFrame(encodeFrame(OPCODE_PONG, payload))
+        elif opcode == OPCODE_CLOSE:
+            self.fail(CLOSE_NORMAL)
+            return False
+
+        return True
+
+    ###
+    # Send a close frame and close the connection.
+    ###
+    def fail(self, code):
+        self.appendFrame(encodeFrame(OPCODE_CLOSE, code.to_bytes(2, 'big')))
+        self.write()
+        self.close()
+
+# End WebSocketClientSocket
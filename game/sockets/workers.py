@@ -0,0 +1,626 @@
+import multiprocessing
+import os
+import pickle
+import selectors
+import struct
+import time
+from collections import deque
+
+from game.sockets.client import ClientSocket
+from game.sockets.server import ServerSocket
+from game.sockets.timers import ConnectionTimeouts
+from game.sockets.websocket import WebSocketClientSocket
+
+###
+# Workers
+#
+# An optional multi-process front end for the game.  A number of worker processes each listen on
+# the game's port with SO_REUSEPORT, so the kernel spreads new connections between them.  The
+# workers do all of the socket I/O: telnet negotiation, compression, line framing and output
+# buffering.  They forward complete lines of input to the world process, which owns the Store and
+# runs the game loop, and write out the text the world process sends back.
+#
+# The two sides talk over a pair of one way pipes per worker, sending at most one batch of messages
+# in each direction per pass of their loops.  The world process never blocks on a worker: it
+# writes to its pipe without blocking and keeps whatever the pipe won't take until the pipe is
+# writable again.  So a worker blocked sending to the world process, while the world process has
+# output for it, can't deadlock the two; the world process still reads from the worker, and the
+# worker's send finishes.
+#
+# The world process's output for a connection is sent as (id, text, essential).  An entry with no
+# text is a control message instead, (id, None, name), naming the ClientSocket method to call on
+# the connection, eg. to turn echo off for a password.  They're kept in order with the output so
+# that they take effect where they were asked for.
+###
+
+CONTROLS = ('disableEcho', 'enableEcho')
+
+
+def runWorker(host, port, toWorld, fromWorld, limits, websocketPort=None):
+    """
+    The entry point for a worker process.
+
+    Parameters
+    ----------
+    host:   string
+        The host to listen on.
+    port:   int
+        The port to listen on.  Shared with the other workers.
+    toWorld:    multiprocessing.connection.Connection
+        The pipe to the world process.
+    fromWorld:  multiprocessing.connection.Connection
+        The pipe from the world process, read with a PipeReader.
+    limits: dict
+        Backpressure limits for the worker's ServerSocket.
+    websocketPort:  int
+        A port to accept WebSocket connections on, if any.  Also shared with
+        the other workers.
+    """
+
+    worker = ConnectionWorker(host, port, toWorld, PipeReader(fromWorld), **limits)
+    if websocketPort:
+        worker.addListener(host, websocketPort, WebSocketClientSocket, reusePort=True)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        # The world process handles shutting us down.
+        pass
+    finally:
+        if worker.isOpen:
+            worker.shutdown()
+
+
+class ConnectionWorker(ServerSocket):
+    """
+    A ServerSocket running in a worker process that hands its connections'
+    input to the world process and writes out the world's output.
+
+    Each connection is known to the world process by an ID that is unique
+    within its worker.
+    """
+
+    def __init__(self, host, port, toWorld, fromWorld, **limits):
+        super(ConnectionWorker, self).__init__(host, port, reusePort=True, **limits)
+
+        # Our ends of the pipes to and from the world process.
+        self.toWorld = toWorld
+        self.fromWorld = fromWorld
+        self.selector.register(self.fromWorld, selectors.EVENT_READ)
+        self.worldReady = False
+
+        self.ids = {}
+        self.connections = {}
+        self.nextId = 1
+
+        # Messages waiting to go to the world process.
+        self.events = []
+
+    def run(self):
+        while self.isOpen:
+            # Only wake up on a timer while there are stalled clients to check.
+            self.step(1.0 if self.stalled else None)
+
+    def step(self, timeout=None):
+        """
+        Make one pass through the worker's loop: handle socket I/O, send the
+        world process everything that happened, and take in its output.
+
+        Parameters
+        ----------
+        timeout:    float
+            How long to wait for something to happen.  None to wait
+            indefinitely.
+        """
+
+        self.poll(timeout)
+
+        self.handleReadSet()
+        self.handleWriteSet()
+        self.handleErrorSet()
+
+        if self.hasNewConnection():
+            while self.accept():
+                pass
+
+        worldReady = self.worldReady
+        self.resetPollSets()
+
+        self.evictStalledClients()
+        self.sendToWorld()
+
+        if worldReady:
+            self.receiveFromWorld()
+
+    def resetPollSets(self):
+        super(ConnectionWorker, self).resetPollSets()
+        self.worldReady = False
+
+    def poll(self, timeout=None):
+        for key, events in self.selector.select(timeout):
+            if key.fileobj in self.listeners:
+                self.newConnections = True
+            elif key.fileobj is self.fromWorld:
+                self.worldReady = True
+            else:
+                if events & selectors.EVENT_READ:
+                    self.readable.append(key.fileobj)
+                if events & selectors.EVENT_WRITE:
+                    self.writeable.append(key.fileobj)
+
+    def handleReadSet(self):
+        while self.readable:
+            client = self.readable.pop()
+            if client.isClosed:
+                continue
+
+            client.read()
+            if client.hasInput() and client in self.ids:
+                self.events.append(('input', self.ids[client], list(client.inputQueue)))
+                client.inputQueue.clear()
+
+    def accept(self):
+        client = super(ConnectionWorker, self).accept()
+        if client:
+            id = self.nextId
+            self.nextId += 1
+
+            self.ids[client] = id
+            self.connections[id] = client
+            self.events.append(('open', id, client.address))
+        return client
+
+    def remove(self, client):
+        super(ConnectionWorker, self).remove(client)
+
+        # Let the world process know, unless it's the one that closed it.
+        id = self.ids.pop(client, None)
+        if id is not None:
+            del self.connections[id]
+            self.events.append(('close', id))
+
+    def sendToWorld(self):
+        if self.events:
+            self.toWorld.send((self.events, self.droppedOutput, self.evictedClients))
+            self.events = []
+
+    def receiveFromWorld(self):
+        try:
+            messages = self.fromWorld.receive()
+        except EOFError:
+            # The world process is gone.
+            self.shutdown()
+            return
+
+        for message in messages:
+            if not self.isOpen:
+                return
+
+            if message is None:
+                self.shutdown()
+                return
+
+            output, closed = message
+            for id, text, essential in output:
+                client = self.connections.get(id)
+                if client is None:
+                    continue
+
+                if text is not None:
+                    client.appendToOutputBuffer(text, essential)
+                elif essential in CONTROLS:
+                    getattr(client, essential)()
+
+            for id in closed:
+                client = self.connections.pop(id, None)
+                if client:
+                    del self.ids[client]
+                    client.write()
+                    client.close()
+
+    def shutdown(self):
+        self.selector.unregister(self.fromWorld)
+        super(ConnectionWorker, self).shutdown()
+        self.toWorld.close()
+        self.fromWorld.close()
+
+
+class PipeWriter:
+    """
+    The world process's end of the pipe to a worker.  Writes never block:
+    whatever the pipe won't take is kept, and written by `flush()` once the
+    pipe is writable again.
+
+    Each message is pickled and framed with its length, for a PipeReader on
+    the other end.
+    """
+
+    HEADER = struct.Struct('>I')
+
+    def __init__(self, connection):
+        # The connection only carries the pipe to the worker; we write to it
+        # ourselves, since Connection.send() can't be done without blocking.
+        self.connection = connection
+        os.set_blocking(self.connection.fileno(), False)
+        self.buffer = bytearray()
+
+    def send(self, message):
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        self.buffer += self.HEADER.pack(len(data))
+        self.buffer += data
+        self.flush()
+
+    def flush(self):
+        'Write as much of the buffer as the pipe will take.'
+
+        while self.buffer:
+            try:
+                written = os.write(self.connection.fileno(), self.buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except BrokenPipeError:
+                # The worker is gone, and its output with it.
+                self.buffer.clear()
+                return
+            del self.buffer[:written]
+
+    def hasOutput(self):
+        return len(self.buffer) > 0
+
+    def fileno(self):
+        return self.connection.fileno()
+
+    def close(self):
+        self.connection.close()
+
+
+class PipeReader:
+    """
+    The worker's end of the pipe from the world process.  Reads the messages
+    framed by a PipeWriter without blocking.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        os.set_blocking(self.connection.fileno(), False)
+        self.buffer = bytearray()
+
+    def receive(self):
+        """
+        Read whatever is waiting in the pipe.
+
+        Returns
+        -------
+        list:   The messages that have arrived whole.  Any partial message is
+            kept until the rest of it arrives.
+
+        Raises
+        ------
+        EOFError:   If the world process has closed its end of the pipe.
+        """
+
+        while True:
+            try:
+                data = os.read(self.connection.fileno(), 65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not data:
+                raise EOFError()
+            self.buffer += data
+
+        messages = []
+        offset = 0
+        while len(self.buffer) - offset >= PipeWriter.HEADER.size:
+            length, = PipeWriter.HEADER.unpack_from(self.buffer, offset)
+            end = offset + PipeWriter.HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            messages.append(pickle.loads(self.buffer[offset + PipeWriter.HEADER.size:end]))
+            offset = end
+        del self.buffer[:offset]
+        return messages
+
+    def fileno(self):
+        return self.connection.fileno()
+
+    def close(self):
+        self.connection.close()
+
+
+class WorkerProcess:
+    'The world process side of a worker process.'
+
+    def __init__(self, host, port, limits, websocketPort=None):
+        self.connection, to_world = multiprocessing.Pipe(duplex=False)
+        from_world, to_worker = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=runWorker,
+                                               args=(host, port, to_world, from_world, limits, websocketPort),
+                                               daemon=True)
+        self.process.start()
+        to_world.close()
+        from_world.close()
+
+        self.writer = PipeWriter(to_worker)
+
+        # Cleared once the worker is found to have died.
+        self.alive = True
+
+        # Output and closes waiting to go to the worker, and its counters.
+        self.output = []
+        self.closed = []
+        self.droppedOutput = 0
+        self.evictedClients = 0
+
+        self.clients = {}
+
+    def flush(self):
+        if self.output or self.closed:
+            self.writer.send((self.output, self.closed))
+            self.output = []
+            self.closed = []
+        else:
+            self.writer.flush()
+
+    def fileno(self):
+        return self.connection.fileno()
+
+
+class RemoteClientSocket:
+    """
+    Stands in, in the world process, for a connection held by a worker
+    process.  Provides the parts of the ClientSocket interface that Player and
+    the game loop use.
+    """
+
+    def __init__(self, server, worker, id, address):
+        self.server = server
+        self.worker = worker
+        self.id = id
+        self.address = address
+
+        self.inputQueue = deque()
+        self.droppedInput = 0
+        self.output = []
+
+        self.player = None
+        self.isClosed = False
+
+        self.connectedAt = time.monotonic()
+        self.lastActivity = self.connectedAt
+
+    def receive(self, lines):
+        # The worker hands over its lines as they arrive, so the queue has to
+        # be capped here as well.
+        space = ClientSocket.MAX_INPUT_QUEUE - len(self.inputQueue)
+        if len(lines) > space:
+            self.droppedInput += len(lines) - max(space, 0)
+            lines = lines[:max(space, 0)]
+
+        self.inputQueue.extend(lines)
+        self.lastActivity = time.monotonic()
+        if lines and self.player:
+            self.player.prompt.is_needed = True
+
+    def appendToOutputBuffer(self, output, essential=True):
+        if not output or self.isClosed:
+            return
+
+        if not self.output:
+            self.server.watchWrite(self)
+        self.output.append((self.id, output, essential))
+
+    def control(self, name):
+        if self.isClosed:
+            return
+
+        if not self.output:
+            self.server.watchWrite(self)
+        self.output.append((self.id, None, name))
+
+    def hasOutput(self):
+        return len(self.output) > 0
+
+    def hasInput(self):
+        return self.inputQueue
+
+    def disableEcho(self):
+        self.control('disableEcho')
+
+    def enableEcho(self):
+        self.control('enableEcho')
+
+    def popInput(self):
+        return self.inputQueue.popleft()
+
+    # Hand our output off to the worker, which will send it with the rest of
+    # its batch.
+    def write(self):
+        if self.output:
+            self.worker.output.extend(self.output)
+            self.output = []
+
+            if self.player and self.player.prompt.is_in_buffer:
+                self.player.prompt.is_needed = False
+                self.player.prompt.is_in_buffer = False
+
+    def timeOut(self):
+        self.appendToOutputBuffer("\nYou have been idle for too long.  Goodbye!\n")
+        self.close()
+
+    def close(self):
+        if self.isClosed:
+            return
+
+        self.write()
+        self.isClosed = True
+        self.worker.closed.append(self.id)
+        self.server.remove(self)
+
+    # The worker has closed the connection.
+    def closed(self):
+        if not self.isClosed:
+            self.isClosed = True
+            self.server.remove(self)
+
+
+class WorkerServerSocket:
+    """
+    Provides the ServerSocket interface the game loop uses, backed by a pool of
+    worker processes that hold the actual connections.
+
+    Polling waits on the pipes to the workers, rather than on sockets.  Idle
+    and login timeouts are kept here, since only the world process knows
+    whether a connection has logged in.
+    """
+
+    def __init__(self, host, port, workers=2, websocketPort=None, idleTimeout=ServerSocket.IDLE_TIMEOUT,
+                 loginTimeout=ServerSocket.LOGIN_TIMEOUT, **limits):
+        self.workers = [WorkerProcess(host, port, limits, websocketPort) for index in range(workers)]
+
+        self.selector = selectors.DefaultSelector()
+        for worker in self.workers:
+            self.selector.register(worker, selectors.EVENT_READ)
+
+        self.isOpen = True
+
+        self.clients = []
+        self.pending = deque()
+        self.writing = []
+
+        # The pipes to workers that have output waiting for the pipe to be
+        # writable.
+        self.blocked = set()
+
+        self.timeouts = ConnectionTimeouts(idleTimeout, loginTimeout)
+        self.timedOutClients = 0
+
+    @property
+    def droppedOutput(self):
+        return sum(worker.droppedOutput for worker in self.workers)
+
+    @property
+    def evictedClients(self):
+        return sum(worker.evictedClients for worker in self.workers)
+
+    def resetPollSets(self):
+        pass
+
+    def poll(self, timeout=None):
+        ready = self.selector.select(timeout)
+        for key, events in ready:
+            if isinstance(key.fileobj, PipeWriter):
+                key.fileobj.flush()
+                self.watchPipe(key.fileobj)
+            else:
+                self.receiveFromWorker(key.fileobj)
+        return len(ready) > 0
+
+    # Wait for the pipe to a worker to be writable only while it has output waiting.
+    def watchPipe(self, writer):
+        if writer.hasOutput() and writer not in self.blocked:
+            self.selector.register(writer, selectors.EVENT_WRITE)
+            self.blocked.add(writer)
+        elif not writer.hasOutput() and writer in self.blocked:
+            self.selector.unregister(writer)
+            self.blocked.discard(writer)
+
+    def receiveFromWorker(self, worker):
+        while worker.connection.poll():
+            try:
+                events, worker.droppedOutput, worker.evictedClients = worker.connection.recv()
+            except EOFError:
+                # The worker died, taking its connections with it.
+                worker.alive = False
+                self.selector.unregister(worker)
+                for client in list(worker.clients.values()):
+                    client.closed()
+                worker.clients = {}
+                return
+
+            for event in events:
+                if event[0] == 'open':
+                    id, address = event[1:]
+                    client = RemoteClientSocket(self, worker, id, address)
+                    worker.clients[id] = client
+                    self.clients.append(client)
+                    self.pending.append(client)
+                    self.timeouts.add(client)
+                elif event[0] == 'input':
+                    id, lines = event[1:]
+                    if id in worker.clients:
+                        worker.clients[id].receive(lines)
+                elif event[0] == 'close':
+                    client = worker.clients.pop(event[1], None)
+                    if client:
+                        client.closed()
+
+    def handleReadSet(self):
+        pass
+
+    def handleWriteSet(self):
+        writing = self.writing
+        self.writing = []
+        for client in writing:
+            if not client.isClosed:
+                client.write()
+
+        for worker in self.workers:
+            if worker.alive:
+                worker.flush()
+                self.watchPipe(worker.writer)
+
+    def handleErrorSet(self):
+        pass
+
+    def hasNewConnection(self):
+        return len(self.pending) > 0
+
+    def accept(self):
+        while self.pending:
+            client = self.pending.popleft()
+            if not client.isClosed:
+                return client
+        return None
+
+    def watchWrite(self, client):
+        self.writing.append(client)
+
+    def unwatchWrite(self, client):
+        pass
+
+    # Backpressure is handled by the workers, but make sure they're still
+    # running.  One that's died is normally found by its pipe closing, see
+    # receiveFromWorker().
+    def evictStalledClients(self):
+        for worker in self.workers:
+            if worker.alive and not worker.process.is_alive():
+                worker.alive = False
+
+    def expireIdleClients(self):
+        for client in self.timeouts.expire():
+            client.timeOut()
+            self.timedOutClients += 1
+
+    def remove(self, client):
+        client.worker.clients.pop(client.id, None)
+        self.timeouts.remove(client)
+        self.clients.remove(client)
+
+    def shutdown(self):
+        for worker in self.workers:
+            try:
+                worker.flush()
+                worker.writer.send(None)
+            except OSError:
+                pass
+
+        for worker in self.workers:
+            worker.process.join(1)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.connection.close()
+            worker.writer.close()
+
+        self.selector.close()
+        self.isOpen = False
+
+# End WorkerServerSocket
@@ -0,0 +1,143 @@
+class StorageError(Exception):
+    """
+    Raised when some of a batch of models couldn't be saved.
+
+    Attributes
+    ----------
+    failed: list
+        The `(kind, id)` of each model that wasn't saved.
+    """
+
+    def __init__(self, message, failed):
+        super(StorageError, self).__init__(message)
+        self.failed = failed
+
+
+class StorageBackend:
+    """
+    Where the Store loads models from and saves them to.
+
+    Models are stored as the json produced by their `toJson()`, grouped by
+    kind and keyed by id.  The kinds are the Store's repositories: `items`,
+    `npcs`, `characters`, `accounts` and `rooms`.  Rooms, and the world itself,
+    belong to the world named by `world`.
+
+    Backends are used from both the game thread, for loading, and the
+    write-behind thread, for saving.
+    """
+
+    KINDS = ('items', 'npcs', 'characters', 'accounts', 'rooms')
+
+    def __init__(self, world):
+        """
+        Parameters
+        ----------
+        world:  string
+            The name of the game world whose rooms we store.
+        """
+
+        self.world = world
+
+    def loadWorld(self):
+        """
+        Returns
+        -------
+        dict:   The world's json.
+        """
+
+        raise NotImplementedError()
+
+    def saveWorld(self, data):
+        raise NotImplementedError()
+
+    def load(self, kind):
+        """
+        Load every model of a kind.
+
+        Parameters
+        ----------
+        kind:   string
+            One of `KINDS`.
+
+        Returns
+        -------
+        iterable<dict>: Each model's json.
+        """
+
+        raise NotImplementedError()
+
+    def loadOne(self, kind, id):
+        """
+        Load a single model.
+
+        Parameters
+        ----------
+        kind:   string
+            One of `KINDS`.
+        id: string or int
+            The model's id.
+
+        Returns
+        -------
+        dict:   The model's json, or None if there's no such model.
+        """
+
+        raise NotImplementedError()
+
+    def saveMany(self, records):
+        """
+        Save a batch of models.
+
+        Parameters
+        ----------
+        records:    list<tuple>
+            A `(kind, id, data)` tuple for each model, where `data` is its json.
+
+        Raises
+        ------
+        StorageError
+            If any of the models couldn't be saved.  The rest are.
+        """
+
+        raise NotImplementedError()
+
+    def save(self, kind, id, data):
+        self.saveMany([(kind, id, data)])
+
+    def close(self):
+        pass
+
+
+def modelId(kind, data):
+    'The id of a model of `kind`, from its json.'
+
+    if kind == 'rooms':
+        return data['id']
+    return data['name']
+
+
+def copyStorage(source, destination):
+    """
+    Copy the world and every model from one backend to another, eg. to import
+    the json data directory into a database or export it back out.
+
+    Parameters
+    ----------
+    source: StorageBackend
+        The backend to copy from.
+    destination:    StorageBackend
+        The backend to copy to.
+
+    Returns
+    -------
+    dict:   How many models of each kind were copied.
+    """
+
+    destination.saveWorld(source.loadWorld())
+
+    counts = {}
+    for kind in StorageBackend.KINDS:
+        records = [(kind, modelId(kind, data), data) for data in source.load(kind)]
+        destination.saveMany(records)
+        counts[kind] = len(records)
+    return counts
@@ -0,0 +1,130 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from game.store.backends.backend import StorageBackend
+from game.store.backends.backend import StorageError
+
+
+def readFiles(paths):
+    'Parse a batch of json files.  Run in the loading pool\'s processes.'
+
+    result = []
+    for path in paths:
+        with open(path, 'r') as file:
+            result.append(json.load(file))
+    return result
+
+
+class FileBackend(StorageBackend):
+    """
+    Stores each model as its own json file in the data directory:
+
+        data/worlds/<world>/world.json
+        data/worlds/<world>/rooms/<id>.json
+        data/characters/<name>.json
+        data/accounts/<name>.json
+        data/items/**/<name>.json
+        data/npcs/**/<name>.json
+
+    This is the layout the world generator writes and the other tools read.
+    Items and NPCs may be organized into subdirectories, though then
+    `loadOne()` won't find them.  Files are written to
+    a temporary file which is renamed into place, so a crash never leaves a
+    half written file behind.
+    """
+
+    # Kinds whose files may be in subdirectories.
+    RECURSIVE = ('items', 'npcs')
+
+    # How many files each of the loading pool's tasks parses.
+    BATCH_SIZE = 256
+
+    def __init__(self, data_directory, world, fsync=False, workers=0):
+        """
+        Parameters
+        ----------
+        data_directory: string
+            The path to the data directory.
+        world:  string
+            The name of the game world whose rooms we store.
+        fsync:  boolean
+            Flush each file to disk before renaming it into place.  Slower,
+            but the save survives a power failure, not just a crash.
+        workers:    int
+            Parse files in a pool of this many processes when loading.  Only
+            worth it with several cores and thousands of files, since the
+            parsed json has to be sent back to us.  0 parses them here.
+        """
+
+        super(FileBackend, self).__init__(world)
+        self.data_directory = data_directory
+        self.fsync = fsync
+        self.workers = workers
+
+    def directory(self, kind):
+        if kind == 'rooms':
+            return os.path.join(self.data_directory, 'worlds', self.world, 'rooms')
+        return os.path.join(self.data_directory, kind)
+
+    def path(self, kind, id):
+        return os.path.join(self.directory(kind), str(id) + '.json')
+
+    def paths(self, kind):
+        if kind in self.RECURSIVE:
+            return glob.glob(os.path.join(self.directory(kind), '**', '*.json'), recursive=True)
+        return glob.glob(os.path.join(self.directory(kind), '*.json'))
+
+    def loadWorld(self):
+        return self.read(os.path.join(self.data_directory, 'worlds', self.world, 'world.json'))
+
+    def saveWorld(self, data):
+        self.write(os.path.join(self.data_directory, 'worlds', self.world, 'world.json'), data)
+
+    def load(self, kind):
+        paths = self.paths(kind)
+        if self.workers < 2 or len(paths) <= self.BATCH_SIZE:
+            return readFiles(paths)
+
+        batches = [paths[start:start + self.BATCH_SIZE] for start in range(0, len(paths), self.BATCH_SIZE)]
+        with ProcessPoolExecutor(self.workers) as pool:
+            return [data for batch in pool.map(readFiles, batches) for data in batch]
+
+    def loadOne(self, kind, id):
+        try:
+            return self.read(self.path(kind, id))
+        except FileNotFoundError:
+            return None
+
+    def read(self, path):
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def saveMany(self, records):
+        failed = []
+        for kind, id, data in records:
+            try:
+                self.write(self.path(kind, id), data)
+            except (OSError, TypeError, ValueError) as error:
+                print("Error! Failed to save %s %s: %s" % (kind, id, error))
+                failed.append((kind, id))
+
+        if failed:
+            raise StorageError("Failed to save %d of %d models." % (len(failed), len(records)), failed)
+
+    def write(self, path, data):
+        temporary = path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(temporary, 'w') as file:
+                json.dump(data, file)
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import threading
+
+from game.store.backends.backend import StorageBackend
+from game.store.backends.backend import StorageError
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores every model as a row of a single SQLite table, keyed by kind and
+    id, with the model's json as the value.
+
+    The database is opened in WAL mode, so that saving doesn't block reading,
+    with `synchronous=NORMAL`, which is still crash safe in WAL mode.  Each
+    batch of saves is written in one transaction with a single prepared
+    statement, rather than as one file per model.
+
+    Rooms and the world are stored under `worlds/<world>/rooms` and
+    `worlds`, the same as their paths in the data directory, so one database
+    can hold several worlds.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS models (
+            kind TEXT NOT NULL,
+            id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (kind, id)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path, world):
+        """
+        Parameters
+        ----------
+        path:   string
+            The path to the database file.  It's created if it doesn't exist.
+        world:  string
+            The name of the game world whose rooms we store.
+        """
+
+        super(SQLiteBackend, self).__init__(world)
+        self.path = path
+
+        # The connection is shared by the game thread and the write-behind
+        # thread, one at a time.  We manage transactions ourselves.
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(self.SCHEMA)
+
+    def scope(self, kind):
+        if kind == 'rooms':
+            return 'worlds/%s/rooms' % self.world
+        return kind
+
+    def loadWorld(self):
+        with self.lock:
+            row = self.connection.execute('SELECT data FROM models WHERE kind = ? AND id = ?',
+                                          ('worlds', self.world)).fetchone()
+        if row is None:
+            raise FileNotFoundError("No world '%s' in %s." % (self.world, self.path))
+        return json.loads(row[0])
+
+    def saveWorld(self, data):
+        self.saveRows([('worlds', self.world, json.dumps(data))])
+
+    def load(self, kind):
+        with self.lock:
+            rows = self.connection.execute('SELECT data FROM models WHERE kind = ?', (self.scope(kind),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def loadOne(self, kind, id):
+        with self.lock:
+            row = self.connection.execute('SELECT data FROM models WHERE kind = ? AND id = ?',
+                                          (self.scope(kind), str(id))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def saveMany(self, records):
+        rows = []
+        failed = []
+        for kind, id, data in records:
+            try:
+                rows.append((self.scope(kind), str(id), json.dumps(data)))
+            except (TypeError, ValueError) as error:
+                print("Error! Failed to save %s %s: %s" % (kind, id, error))
+                failed.append((kind, id))
+
+        try:
+            self.saveRows(rows)
+        except sqlite3.Error as error:
+            print("Error! Failed to save %d models: %s" % (len(rows), error))
+            failed = [(kind, id) for kind, id, data in records]
+
+        if failed:
+            raise StorageError("Failed to save %d of %d models." % (len(failed), len(records)), failed)
+
+    def saveRows(self, rows):
+        with self.lock:
+            self.connection.execute('BEGIN')
+            try:
+                self.connection.executemany('INSERT OR REPLACE INTO models (kind, id, data) VALUES (?, ?, ?)', rows)
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -16,7 +16,6 @@ class Account(NamedModel):
     def addCharacter(self, character):
         self.characters[character.name] = character
         character.account = self
-        self.save('data/accounts/')
         return self
 
     def setPassword(self, password):
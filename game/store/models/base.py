@@ -1,8 +1,34 @@
+import functools
 import os
 import json
 
 
+@functools.lru_cache(maxsize=None)
+def slotNames(klass):
+    'The names of every slot of `klass` and its bases.'
+
+    return tuple(name for base in klass.__mro__ for name in vars(base).get('__slots__', ()))
+
+
+def slotValues(model):
+    'The values of the slots that are set on `model` itself, by name.'
+
+    values = {}
+    for name in slotNames(type(model)):
+        try:
+            values[name] = object.__getattribute__(model, name)
+        except AttributeError:
+            pass
+    return values
+
+
 class JsonSerializable:
+    # There's a model for every room, item and character in the game, so
+    # models list their attributes in __slots__ rather than each carrying a
+    # __dict__.  A subclass that doesn't declare __slots__ gets a __dict__
+    # again, so every subclass declares them, even if they're empty.
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -13,11 +39,132 @@ class JsonSerializable:
         return self 
 
 
+class Flyweight:
+    """
+    A mixin for models whose instances share their prototype's data.
+
+    An instance made with `instance()` starts out empty and reads any
+    attribute it doesn't have from its prototype.  Setting an attribute sets
+    it on the instance alone, so the prototype, and every other instance, is
+    left as it was.  Anything an instance will change in place, like a list,
+    must be given its own copy in `instance()`.
+
+    Flyweights must have a `prototype` slot.
+
+    An instance is pickled with only what's set on it, and its prototype, so
+    it's still an instance when it's unpickled.
+
+    Attributes
+    ----------
+    prototype:  Flyweight
+        The model the instance was made from.  Only set on instances.
+    """
+
+    __slots__ = ()
+
+    def instance(self):
+        'Create an instance of the model, with the model as its prototype.'
+
+        instance = object.__new__(type(self))
+        instance.prototype = self
+        return instance
+
+    def __getattr__(self, name):
+        # Only called for attributes the instance doesn't have itself.
+        try:
+            prototype = object.__getattribute__(self, 'prototype')
+        except AttributeError:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name)) from None
+        return getattr(prototype, name)
+
+    def __getstate__(self):
+        # Pickle's default would read every slot, including the ones that
+        # fall through to the prototype.
+        return (None, slotValues(self))
+
+
+class Column:
+    """
+    A model attribute that can be moved into a column of a table shared with
+    other models of the same kind, so that it can be operated on for all of
+    them at once.  Until the model is attached to a table the value is kept
+    on the model.
+
+    Table columns are arrays of floats.  Values that are whole numbers are
+    handed back as ints, as they would have been stored on the model.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if instance.table is None:
+            return instance.values[self.name]
+
+        value = instance.table.columns[self.name].item(instance.row)
+        return int(value) if value.is_integer() else float(value)
+
+    def __set__(self, instance, value):
+        if instance.table is None:
+            instance.values[self.name] = value
+        else:
+            instance.table.columns[self.name][instance.row] = value
+
+
+class TableRow(JsonSerializable):
+    """
+    A model with Columns, which may be attached to a row of a table.
+
+    Attributes
+    ----------
+    table:  object
+        The table the model's Columns are stored in, or None.  It must have a
+        `columns` dictionary of arrays, keyed by column name.
+    row:    int
+        The model's row in `table`.
+    """
+
+    __slots__ = ('table', 'row', 'values')
+
+    def __init__(self):
+        self.table = None
+        self.row = None
+        self.values = {}
+
+    @classmethod
+    def columns(cls):
+        'The names of the model\'s Columns.'
+
+        return [name for klass in cls.__mro__ for name, value in vars(klass).items() if isinstance(value, Column)]
+
+    def attach(self, table, row):
+        """
+        Move the model's Columns into `row` of `table`.
+        """
+
+        values = {name: getattr(self, name) for name in self.columns()}
+        self.table = table
+        self.row = row
+        self.values = {}
+        for name, value in values.items():
+            setattr(self, name, value)
+        return self
+
+
 class Model(JsonSerializable):
 
+    __slots__ = ('id', 'version', 'saved_version')
+
     def __init__(self):
         self.id = ''  
 
+        # Bumped by `markDirty()` whenever the model changes, so that we only
+        # save models that have changed since they were last saved.
+        self.version = 0
+        self.saved_version = 0
+
     def getId(self):
         return self.id
 
@@ -25,18 +172,37 @@ class Model(JsonSerializable):
         self.id = id
         return self
 
-    def save(self, base_path='data/'):
-        if not os.path.exists(base_path):
-            os.mkdir(base_path)
+    def markDirty(self):
+        'Record that the model has changed and needs saving.'
+
+        self.version += 1
+        return self
+
+    def isDirty(self):
+        return self.version != self.saved_version
+
+    def markClean(self):
+        'Record that the model has been saved, as it is now.'
+
+        self.saved_version = self.version
+        return self
+
+    def getPath(self, base_path='data/'):
+        'The path to the file the model is saved in, under `base_path`.'
 
-        filename = ''
         if isinstance(self.id, int):
-            filename = base_path + str(self.id) + '.json'
+            return base_path + str(self.id) + '.json'
         elif isinstance(self.id, str):
-            filename = base_path + self.id + '.json'
+            return base_path + self.id + '.json'
         else:
             raise TypeError('Invalid id type.')
 
+    def save(self, base_path='data/'):
+        if not os.path.exists(base_path):
+            os.mkdir(base_path)
+
+        filename = self.getPath(base_path)
+
         file = open(filename, 'w')
         try:
             json.dump(self.toJson(), file)    
@@ -57,6 +223,8 @@ class Model(JsonSerializable):
 
 class NamedModel(Model):
 
+    __slots__ = ('name',)
+
     def __init__(self):
         super(NamedModel, self).__init__()
         self.name = ''
@@ -1,10 +1,21 @@
 from game.store.models.base import NamedModel
 from game.store.models.base import JsonSerializable
+from game.store.models.base import Column
+from game.store.models.base import TableRow
+from game.store.models.room import Room
 
 
-class Attributes(JsonSerializable):
+class Attributes(TableRow):
+
+    __slots__ = ('strength', 'max_strength', 'constitution', 'max_constitution')
+
+    # Reserves depend on stamina, so it's kept in the ReservesTable with them.
+    stamina = Column()
+    max_stamina = Column()
 
     def __init__(self):
+        super(Attributes, self).__init__()
+
         # The character's strength. Controls:
         # - How much damage the character does in combat or harvesting.
         # - How much the character can lift and carry.
@@ -48,10 +59,33 @@ class Attributes(JsonSerializable):
         return self
 
 
-class Reserves(JsonSerializable):
-    'Represents a characters reserves: how well fed and well rested they are.'
+class Reserves(TableRow):
+    """
+    Represents a characters reserves: how well fed and well rested they are.
+
+    The reserves of the characters in the game are kept in the store's
+    ReservesTable, so that they can be drained and recovered for all of them
+    at once.
+    """
+
+    # Every reserve is a Column, kept in TableRow's values until the
+    # character is attached to the table.
+    __slots__ = ()
+
+    calories = Column()
+    max_calories = Column()
+    thirst = Column()
+    max_thirst = Column()
+    sleep = Column()
+    max_sleep = Column()
+    wind = Column()
+    max_wind = Column()
+    energy = Column()
+    max_energy = Column()
 
     def __init__(self):
+        super(Reserves, self).__init__()
+
         # Calories measure how many calories of food you have stored in your
         # body. Calories can go negative to indicate that you are starving.
         self.calories = 2400
@@ -235,6 +269,8 @@ class Reserves(JsonSerializable):
 
 class Wound(JsonSerializable):
 
+    __slots__ = ('type', 'bleed', 'infected', 'pain')
+
     WOUND_SCRAPED = 'scraped'
 
     WOUND_CUT = 'cut'
@@ -281,6 +317,8 @@ class Wound(JsonSerializable):
 
 class Body(JsonSerializable):
 
+    __slots__ = ('wounds', 'worn', 'body_parts')
+
     def __init__(self):
         self.wounds = {}
         self.worn = {}
@@ -327,6 +365,8 @@ class Body(JsonSerializable):
 
 class QuadrapedalBody(Body):
 
+    __slots__ = ()
+
     # Body Parts 
     BODY_HEAD = 'head'
     BODY_NECK = 'neck'
@@ -372,6 +412,8 @@ class QuadrapedalBody(Body):
 
 class BipedalBody(Body):
 
+    __slots__ = ()
+
     # Body Parts 
     BODY_HEAD = 'head'
 
@@ -424,6 +466,9 @@ class BipedalBody(Body):
 class Character(NamedModel):
     'Represents a single character in the game.'
 
+    __slots__ = ('is_player_character', 'description', 'details', 'sex', 'position', 'speed', 'attributes',
+                 'reserves', 'body_type', 'body', 'inventory', 'action', 'action_data', 'action_time', 'room')
+
     SEX_MALE = 'male'
     SEX_FEMALE = 'female'
 
@@ -487,8 +532,11 @@ class Character(NamedModel):
         for item in self.inventory:
             data['inventory'].append(item.getId())
 
-        if self.room:
+        # Out of the game, room is the id of the room the character left from.
+        if isinstance(self.room, Room):
             data['room'] = self.room.getId()
+        elif self.room:
+            data['room'] = self.room
 
         return data
 
@@ -539,6 +587,8 @@ class Character(NamedModel):
 
 class PlayerCharacter(Character):
 
+    __slots__ = ('account', 'player')
+
     def __init__(self):
         super(PlayerCharacter, self).__init__()
 
@@ -1,3 +1,4 @@
+from game.store.models.base import Flyweight
 from game.store.models.base import JsonSerializable
 from game.store.models.base import NamedModel
 
@@ -5,6 +6,8 @@ from game.store.models.base import NamedModel
 class HarvestProduct(JsonSerializable):
     'A product from an item that can be harvested.'
 
+    __slots__ = ('product', 'amount')
+
     def __init__(self):
         self.product = None
         self.amount = 0
@@ -16,16 +19,23 @@ class HarvestProduct(JsonSerializable):
         return self.fromJson(data)
 
     def toJson(self):
-        return self.__dict__
+        data = {}
+        data['product'] = self.product
+        data['amount'] = self.amount
+        return data
 
     def fromJson(self, data):
-        self.__dict__ = data
+        self.product = data['product']
+        self.amount = data['amount']
         return self
 
 
-class Harvestable(JsonSerializable):
+class Harvestable(Flyweight, JsonSerializable):
     'An item that can be harvested.'
 
+    __slots__ = ('prototype', 'products', 'harvest_time', 'pre_description', 'post_description', 'consumed',
+                 'replaced_with', 'calories', 'time', 'action', 'required_tools', 'harvested')
+
     def __init__(self):
 
         self.products = []
@@ -111,6 +121,8 @@ class Harvestable(JsonSerializable):
 class Food(JsonSerializable):
     'A food that can be eaten for calories.'
 
+    __slots__ = ('calories',)
+
     def __init__(self):
         self.calories = 0
 
@@ -121,16 +133,20 @@ class Food(JsonSerializable):
         return self.fromJson(data)
 
     def toJson(self):
-        return self.__dict__
+        data = {}
+        data['calories'] = self.calories
+        return data
 
     def fromJson(self, data):
-        self.__dict__ = data
+        self.calories = data['calories']
         return self
 
 
 class Material(JsonSerializable):
     'A material that can be used for crafting.'
 
+    __slots__ = ('types',)
+
     def __init__(self):
         # An array of types this material fulfils 
         self.types = [] 
@@ -154,6 +170,8 @@ class Material(JsonSerializable):
 class Tool(JsonSerializable):
     'A tool that can be used for crafting.'
 
+    __slots__ = ('type',)
+
     def __init__(self):
         # The an array of types this tool fulfills. 
         self.type = [] 
@@ -177,6 +195,8 @@ class Tool(JsonSerializable):
 class RequiredMaterial(JsonSerializable):
     'A material requirement for crafting'
 
+    __slots__ = ('type', 'weight', 'length', 'width', 'height')
+
     def __init__(self):
         # The types of material required.  All of the types listed must be
         # included by the material.  For example, if the requiredMartial types
@@ -223,6 +243,8 @@ class RequiredMaterial(JsonSerializable):
 class Craftable(JsonSerializable):
     'An object that may be crafted.'
 
+    __slots__ = ('requiredMaterials', 'requiredTools')
+
     def __init__(self):
 
         # The materials that are required to craft this object.
@@ -260,6 +282,8 @@ class Craftable(JsonSerializable):
 class MeleeWeapon(JsonSerializable):
     'Contains the properties of a melee weapon.  Composable into an Item to give it the use as a Melee Weapon.'
 
+    __slots__ = ('minDamage', 'maxDamage', 'type')
+
     SLASHING = 'slashing'
     CRUSHING = 'crushing'
     HACKING = 'hacking'
@@ -293,16 +317,24 @@ class MeleeWeapon(JsonSerializable):
         return self.fromJson(data)
 
     def toJson(self):
-        return self.__dict__
+        data = {}
+        data['minDamage'] = self.minDamage
+        data['maxDamage'] = self.maxDamage
+        data['type'] = self.type
+        return data
 
     def fromJson(self, data):
-        self.__dict__ = data
+        self.minDamage = data['minDamage']
+        self.maxDamage = data['maxDamage']
+        self.type = data['type']
         return self
 
 
 class Wearable(JsonSerializable):
     'Contains the properties of a wearable item.  Composable into an Item to make it Wearable.'
 
+    __slots__ = ('location', 'warmth', 'armor')
+
     HANDS = 'hands'
     FOREARMS = 'forearms'
     TORSO = 'torso'
@@ -344,16 +376,24 @@ class Wearable(JsonSerializable):
         return self.fromJson(data)
 
     def toJson(self):
-        return self.__dict__
+        data = {}
+        data['location'] = self.location
+        data['warmth'] = self.warmth
+        data['armor'] = self.armor
+        return data
 
     def fromJson(self, data):
-        self.__dict__ = data
+        self.location = data['location']
+        self.warmth = data['warmth']
+        self.armor = data['armor']
         return self
 
 
-class Container(JsonSerializable):
+class Container(Flyweight, JsonSerializable):
     'Provides the properties of items that are containers.  Composable into an Item to make it a Container.'
 
+    __slots__ = ('prototype', 'contents', 'volume', 'weightLimit')
+
     def __init__(self):
 
         # An array of items currently contained with in the container.
@@ -365,6 +405,11 @@ class Container(JsonSerializable):
         # The weight the container can hold in kilograms.
         self.weightLimit = 0
 
+    def instance(self):
+        instance = super(Container, self).instance()
+        instance.contents = []
+        return instance
+
     def toPrototypeJson(self):
         json = {}
         json['volume'] = self.volume
@@ -383,14 +428,30 @@ class Container(JsonSerializable):
         json['contents'] = []
         for item in self.contents:
             json['contents'].append(item.toJson())
+        return json
 
     def fromJson(self, data):
-        self.__dict__ = data
+        self.volume = data['volume']
+        self.weightLimit = data['weightLimit']
+        self.contents = [Item().fromJson(item) for item in data.get('contents', [])]
         return self
 
 
-class Item(NamedModel):
-    'Represents an item in a game.'
+class Item(Flyweight, NamedModel):
+    """
+    Represents an item in a game.
+
+    The items in the game world are instances of the prototypes in the store.
+    They share their prototype's descriptions, keywords and traits, and only
+    hold what's changed on them.  Traits that hold state of their own, in
+    STATEFUL_TRAITS, are instances of the prototype's traits in turn.
+    """
+
+    # Traits with state that belongs to each item, rather than its prototype.
+    STATEFUL_TRAITS = ('Harvestable', 'Container')
+
+    __slots__ = ('prototype', 'description', 'season_description', 'details', 'season_details', 'keywords',
+                 'length', 'width', 'height', 'weight', 'can_pick_up', 'is_growing', 'is_embedded', 'traits')
 
     def __init__(self):
         super(Item, self).__init__()
@@ -422,6 +483,15 @@ class Item(NamedModel):
         # items to give it a variety of uses and features.
         self.traits = {} 
 
+    def instance(self):
+        instance = super(Item, self).instance()
+
+        if any(trait in self.traits for trait in self.STATEFUL_TRAITS):
+            instance.traits = {name: trait.instance() if name in self.STATEFUL_TRAITS else trait
+                               for name, trait in self.traits.items()}
+
+        return instance
+
     def toJson(self):
         json = {}
 
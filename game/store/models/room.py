@@ -1,9 +1,25 @@
 from game.store.models.base import JsonSerializable
 from game.store.models.base import Model
+from game.store.models.base import slotValues
 
 
 class Exit(JsonSerializable):
-    "An exit from one room to another."
+    """
+    An exit from one room to another.
+
+    The room an exit leads to is looked up by its id in the repository in
+    `rooms` each time it's needed, rather than held on to, so that rooms can
+    be loaded on demand and paged out again.
+
+    Attributes
+    ----------
+    room_to_id: int
+        The id of the room the exit leads to.
+    rooms:  ModelRepository
+        The repository to look up `room_to` in.
+    """
+
+    __slots__ = ('room_from', 'is_door', 'is_open', 'direction', 'room_to_id', 'rooms', '_room_to')
 
     def __init__(self, room):
         self.room_from = room
@@ -12,20 +28,53 @@ class Exit(JsonSerializable):
         self.is_open = True 
 
         self.direction = ''
-        self.room_to = None
-        self.exit_to = None
+
+        self.room_to_id = None
+        self.rooms = None
+        self._room_to = None
+
+    @property
+    def room_to(self):
+        'The room the exit leads to, or None if it can\'t be found.'
+
+        if self.rooms is not None and self.room_to_id is not None:
+            return self.rooms.getById(self.room_to_id)
+        return self._room_to
+
+    def __getstate__(self):
+        # The repository belongs to the store, which sets it again once the
+        # exit's room has been restored.
+        state = slotValues(self)
+        state['rooms'] = None
+        state['_room_to'] = None
+        return (None, state)
+
+    @room_to.setter
+    def room_to(self, room):
+        self._room_to = room
+        self.room_to_id = room.getId() if room is not None else None
+
+    @property
+    def exit_to(self):
+        'The exit leading back the other way, if there is one.'
+
+        room = self.room_to
+        if room is None:
+            return None
+        return room.exits.get(Room.INVERT_DIRECTION[self.direction])
 
     def toJson(self):
         json = {}
         json['is_door'] = self.is_door
         json['is_open'] = self.is_open
         json['direction'] = self.direction
-        json['room_to'] = self.room_to.getId()
+        json['room_to'] = self.room_to_id
         return json
 
     def fromJson(self, data):
         self.direction = data['direction']
-        self.room_to = data['room_to']
+        self.room_to_id = data['room_to']
+        self._room_to = None
 
         self.is_door = data['is_door']
         self.is_open = data['is_open']
@@ -35,6 +84,9 @@ class Exit(JsonSerializable):
 class Room(Model):
     "A location in the game world."
 
+    __slots__ = ('title', 'description', 'color', 'water_type', 'water', 'water_velocity', 'exits', 'occupants',
+                 'items')
+
     # A list of possible directions leading out of this room.
     DIRECTIONS = [
         'north',
@@ -75,6 +127,12 @@ class Room(Model):
         self.occupants = []
         self.items = []
 
+    def __getstate__(self):
+        # Players' characters are only in the room while they're playing.
+        state = slotValues(self)
+        state['occupants'] = [occupant for occupant in self.occupants if not occupant.is_player_character]
+        return (None, state)
+
     def toJson(self):
         json = {}
         json['id'] = self.getId()
@@ -9,6 +9,10 @@ class Time(JsonSerializable):
     def __init__(self):
         self.loops_a_second = 10 
 
+        # The most ticks the loop will run back to back to catch up when it
+        # falls behind.
+        self.max_catch_up = 5
+
         # 1 game minute == 1 real second
         self.loops_a_minute = self.loops_a_second
 
@@ -0,0 +1,219 @@
+import threading
+
+from game.store.backends.backend import StorageError
+
+
+class WriteBehind:
+    """
+    Saves models on a background thread, so that disk latency doesn't land on
+    the game loop.
+
+    The game thread takes a snapshot of the model with `toJson()` and queues
+    it with `save()`, which returns straight away.  The writer thread then
+    hands everything that's been queued to the storage backend as one batch.
+
+    Saves are keyed by kind and id.  If a model is saved again before its last
+    save has been written, only the latest snapshot is written.
+
+    The store marks a model clean as soon as it's queued, so a save that fails
+    is queued again, and retried after `RETRY_DELAY` seconds, up to `RETRIES`
+    times in all.  A newer save of the same model replaces the retry.
+
+    Attributes
+    ----------
+    written:    int
+        How many models have been written.
+    coalesced:  int
+        How many saves were replaced by a later save of the same model before
+        they were written.
+    retried:    int
+        How many failed saves have been queued again.
+    errors: int
+        How many models failed to save, and were given up on.
+    """
+
+    RETRIES = 3
+    RETRY_DELAY = 1.0
+
+    def __init__(self, backend):
+        """
+        Initialize the queue.  The writer thread is started by the first save.
+
+        Parameters
+        ----------
+        backend:    StorageBackend
+            Where to save the models.
+        """
+
+        self.backend = backend
+
+        self.pending = {}
+        self.batch = {}
+        self.writing = False
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.thread = None
+
+        # How many times each model waiting to be retried has failed.
+        self.attempts = {}
+
+        self.written = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.errors = 0
+
+    def save(self, kind, id, data):
+        """
+        Queue a model to be saved.
+
+        Parameters
+        ----------
+        kind:   string
+            The kind of model, see StorageBackend.
+        id: string or int
+            The model's id.
+        data:   dict
+            A snapshot of the model, from `toJson()`.  It mustn't be changed
+            after it's been queued.
+        """
+
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Can't save to a closed WriteBehind.")
+
+            key = (kind, id)
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = data
+            self.attempts.pop(key, None)
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='write-behind', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def get(self, kind, id):
+        """
+        Find the snapshot of a model that's queued, or being written.  The
+        backend won't have it until it's been written, so anything that loads
+        a model that might have been saved recently should look here first.
+
+        Parameters
+        ----------
+        kind:   string
+            The kind of model, see StorageBackend.
+        id: string or int
+            The model's id.
+
+        Returns
+        -------
+        dict:   The snapshot, or None if the model isn't waiting to be written.
+        """
+
+        with self.condition:
+            key = (kind, id)
+            if key in self.pending:
+                return self.pending[key]
+            return self.batch.get(key)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+
+                self.batch = self.pending
+                self.pending = {}
+                self.writing = True
+
+            failed = list(self.batch)
+            try:
+                failed = self.write([(kind, id, data) for (kind, id), data in self.batch.items()])
+            finally:
+                with self.condition:
+                    retrying = self.retry(set(failed))
+                    self.batch = {}
+                    self.writing = False
+                    self.condition.notify_all()
+
+                    # Give whatever went wrong a chance to clear up before we
+                    # try again, unless we're closing.
+                    if retrying and not self.closed:
+                        self.condition.wait(self.RETRY_DELAY)
+
+    def write(self, records):
+        """
+        Write a batch of records to the backend.
+
+        Returns
+        -------
+        list:   The `(kind, id)` of each record that wasn't saved.
+        """
+
+        failed = []
+        try:
+            self.backend.saveMany(records)
+        except StorageError as error:
+            failed = list(error.failed)
+        except Exception as error:
+            # Anything else means we don't know what was saved, so count it
+            # all as failed, and keep the writer running for the next batch.
+            print("Error! Failed to save %d models: %r" % (len(records), error))
+            failed = [(kind, id) for kind, id, data in records]
+        self.written += len(records) - len(failed)
+        return failed
+
+    def retry(self, failed):
+        """
+        Queue the batch's failed saves again, unless they've been saved since
+        or have run out of retries.  Must be called holding the condition.
+
+        Returns
+        -------
+        int:    How many saves were queued again.
+        """
+
+        for key in self.batch:
+            if key not in failed:
+                self.attempts.pop(key, None)
+
+        retrying = 0
+        for key in failed:
+            if key in self.pending:
+                continue
+
+            attempts = self.attempts.pop(key, 0) + 1
+            if attempts < self.RETRIES:
+                self.pending[key] = self.batch[key]
+                self.attempts[key] = attempts
+                self.retried += 1
+                retrying += 1
+            else:
+                print("Error! Giving up on saving %s %s." % key)
+                self.errors += 1
+        return retrying
+
+    def flush(self):
+        """
+        Wait until everything that's been queued has been written.
+        """
+
+        with self.condition:
+            while self.pending or self.writing:
+                self.condition.wait()
+
+    def close(self):
+        """
+        Write everything that's queued and stop the writer thread.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+# End WriteBehind
@@ -0,0 +1,81 @@
+import numpy as np
+
+from game.store.models.character import Attributes
+from game.store.models.character import Reserves
+
+
+class ReservesTable:
+    """
+    The reserves of every character in the game, and the attributes they
+    depend on, stored as a structure of arrays: one numpy array per field,
+    with a row per character.
+
+    A character's `Reserves` and `Attributes` read and write their Columns
+    straight from their row, so the rest of the game doesn't need to know
+    about the table, while the heartbeat can drain and recover everyone's
+    reserves with a few array operations instead of a loop over characters.
+
+    Characters are given a row the first time they're attached and keep it.
+    Each character is only loaded once, so the table never holds more rows
+    than there are characters.
+
+    Attributes
+    ----------
+    columns:    dict
+        A numpy array of floats for each Column, keyed by name.
+    size:   int
+        The number of rows in use.
+    """
+
+    COLUMNS = Reserves.columns() + Attributes.columns()
+
+    def __init__(self, capacity=64):
+        self.columns = {name: np.zeros(capacity) for name in self.COLUMNS}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def attach(self, character):
+        """
+        Give `character` a row, moving its reserves and stamina into it, if
+        it doesn't have one already.
+
+        Parameters
+        ----------
+        character:  Character
+            The character to attach.
+
+        Returns
+        -------
+        int:    The character's row.
+        """
+
+        if character.reserves.table is self and character.attributes.table is self:
+            return character.reserves.row
+
+        capacity = len(self.columns[self.COLUMNS[0]])
+        if self.size == capacity:
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate((column, np.zeros(capacity)))
+
+        row = self.size
+        self.size += 1
+
+        character.reserves.attach(self, row)
+        character.attributes.attach(self, row)
+        return row
+
+    def rows(self, characters):
+        """
+        Attach each of `characters` and find their rows.
+
+        Returns
+        -------
+        numpy.ndarray:  The characters' rows, in order.
+        """
+
+        return np.fromiter((self.attach(character) for character in characters), dtype=np.intp,
+                           count=len(characters))
+
+# End ReservesTable
@@ -0,0 +1,166 @@
+import contextlib
+import gc
+import os
+import pickle
+import struct
+
+
+@contextlib.contextmanager
+def withoutCollection():
+    """
+    Turn the garbage collector off for a while.  Pickling and unpickling the
+    game's state walks or makes a great many objects, none of them garbage,
+    so the collector would only slow it down.
+    """
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot can't be read: it's missing, it isn't a snapshot,
+    it was written by a different version of the format or for a different
+    world, or it's damaged.
+    """
+
+    pass
+
+
+class Snapshot:
+    """
+    The whole of the game's live state, in one file, for a fast cold start.
+
+    Loading the store from its backend means opening and parsing a json file
+    (or a row) for every model, then building each room's items and NPCs from
+    their prototypes.  A snapshot holds the rooms, with their items and NPCs,
+    and the prototypes they were made from, as the live models themselves, in
+    a single pickle.  Unpickling them gives back the rooms just as they were,
+    down to the state of each item, without going through their json.
+
+    Characters and accounts are few, and tied to the players and the reserves
+    table, so they're kept as json, along with the world and its time.  A
+    snapshot has the read side of a StorageBackend for them, `loadWorld()`
+    and `load()`, so that `Store.load()` can load from it just as it loads
+    from the backend.  The live models come from `loadLive()`.
+
+    The file is a header, then the pickled data.  The header is MAGIC,
+    VERSION as a big endian unsigned short, a flags byte, and the name of the
+    world as a big endian unsigned short length and utf-8.  Change VERSION
+    whenever the layout of the file changes, or the models it holds change,
+    and old snapshots will be refused rather than misread.
+
+    A store that loads rooms lazily only has the rooms that were in use, so
+    its snapshot is marked partial in the flags.  Rooms missing from a
+    partial snapshot have to be loaded from the backend.
+
+    Attributes
+    ----------
+    name:   string
+        The name of the world the snapshot was taken of.
+    world:  dict
+        The world's json, including its time.
+    models: dict
+        A list of json for each kind of model kept as json, keyed by kind.
+    live:   dict
+        A list of live models for each kind of model kept as it is, keyed by
+        kind.
+    complete:   boolean
+        Whether the snapshot has every room in the world.
+    """
+
+    MAGIC = b'MUDSNAP\0'
+    VERSION = 3
+
+    HEADER = struct.Struct('>%dsHBH' % len(MAGIC))
+
+    # Header flags.
+    COMPLETE = 0x01
+
+    def __init__(self, name, world, models, live=None, complete=True):
+        self.name = name
+        self.world = world
+        self.models = models
+        self.live = live or {}
+        self.complete = complete
+
+    def loadWorld(self):
+        return self.world
+
+    def load(self, kind):
+        return self.models.get(kind, [])
+
+    def loadLive(self, kind):
+        """
+        The live models of `kind`, or None if they're kept as json.
+        """
+
+        return self.live.get(kind)
+
+    def write(self, path):
+        """
+        Write the snapshot to `path`.  It's written to a temporary file and
+        renamed into place, so a crash never leaves half a snapshot.
+        """
+
+        name = self.name.encode('utf-8')
+
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.COMPLETE if self.complete else 0, len(name)))
+            file.write(name)
+            with withoutCollection():
+                pickle.dump({'world': self.world, 'models': self.models, 'live': self.live}, file, protocol=5)
+        os.replace(temporary, path)
+
+    @classmethod
+    def read(cls, path, name=None):
+        """
+        Read a snapshot from `path`.
+
+        Parameters
+        ----------
+        path:   string
+            The snapshot to read.
+        name:   string (Optional)
+            The world the snapshot has to be of.
+
+        Raises
+        ------
+        SnapshotError:  If the snapshot can't be read, or is of another world.
+        """
+
+        try:
+            with open(path, 'rb') as file:
+                header = file.read(cls.HEADER.size)
+                if len(header) < cls.HEADER.size:
+                    raise SnapshotError("%s isn't a snapshot." % path)
+
+                magic, version, flags, length = cls.HEADER.unpack(header)
+                if magic != cls.MAGIC:
+                    raise SnapshotError("%s isn't a snapshot." % path)
+                if version != cls.VERSION:
+                    raise SnapshotError("%s is version %d of the snapshot format, expected version %d."
+                                        % (path, version, cls.VERSION))
+
+                world = file.read(length).decode('utf-8', 'replace')
+                if name is not None and world != name:
+                    raise SnapshotError("%s is of the world %s, not %s." % (path, world, name))
+
+                with withoutCollection():
+                    data = pickle.load(file)
+                return cls(world, data['world'], data['models'], data['live'], bool(flags & cls.COMPLETE))
+        except SnapshotError:
+            raise
+        except OSError as error:
+            raise SnapshotError("Couldn't read %s: %s" % (path, error))
+        except Exception as error:
+            # A damaged pickle can fail in any number of ways.
+            raise SnapshotError("%s is damaged: %r" % (path, error))
+
+# End Snapshot
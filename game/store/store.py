@@ -1,11 +1,20 @@
-import glob, os
 
+import os
+import time
+
+from game.player import Players
+from game.store.models.base import Flyweight
 from game.store.models.world import World
 from game.store.models.account import Account
 from game.store.models.character import Character
 from game.store.models.character import PlayerCharacter
 from game.store.models.room import Room
 from game.store.models.item import Item 
+from game.store.reserves import ReservesTable
+from game.store.persistence import WriteBehind
+from game.store.snapshot import Snapshot
+from game.store.snapshot import SnapshotError
+from game.store.backends.files import FileBackend
 
 
 class ModelRepository:
@@ -112,6 +121,21 @@ class ModelRepository:
         self.add(model)
         return model
 
+    def loadJson(self, data):
+        """
+        Load a model from its json.
+
+        Parameters
+        ----------
+        data:   dict
+            The model's json, as loaded from a StorageBackend.
+        """
+
+        model = self.type()
+        model.fromJson(data)
+        self.add(model)
+        return model
+
     def getById(self, id):
         """Get the instance identified by ``id`` from the repository.
 
@@ -167,8 +191,9 @@ class PrototypeRepository(ModelRepository):
 
         Attempts to create a new instance of a prototype identified by ``id``.
         If no such prototype is found in the repository, then returns None.
-        Creates a deep copy of the prototype, so that it can act as a
-        completely idependent instance of the model.
+        Models that are Flyweights make their own instances, which share the
+        prototype's data.  Anything else gets a deep copy of the prototype, so
+        that it can act as a completely idependent instance of the model.
 
         Parameters
         ----------
@@ -179,6 +204,9 @@ class PrototypeRepository(ModelRepository):
 
         if self.hasId(id):
             model = self.getById(id)
+            if isinstance(model, Flyweight):
+                return model.instance()
+
             instance = self.type()
             instance.fromJson(model.toJson())
             return instance
@@ -186,6 +214,212 @@ class PrototypeRepository(ModelRepository):
             return None
 
 
+class RoomRepository(ModelRepository):
+    """
+    A ModelRepository of Rooms, which can load rooms on demand and page them
+    out again.
+
+    In lazy mode the rooms aren't loaded with the rest of the store.  Instead,
+    each room is loaded from the store's backend the first time it's asked for
+    with `getById()`, which is usually when a character walks through an exit
+    into it.  Only the rooms that have been visited are ever loaded.
+
+    With paging enabled, the world's grid of rooms is split into square
+    chunks.  `page()` loads the chunks around each player ahead of them, and
+    saves and evicts the chunks no player has been near for a while, so the
+    rooms in memory follow the players around the world rather than growing to
+    cover everywhere anyone has been.
+
+    Attributes
+    ----------
+    lazy:   boolean
+        Load rooms on demand.
+    chunk_size: int
+        The width, in rooms, of a chunk, or None if paging is off.
+    radius: int
+        Load the chunks within this many rooms of a player.
+    idle:   int
+        Evict a chunk once it's gone this many loops without a player within
+        `radius` of it.
+    chunks: dict
+        The loop each loaded chunk last had a player near it, keyed by chunk.
+    """
+
+    def __init__(self, store, type, lazy=False):
+        super(RoomRepository, self).__init__(store, type)
+        self.lazy = lazy
+
+        # Ids we've looked for and not found, so we only look once.
+        self.missing = set()
+
+        self.chunk_size = None
+        self.radius = 0
+        self.idle = 0
+        self.chunks = {}
+
+        # Each room's (x, y) on the world's grid, built when it's first needed.
+        self.positions = None
+
+    def getById(self, id):
+        room = self.repo.get(id)
+        if room is None and self.lazy and id not in self.missing:
+            # A room that's been paged out may not have been written yet.
+            data = self.store.persistence.get('rooms', id)
+            if data is None:
+                data = self.store.backend.loadOne('rooms', id)
+
+            if data is None:
+                self.missing.add(id)
+            else:
+                room = self.loadJson(data)
+                self.store.prepareRoom(room)
+        return room
+
+    def loadJson(self, data):
+        room = super(RoomRepository, self).loadJson(data)
+
+        # Start the idle clock on the room's chunk, so it's paged out again
+        # if no one comes near it.
+        if self.chunk_size:
+            chunk = self.chunkOf(room.getId())
+            if chunk is not None:
+                self.chunks.setdefault(chunk, self.store.world.time.loop)
+        return room
+
+    def hasId(self, id):
+        return self.getById(id) is not None
+
+    def enablePaging(self, chunk_size, radius, idle):
+        """
+        Page rooms in and out by chunks of the world's grid.  Turns on lazy
+        mode, so must be called before the store is loaded.
+
+        Parameters
+        ----------
+        chunk_size: int
+            The width, in rooms, of a chunk.
+        radius: int
+            Load the chunks within this many rooms of each player.
+        idle:   int
+            Evict a chunk once it's gone this many loops without a player
+            within `radius` of it.
+        """
+
+        if chunk_size < 1:
+            raise ValueError("A chunk must be at least one room wide.")
+
+        self.lazy = True
+        self.chunk_size = chunk_size
+        self.radius = radius
+        self.idle = idle
+
+    def gridPositions(self):
+        if self.positions is None:
+            self.positions = {}
+            for y, row in enumerate(self.store.world.rooms):
+                for x, id in enumerate(row):
+                    if id:
+                        self.positions[id] = (x, y)
+        return self.positions
+
+    def chunkOf(self, id):
+        """
+        Find the chunk a room is in.
+
+        Returns
+        -------
+        tuple:  The chunk's (x, y), counted in chunks, or None if the room
+                isn't on the world's grid.
+        """
+
+        position = self.gridPositions().get(id)
+        if position is None:
+            return None
+        return (position[0] // self.chunk_size, position[1] // self.chunk_size)
+
+    def chunkIds(self, chunk):
+        'The ids of the rooms in `chunk`.'
+
+        size = self.chunk_size
+        x, y = chunk
+        return [id for row in self.store.world.rooms[y * size:(y + 1) * size]
+                for id in row[x * size:(x + 1) * size] if id]
+
+    def page(self, rooms):
+        """
+        Load every chunk within `radius` rooms of `rooms`, and evict the
+        chunks that have gone `idle` loops without any.
+
+        Parameters
+        ----------
+        rooms:  list
+            The rooms the players are in.
+
+        Returns
+        -------
+        tuple:  How many rooms were loaded, and how many evicted.
+        """
+
+        loop = self.store.world.time.loop
+        grid = self.store.world.rooms
+        positions = self.gridPositions()
+
+        near = set()
+        for room in rooms:
+            position = positions.get(room.getId())
+            if position is None:
+                continue
+
+            x, y = position
+            top = max(y - self.radius, 0) // self.chunk_size
+            bottom = min(y + self.radius, len(grid) - 1) // self.chunk_size
+            left = max(x - self.radius, 0) // self.chunk_size
+            right = min(x + self.radius, len(grid[y]) - 1) // self.chunk_size
+            for chunk_y in range(top, bottom + 1):
+                for chunk_x in range(left, right + 1):
+                    near.add((chunk_x, chunk_y))
+
+        loaded = 0
+        for chunk in near:
+            for id in self.chunkIds(chunk):
+                if id not in self.repo and self.getById(id) is not None:
+                    loaded += 1
+            self.chunks[chunk] = loop
+
+        evicted = 0
+        for chunk, seen in list(self.chunks.items()):
+            if loop - seen >= self.idle:
+                evicted += self.evictChunk(chunk)
+
+        return loaded, evicted
+
+    def evictChunk(self, chunk):
+        """
+        Save the rooms in `chunk` that have changed and drop them all from the
+        repository.  Their NPCs and items go with them.  A chunk with a player
+        in it is kept.
+
+        Returns
+        -------
+        int:    How many rooms were evicted.
+        """
+
+        rooms = [self.repo[id] for id in self.chunkIds(chunk) if id in self.repo]
+        for room in rooms:
+            for occupant in room.occupants:
+                if occupant.is_player_character:
+                    self.chunks[chunk] = self.store.world.time.loop
+                    return 0
+
+        for room in rooms:
+            if room.isDirty() or room in self.store.dirty_rooms:
+                self.store.saveRoom(room)
+            del self.repo[room.getId()]
+
+        del self.chunks[chunk]
+        return len(rooms)
+
+
 class Store:
     """
     A Storage object containing and providing access to the game's content.
@@ -206,9 +440,17 @@ class Store:
         the game.
     items: ModelPrototypeRepository<Item>
         A ModelPrototypeRepository of all the Items that can exist in the game.
+    reserves: ReservesTable
+        The reserves of the characters in the game, stored as arrays.
+    backend: StorageBackend
+        Where the game's data is loaded from and saved to.
+    persistence: WriteBehind
+        Writes saved models to the backend in the background.
+    dirty_rooms: set<Room>
+        The rooms that have changed since they were last saved.
     """
 
-    def __init__(self, world='base', data_directory='data/'):
+    def __init__(self, world='base', data_directory='data/', backend=None, lazy=False):
         """
         Initialize the Store.
 
@@ -223,149 +465,317 @@ class Store:
             The name of the game world we want to load.
         data_directory: string
             The path to the data directory.
+        backend:    StorageBackend (Optional)
+            Where to load and save the game's data.  Defaults to the json
+            files in the data directory.
+        lazy:   boolean
+            Load rooms as they're needed, rather than all at once.
         """
         self.data_directory = 'data/'
         self.world_name = world
         self.world = World() 
 
-        self.players = []
+        self.players = Players()
 
         self.accounts = ModelRepository(self, Account) 
         self.characters = ModelRepository(self, PlayerCharacter)
-        self.rooms = ModelRepository(self, Room) 
+        self.rooms = RoomRepository(self, Room, lazy)
         self.npcs = PrototypeRepository(self, Character) 
         self.items = PrototypeRepository(self, Item) 
 
+        # The reserves of the characters in the game, as arrays.
+        self.reserves = ReservesTable()
+
+        if backend is None:
+            backend = FileBackend(self.data_directory, world)
+        self.backend = backend
+
+        # Saves are written on a background thread.
+        self.persistence = WriteBehind(self.backend)
+
+        # Rooms that have changed since they were last saved.
+        self.dirty_rooms = set()
+
     def saveCharacter(self, character):
         """
         Save a character. Allows us to avoid hard coding the path to the
         character data anywhere we need to save the character.
 
+        The character is snapshotted now and written to disk in the background.
+
         Parameters
         ----------
         character:  Character
             The character we'd like to save.
         """
 
-        character_path = os.path.join(self.data_directory, 'characters/')
-        character.save(character_path)
+        self.persistence.save('characters', character.getId(), character.toJson())
+        character.markClean()
 
     def saveAccount(self, account):
         """
         Save an account.  Allows us to avoid hard coding the path to the
         account data anywhere we need to save an account.
 
+        The account is snapshotted now and written to disk in the background.
+
         Parameters
         ----------
         account:    Account
             The account we'd like to save.
         """
 
-        account_path = os.path.join(self.data_directory, 'accounts/')
-        account.save(account_path)
+        self.persistence.save('accounts', account.getId(), account.toJson())
+        account.markClean()
 
-    def load(self):
+    def saveRoom(self, room):
+        """
+        Save a room to the current world's rooms.
+
+        The room is snapshotted now and written to disk in the background.
+
+        Parameters
+        ----------
+        room:   Room
+            The room we'd like to save.
+        """
+
+        self.persistence.save('rooms', room.getId(), room.toJson())
+        room.markClean()
+        self.dirty_rooms.discard(room)
+
+    def markRoomDirty(self, room):
+        """
+        Record that a room has changed, so the heartbeat will save it.
+
+        Parameters
+        ----------
+        room:   Room
+            The room that changed.
+        """
+
+        room.markDirty()
+        self.dirty_rooms.add(room)
+
+    def close(self):
+        """
+        Finish writing any saves that are still queued, and close the
+        backend.
+        """
+
+        self.persistence.close()
+        self.backend.close()
+
+    def snapshot(self, path):
+        """
+        Write the game's live state to a snapshot at `path`, for `restore()`
+        to start from.
+
+        Anything that's changed is saved to the backend first, so that the
+        backend is never behind the snapshot.
+
+        Parameters
+        ----------
+        path:   string
+            Where to write the snapshot.
+        """
+
+        start = time.perf_counter()
+
+        for character in self.characters.repo.values():
+            if character.isDirty():
+                self.saveCharacter(character)
+        for room in list(self.dirty_rooms):
+            self.saveRoom(room)
+
+        # Rooms are kept live, with their items and NPCs, and the prototypes
+        # those were made from.  See Snapshot.
+        models = {'characters': [character.toJson() for character in self.characters.repo.values()],
+                  'accounts': [account.toJson() for account in self.accounts.repo.values()]}
+        live = {'items': list(self.items.repo.values()), 'npcs': list(self.npcs.repo.values()),
+                'rooms': list(self.rooms.repo.values())}
+        Snapshot(self.world_name, self.world.toJson(), models, live, complete=not self.rooms.lazy).write(path)
+
+        print("Wrote a snapshot to %s in %.2f s." % (path, time.perf_counter() - start))
+
+    def restore(self, path):
+        """
+        Populate the game store from the snapshot at `path`, falling back to
+        loading it from the backend if the snapshot can't be read.
+
+        The snapshot is removed once it's been restored.  Saves made from here
+        on only go to the backend, so if the server stopped without writing a
+        new snapshot, the old one would bring back stale state.
+
+        Parameters
+        ----------
+        path:   string
+            The snapshot to restore.
+
+        Returns
+        -------
+        boolean:    True if the snapshot was restored, False if the store was
+                    loaded from the backend instead.
+        """
+
+        try:
+            snapshot = Snapshot.read(path, self.world_name)
+        except SnapshotError as error:
+            print("Error! %s  Loading from storage instead." % error)
+            self.load()
+            return False
+
+        self.load(snapshot)
+        os.remove(path)
+        return True
+
+    def load(self, source=None):
         """
         Populate the game store, loading the game world and all game data.
+        In lazy mode rooms aren't loaded here, but as they're needed.
+
+        Parameters
+        ----------
+        source: StorageBackend or Snapshot (Optional)
+            Where to load from.  Defaults to the store's backend.  Rooms
+            are always loaded from a snapshot, as they were, with their items
+            and NPCs.  If the snapshot only has the rooms that were in use
+            and the store isn't lazy, the rest are loaded from the backend.
         """
 
+        source = self.backend if source is None else source
+
         print("Loading the game store.")
+        start = time.perf_counter()
 
-        world_path = os.path.join(self.data_directory, 'worlds', self.world_name, 'world.json')
-        print("Loading the world from %s..." % world_path)
-        self.world.load(world_path)
-
-        item_path = os.path.join(self.data_directory, 'items/')
-        print("Loading items from %s..." % item_path)
-        item_list = glob.glob(item_path + '**/*.json', recursive=True)
-        for file_path in item_list:
-            print("Loading item " + file_path + "...")
-            self.items.load(file_path)
-
-        npc_path = os.path.join(self.data_directory, 'npcs/')
-        print("Loading non-player characters from %s..." % npc_path)
-        npc_list = glob.glob(npc_path + '**/*.json', recursive=True)
-        for file_path in npc_list:
-            print("Loading npc %s..." % file_path)
-            self.npcs.load(file_path)
-
-        character_path = os.path.join(self.data_directory, 'characters/')
-        print("Loading player characters from %s..." % character_path)
-        character_list = glob.glob(character_path + '*.json')
-        for file_path in character_list:
-            print("Loading character %s..." % file_path)
-
-            character = self.characters.load(file_path)
-
-            print("Loading %s's inventory..." % character.name)
+        print("Loading the world %s..." % self.world_name)
+        self.world.fromJson(source.loadWorld())
+
+        self.loadModels('items', self.items, source)
+        self.loadModels('npcs', self.npcs, source)
+
+        for character in self.loadModels('characters', self.characters, source):
             inventory = character.inventory
             character.inventory = []
             for itemId in inventory:
                 if self.items.hasId(itemId):
                     character.inventory.append(self.items.instance(itemId))
 
-            print("Loading %s's equipment..." % character.name)
             for body_part in character.body.worn:
                 itemId = character.body.worn[body_part]
                 if self.items.hasId(itemId):
                     character.body.worn[body_part] = self.items.instance(itemId)
 
-        account_path = os.path.join(self.data_directory, 'accounts/')
-        print("Loading accounts from %s..." % account_path)
-        account_list = glob.glob(account_path + '*.json') 
-        for file_path in account_list:
-            print("Loading account " + file_path + "...")
-            account = self.accounts.load(file_path)
-
+        for account in self.loadModels('accounts', self.accounts, source):
             characters = account.characters
             account.characters = {} 
             for name in characters:
                 account.characters[name] = self.characters.getById(name)
                 account.characters[name].account = account
 
-        room_path = os.path.join(self.data_directory, 'worlds', self.world.name, 'rooms/')
-        print("Loading rooms from %s..." % room_path)
-        room_list = glob.glob(room_path + '*.json') 
-        for file_path in room_list:
-            print("Loading room " + file_path + "...")
-            self.rooms.load(file_path)
-
-        print("Connecting rooms and loading items into rooms...")
-        for id in self.rooms.repo:
-            room = self.rooms.getById(id)
-
-            print("Connecting exits for Room(%s) '%s'..." % (str(id), room.title))
-            for direction in room.exits:
-                exit = room.exits[direction]
-                exit.room_to = self.rooms.getById(exit.room_to)
-                if Room.INVERT_DIRECTION[exit.direction] in exit.room_to.exits:
-                    exit.exit_to = exit.room_to.exits[Room.INVERT_DIRECTION[exit.direction]]
-
-            print("Loading items into Room(%s) '%s'..." % (str(id), room.title))
-            items = room.items
-            room.items = []
-            for itemId in items:
-                if self.items.hasId(itemId):
-                    room.items.append(self.items.instance(itemId))
-                else:
-                    print("Error! No Item(%s) in Room(%s)." % (itemId, str(id))), 
+        # The rooms loaded from their json, rather than restored as they were.
+        prepared = []
+        if self.rooms.lazy and source is self.backend:
+            print("Rooms will be loaded as they're needed.")
+        else:
+            rooms = self.loadModels('rooms', self.rooms, source)
+            if hasattr(source, 'loadLive') and source.loadLive('rooms') is not None:
+                for room in rooms:
+                    self.linkRoom(room)
+            else:
+                prepared = rooms
+
+            if not self.rooms.lazy and not getattr(source, 'complete', True):
+                prepared = [self.rooms.loadJson(data) for data in self.backend.load('rooms')
+                            if data['id'] not in self.rooms.repo]
+                print("Loaded the {0:,d} rooms missing from the snapshot.".format(len(prepared)))
+
+            for room in prepared:
+                self.prepareRoom(room)
+
+        # Check every exit leads somewhere.  Rooms restored from a snapshot
+        # were checked when they were first loaded.
+        if not self.rooms.lazy:
+            for room in prepared:
+                for direction, exit in room.exits.items():
+                    if exit.room_to is None:
+                        print("Error! No Room(%s) to the %s of Room(%s)." % (exit.room_to_id, direction, room.getId()))
+
+        # Characters that aren't in the game keep the id of the room they
+        # were in, rather than the room, which may be paged out before they
+        # come back.  It's looked up when they enter the game.
+
+        print("Loaded the game store in %.2f s." % (time.perf_counter() - start))
+
+    def loadModels(self, kind, repository, source=None):
+        """
+        Load every model of a kind from the backend into a repository.
+
+        Parameters
+        ----------
+        kind:   string
+            The kind of model, see StorageBackend.
+        repository: ModelRepository
+            The repository to add them to.
+        source: StorageBackend or Snapshot (Optional)
+            Where to load them from, if not the backend.
+
+        Returns
+        -------
+        list:   The models.
+        """
 
-            print("Loading characters into Room(%s) '%s'..." % (str(id), room.title))
-            occupants = room.occupants
-            room.occupants = []
-            for characterId in occupants:
-                if self.npcs.hasId(characterId):
-                    room.occupants.append(self.npcs.instance(characterId))
-                else:
-                    print("Error! No NPC(%s) in Room(%s)." % (characterId, room.title))
+        start = time.perf_counter()
+        source = self.backend if source is None else source
+
+        # A snapshot may have the models themselves, rather than their json.
+        models = source.loadLive(kind) if hasattr(source, 'loadLive') else None
+        if models is not None:
+            for model in models:
+                repository.add(model)
+        else:
+            models = [repository.loadJson(data) for data in source.load(kind)]
+        print("Loaded {0:,d} {1} in {2:.2f} s.".format(len(models), kind, time.perf_counter() - start))
+        return models
 
-        print("Connect player characters to the rooms they were in...")
-        for id in self.characters.repo:
-            character = self.characters.getById(id)
+    def linkRoom(self, room):
+        """
+        Have a room's exits look up the rooms they lead to in the store.
 
-            if character.room:
-                character.room = self.rooms.getById(character.room)
+        Parameters
+        ----------
+        room:   Room
+            The room, freshly loaded.
+        """
 
+        for exit in room.exits.values():
+            exit.rooms = self.rooms
 
+    def prepareRoom(self, room):
+        """
+        Finish loading a room: have its exits look up their rooms in the store,
+        and create its items and NPCs from their prototypes.
 
+        Parameters
+        ----------
+        room:   Room
+            The room, freshly loaded from its json.
+        """
 
+        self.linkRoom(room)
+
+        items = room.items
+        room.items = []
+        for itemId in items:
+            if self.items.hasId(itemId):
+                room.items.append(self.items.instance(itemId))
+            else:
+                print("Error! No Item(%s) in Room(%s)." % (itemId, str(room.getId())))
+
+        occupants = room.occupants
+        room.occupants = []
+        for characterId in occupants:
+            if self.npcs.hasId(characterId):
+                room.occupants.append(self.npcs.instance(characterId))
+            else:
+                print("Error! No NPC(%s) in Room(%s)." % (characterId, room.title))
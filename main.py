@@ -1,12 +1,20 @@
 #!/usr/bin/python3
 
+import os
 import time
 import random
 import argparse
+import asyncio
+import signal
 
 from game.sockets.server import ServerSocket
+from game.sockets.streams import StreamServerSocket
+from game.sockets.workers import WorkerServerSocket
+from game.sockets.websocket import WebSocketClientSocket
 
 from game.store.store import Store
+from game.store.backends.files import FileBackend
+from game.store.backends.sqlite import SQLiteBackend
 from game.library.library import Library
 from game.player import Player
 
@@ -27,9 +35,159 @@ import game.commands.reserves as reserves
 import game.commands.system as system
 
 from game.heartbeat import Heartbeat
+from game.profiler import Profiler
+from game.clock import TickClock
 
 
-def gameLoop(serverSocket, library, store, account_interpreter, game_interpreter):
+def connectPlayer(connection, store, account_interpreter, game_interpreter):
+    """
+    Create a player for a newly accepted connection and send it to the account
+    flow starting with the welcome screen.
+
+    Parameters
+    ----------
+    connection: ClientSocket
+        The newly accepted connection.
+    store: Store
+        The game store.
+    account_interpreter:    StateInterpreter
+        An interpreter to be used for players in the Account Menu.
+    game_interpreter:   CommandInterpreter
+        An interpreter to be used for players who are playing the game.
+
+    Returns
+    -------
+    Player: The newly connected player.
+    """
+
+    player = Player(connection, account_interpreter, game_interpreter)
+    player.status = player.STATUS_ACCOUNT
+    player.setAccountState("welcome-screen")
+    store.players.append(player)
+    return player
+
+
+def disconnectPlayers(store, library):
+    """
+    Take the players whose connections have closed out of the game, saving
+    their characters the same way `quit` does.
+
+    Parameters
+    ----------
+    store: Store
+        The game store.
+    library:    Library
+        The game library.
+    """
+
+    disconnected = [player for player in store.players if player.socket.isClosed]
+    for player in disconnected:
+        if player.character:
+            library.movement.leaveGame(player.character)
+            store.saveCharacter(player.character)
+            player.character = None
+        store.players.remove(player)
+
+
+def runTick(store, library, heartbeat, profiler):
+    """
+    Move the game forward by one tick: advance world time, interpret each
+    player's input, and run the heartbeat.
+
+    Parameters
+    ----------
+    store: Store
+        The game store.
+    library:    Library
+        The game library.
+    heartbeat:  Heartbeat
+        The game's heartbeat.
+    profiler:   Profiler
+        Times each phase of the loop.
+    """
+
+    library.world.time.loop()
+
+    # Handle New Input
+    for player in store.players:
+        player.interpret()
+    profiler.mark('interpret')
+
+    heartbeat.heartbeat()
+    profiler.mark('heartbeat')
+
+
+def reportLoopTime(store, serverSocket, game_interpreter, clock, loop_time, loop_length):
+    """
+    Fold `loop_time` into the running average and periodically print the
+    performance metrics.
+
+    Parameters
+    ----------
+    store: Store
+        The game store.
+    serverSocket: ServerSocket
+        The server socket, whose backpressure counters we report.
+    game_interpreter:   CommandInterpreter
+        The game's command interpreter, whose rate limiting counter we report.
+    clock:  TickClock
+        The loop's clock, whose catch up counters we report.
+    loop_time:  int
+        How long the loop that just finished took, in nanoseconds.
+    loop_length:    float
+        The target length of a loop, in nanoseconds.
+    """
+
+    time = store.world.time
+
+    time.average_loop_time = (time.average_loop_time * (time.loop-1) + loop_time) / time.loop
+    if time.loop % (10 * time.loops_a_second) == 0 or time.loop == 1:
+        print("Game time: {0}:{1} {2} {3}, {4}".format(time.hour, time.minute, time.MONTH_NAME[time.month], time.day, time.year))
+        print("Performance Metrics for loop #{0:,d}".format(time.loop))
+        print("\tTarget: {0:,d} ns".format(int(loop_length)))
+        print("\tTime: {0:,d} ns -- Average: {1:,d} ns.".format(int(loop_time), int(time.average_loop_time)))
+        print("\tConnections: {0:,d} -- Dropped output: {1:,d} -- Evicted: {2:,d} -- Timed out: {3:,d}".format(
+            len(serverSocket.clients), serverSocket.droppedOutput, serverSocket.evictedClients,
+            serverSocket.timedOutClients))
+        print("\tThrottled commands: {0:,d}".format(game_interpreter.throttled))
+        print("\tCatch up ticks: {0:,d} -- Dropped ticks: {1:,d}".format(clock.caught_up, clock.dropped))
+        print("\tRetried saves: {0:,d} -- Failed saves: {1:,d}".format(store.persistence.retried,
+                                                                       store.persistence.errors))
+
+
+def announceStartup(store, port):
+    """
+    Tell whoever is watching that the server is up.  Only call this once the
+    server is listening, since scripts wait for it before connecting.
+    """
+
+    print('Starting up the server on world "' + store.world.name + '" on port ' + repr(port))
+
+
+def loopCounters(store, serverSocket, game_interpreter, clock):
+    """
+    Collect the counters we include in the profiler's metrics file.
+
+    Returns
+    -------
+    dict:   The counters, by name.
+    """
+
+    return {
+        'connections': len(serverSocket.clients),
+        'droppedOutput': serverSocket.droppedOutput,
+        'evictedClients': serverSocket.evictedClients,
+        'timedOutClients': serverSocket.timedOutClients,
+        'throttledCommands': game_interpreter.throttled,
+        'overruns': clock.overruns,
+        'catchUpTicks': clock.caught_up,
+        'droppedTicks': clock.dropped,
+        'retriedSaves': store.persistence.retried,
+        'failedSaves': store.persistence.errors
+    }
+
+
+def gameLoop(serverSocket, library, store, account_interpreter, game_interpreter, profiler):
     """
     The primary game loop.  This method loops indefinitely (until killed using
     a keyboard interrupt).  It handles new connections to the game and
@@ -47,6 +205,8 @@ def gameLoop(serverSocket, library, store, account_interpreter, game_interpreter
         An interpreter to be used for players in the Account Menu.
     game_interpreter:   CommandInterpreter
         An interpreter to be used for players who are playing the game.
+    profiler:   Profiler
+        Times each phase of the loop.
 
     Returns
     -------
@@ -56,70 +216,149 @@ def gameLoop(serverSocket, library, store, account_interpreter, game_interpreter
     # The length of a single loop in nanoseconds.
     loop_length = 1000000000/store.world.time.loops_a_second
 
-    overrun = 0
+    clock = TickClock(store.world.time.loops_a_second, max_catch_up=store.world.time.max_catch_up)
 
     heartbeat = Heartbeat(store, library)
 
     # The Game Loop
     while serverSocket.isOpen:
-        start_time = time.time_ns()
-
-        library.world.time.loop()
-
-        # Poll for input and output ready clients and then handle the
-        # communication.  Also accept new clients.
-        serverSocket.poll()
+        # Wait on the poll until the next tick is due, handling input, output
+        # and new connections as soon as they're ready rather than leaving them
+        # for the next tick.  Output written by a tick goes out as soon as the
+        # tick finishes.
+        #
+        # Polling without waiting first lets us time the poll itself apart
+        # from the wait, which is idle time and isn't counted in the loop's.
+        profiler.start()
+        ready = serverSocket.poll(0)
+        profiler.mark('poll')
+        if not ready and clock.remaining() > 0:
+            serverSocket.poll(clock.remaining())
+            profiler.idle('wait')
 
         serverSocket.handleReadSet()
+        profiler.mark('read')
         serverSocket.handleWriteSet()
+        profiler.mark('write')
         serverSocket.handleErrorSet()
 
         # If we have a new connection, create a player for it and send it to
         # the account flow starting with the welcome screen.
         if serverSocket.hasNewConnection():
             newConnection = serverSocket.accept() 
-            player = Player(newConnection, account_interpreter, game_interpreter)
-            player.status = player.STATUS_ACCOUNT
-            player.setAccountState("welcome-screen")
-            store.players.append(player)
+            if newConnection:
+                connectPlayer(newConnection, store, account_interpreter, game_interpreter)
+        profiler.mark('accept')
 
         serverSocket.resetPollSets()
 
-        # Handle New Input
-        for player in store.players:
-            player.interpret()
+        # The game itself only moves forward on the tick.
+        ticks = clock.dueTicks()
+        if not ticks:
+            continue
 
-        heartbeat.heartbeat()
+        start_time = time.time_ns()
+
+        serverSocket.evictStalledClients()
+        serverSocket.expireIdleClients()
+        disconnectPlayers(store, library)
+        profiler.mark('housekeeping')
+
+        # If we've fallen behind, run the ticks we missed back to back so that
+        # game time keeps up with real time.
+        for tick in range(ticks):
+            runTick(store, library, heartbeat, profiler)
 
         # Write prompts at the end of the loop if any reading or writing has
         # been done.
         for player in store.players:
             player.writePrompt()
+        profiler.mark('prompt')
+        profiler.finish(loopCounters(store, serverSocket, game_interpreter, clock))
+
+        loop_time = time.time_ns() - start_time
+        reportLoopTime(store, serverSocket, game_interpreter, clock, loop_time, loop_length)
+
+
+async def asyncGameLoop(serverSocket, library, store, account_interpreter, game_interpreter, profiler):
+    """
+    The game loop for the asyncio server mode.  Connections are served by
+    asyncio as their input arrives and their output is flushed as soon as a
+    tick finishes writing it, while the game itself ticks at a fixed rate as a
+    coroutine on the same event loop.
+
+    Parameters
+    ----------
+    serverSocket: StreamServerSocket
+        The asyncio server that player connections will be accepted on.
+    library:    Library
+        The game library.
+    store: Store
+        The game store.
+    account_interpreter:    StateInterpreter
+        An interpreter to be used for players in the Account Menu.
+    game_interpreter:   CommandInterpreter
+        An interpreter to be used for players who are playing the game.
+    profiler:   Profiler
+        Times each phase of the loop.
 
-        # Once we reach the end of the loop, calculate how long it took and
-        # sleep the remainder of the time.  This makes sure we don't loop more
-        # than we want to.  If we're going too slow, then we'll just have to
-        # keep going and hope we catch up.
-        end_time = time.time_ns()
-        loop_time = end_time - start_time
+    Returns
+    -------
+    void
+    """
 
-        store.world.time.average_loop_time = (store.world.time.average_loop_time * (store.world.time.loop-1) + loop_time) / store.world.time.loop
-        if store.world.time.loop % (10 * store.world.time.loops_a_second) == 0 or store.world.time.loop == 1:
-            print("Game time: {0}:{1} {2} {3}, {4}".format(store.world.time.hour, store.world.time.minute, store.world.time.MONTH_NAME[store.world.time.month], store.world.time.day, store.world.time.year))
-            print("Performance Metrics for loop #{0:,d}".format(store.world.time.loop))
-            print("\tTarget: {0:,d} ns".format(int(loop_length)))
-            print("\tTime: {0:,d} ns -- Average: {1:,d} ns.".format(int(loop_time), int(store.world.time.average_loop_time)))
+    await serverSocket.start()
+    announceStartup(store, serverSocket.port)
 
-        if loop_time < loop_length:
-            sleep_time = loop_length - loop_time - overrun
-            if sleep_time > 0:
-                time.sleep(sleep_time/1000000000.0)
-        elif loop_time > loop_length:
-            overrun = loop_time - loop_length
+    event_loop = asyncio.get_running_loop()
 
-        # Reset overrun.
-        if loop_time <= loop_length:
-            overrun = 0
+    # The length of a single loop in nanoseconds.
+    loop_length = 1000000000/store.world.time.loops_a_second
+
+    heartbeat = Heartbeat(store, library)
+
+    # Keep the ticks on the event loop's clock, which is monotonic.
+    clock = TickClock(store.world.time.loops_a_second, event_loop.time, store.world.time.max_catch_up)
+
+    try:
+        while serverSocket.isOpen:
+            profiler.start()
+
+            while serverSocket.hasNewConnection():
+                newConnection = serverSocket.accept()
+                if newConnection:
+                    connectPlayer(newConnection, store, account_interpreter, game_interpreter)
+            profiler.mark('accept')
+
+            # As in gameLoop(), the game itself only moves forward on the tick.
+            ticks = clock.dueTicks()
+            if not ticks:
+                await asyncio.sleep(clock.remaining())
+                continue
+
+            start_time = time.time_ns()
+
+            serverSocket.evictStalledClients()
+            serverSocket.expireIdleClients()
+            disconnectPlayers(store, library)
+            profiler.mark('housekeeping')
+
+            for tick in range(ticks):
+                runTick(store, library, heartbeat, profiler)
+
+            for player in store.players:
+                player.writePrompt()
+            profiler.mark('prompt')
+            profiler.finish(loopCounters(store, serverSocket, game_interpreter, clock))
+
+            loop_time = time.time_ns() - start_time
+            reportLoopTime(store, serverSocket, game_interpreter, clock, loop_time, loop_length)
+
+            # Yield to the connections until the next tick is due.  If we've
+            # fallen behind, catch up right away.
+            await asyncio.sleep(clock.remaining())
+    finally:
+        serverSocket.shutdown()
 
 
 def main():
@@ -132,14 +371,75 @@ def main():
     parser.add_argument('-p', '--port', dest='port', default=3000,
                         help="What port should we run the server on?")
 
+    parser.add_argument('--websocket-port', dest='websocket_port', type=int, default=None,
+                        help="Also accept WebSocket connections from browsers on this port.")
+
     parser.add_argument('--data', default='data/', help='The location of the data directory, relative to this file.')
     parser.add_argument('--world', default='base', help='The name of the world we want to run the server for.') 
-
-    parser.add_argument('--loops-a-second', dest='loops_a_second', default=10, help='The number of loops to allow in a second.')
+    parser.add_argument('--storage', choices=['file', 'sqlite'], default='file',
+                        help="Load and save the game's data as json files in the data directory, or in a SQLite "
+                        "database.  Use convert.py to import the data directory into a database.")
+    parser.add_argument('--database', default=None,
+                        help="The SQLite database to use with --storage sqlite.  Defaults to game.sqlite3 in the "
+                        "data directory.")
+
+    parser.add_argument('--asyncio', dest='asyncio', action='store_true',
+                        help="Serve connections with asyncio streams, running the game loop as a coroutine.")
+    parser.add_argument('--workers', dest='workers', type=int, default=0,
+                        help="Handle connections in this many worker processes sharing the port, leaving the game loop to the main process.")
+
+    parser.add_argument('--output-low-water', dest='output_low_water', type=int, default=ServerSocket.OUTPUT_LOW_WATER,
+                        help="Resume non-essential output to a backed up client once its unsent output drops to this many bytes.")
+    parser.add_argument('--output-high-water', dest='output_high_water', type=int, default=ServerSocket.OUTPUT_HIGH_WATER,
+                        help="Drop non-essential output to a client once its unsent output goes over this many bytes.")
+    parser.add_argument('--output-hard-limit', dest='output_hard_limit', type=int, default=ServerSocket.OUTPUT_HARD_LIMIT,
+                        help="Disconnect a client whose unsent output stays over this many bytes for too long.")
+    parser.add_argument('--stall-timeout', dest='stall_timeout', type=float, default=ServerSocket.STALL_TIMEOUT,
+                        help="How many seconds a client may stay over the output hard limit before it is disconnected.")
+    parser.add_argument('--idle-timeout', dest='idle_timeout', type=float, default=ServerSocket.IDLE_TIMEOUT,
+                        help="Disconnect clients that haven't sent any input in this many seconds.")
+    parser.add_argument('--login-timeout', dest='login_timeout', type=float, default=ServerSocket.LOGIN_TIMEOUT,
+                        help="Disconnect clients that haven't logged in within this many seconds.")
+
+    parser.add_argument('--metrics-file', dest='metrics_file', default=None,
+                        help="Periodically write timings for each phase of the game loop to this file, as json.  "
+                        "Send the server SIGUSR1 to print them.")
+    parser.add_argument('--metrics-interval', dest='metrics_interval', type=float, default=60,
+                        help="How often, in seconds, to write the metrics file.")
+
+    parser.add_argument('--fsync', action='store_true',
+                        help="Flush each save to disk before replacing the old file.  Slower, but saves survive a power "
+                        "failure.")
+
+    parser.add_argument('--lazy-rooms', dest='lazy_rooms', action='store_true',
+                        help="Load each room the first time it's needed, rather than loading every room at startup.")
+    parser.add_argument('--page-rooms', dest='page_rooms', action='store_true',
+                        help="Load the rooms around players as they move, and save and unload the rooms no one has "
+                        "been near for --page-idle seconds.  Implies --lazy-rooms.")
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=16,
+                        help="With --page-rooms, page the world's grid in square chunks this many rooms wide.")
+    parser.add_argument('--chunk-radius', dest='chunk_radius', type=int, default=8,
+                        help="With --page-rooms, load the chunks within this many rooms of each player.")
+    parser.add_argument('--page-idle', dest='page_idle', type=int, default=300,
+                        help="With --page-rooms, unload a chunk once no player has been near it for this many seconds.")
+    parser.add_argument('--snapshot', default=None,
+                        help="Write the game's state to this file on shutdown, and start from it, if it's there, "
+                        "instead of loading every file.")
+    parser.add_argument('--load-workers', dest='load_workers', type=int, default=0,
+                        help="Parse the data files in this many processes at startup.  Only worth it with several "
+                        "cores and a large world.")
+
+    parser.add_argument('--loops-a-second', dest='loops_a_second', type=int, default=10, help='The number of loops to allow in a second.')
+    parser.add_argument('--max-catch-up', dest='max_catch_up', type=int, default=5,
+                        help="The most ticks to run back to back when the loop falls behind.  Ticks past this are "
+                        "dropped.")
     parser.add_argument('--loop-sample-rate', dest='loop_sample_rate', default=10, help='Sample the loop time every `x` seconds.')
 
     arguments = parser.parse_args()
 
+    if arguments.asyncio and arguments.websocket_port:
+        parser.error("--websocket-port isn't supported with --asyncio.")
+
     random.seed()
 
     host = arguments.host
@@ -147,12 +447,41 @@ def main():
 
     data_directory = arguments.data
 
-    serverSocket = ServerSocket(host, port)
-
-    store = Store(arguments.world, data_directory)
-    store.load()
+    connection_limits = {
+        'outputLowWater': arguments.output_low_water,
+        'outputHighWater': arguments.output_high_water,
+        'outputHardLimit': arguments.output_hard_limit,
+        'stallTimeout': arguments.stall_timeout,
+        'idleTimeout': arguments.idle_timeout,
+        'loginTimeout': arguments.login_timeout
+    }
+
+    if arguments.asyncio:
+        serverSocket = StreamServerSocket(host, port, **connection_limits)
+    elif arguments.workers > 0:
+        serverSocket = WorkerServerSocket(host, port, workers=arguments.workers, websocketPort=arguments.websocket_port,
+                                          **connection_limits)
+    else:
+        serverSocket = ServerSocket(host, port, **connection_limits)
+        if arguments.websocket_port:
+            serverSocket.addListener(host, arguments.websocket_port, WebSocketClientSocket)
+
+    if arguments.storage == 'sqlite':
+        backend = SQLiteBackend(arguments.database or os.path.join(data_directory, 'game.sqlite3'), arguments.world)
+    else:
+        backend = FileBackend(data_directory, arguments.world, fsync=arguments.fsync, workers=arguments.load_workers)
+
+    store = Store(arguments.world, data_directory, backend, lazy=arguments.lazy_rooms)
+    if arguments.page_rooms:
+        store.rooms.enablePaging(arguments.chunk_size, arguments.chunk_radius,
+                                 arguments.page_idle * arguments.loops_a_second)
+    if arguments.snapshot and os.path.exists(arguments.snapshot):
+        store.restore(arguments.snapshot)
+    else:
+        store.load()
 
     store.world.time.loops_a_second = arguments.loops_a_second
+    store.world.time.max_catch_up = arguments.max_catch_up
 
     library = Library(store)
 
@@ -226,16 +555,35 @@ def main():
     commands['up'] = movement.Up(library, store)
     game_interpreter = CommandInterpreter(commands, library, store)
 
-    print('Starting up the server on world "' + store.world.name + '" on port ' + repr(port))
+    # Time each phase of the loop.  SIGUSR1 prints what we've got so far.
+    profiler = Profiler(arguments.metrics_file, arguments.metrics_interval)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, profiler.requestDump)
+
+    # Shut down cleanly on SIGTERM, as on a keyboard interrupt, so that we
+    # still write the snapshot.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
     try:
-        gameLoop(serverSocket, library, store, account_interpreter, game_interpreter)
+        if arguments.asyncio:
+            # The asyncio server only starts listening once the event loop is
+            # running, so it announces itself.
+            asyncio.run(asyncGameLoop(serverSocket, library, store, account_interpreter, game_interpreter, profiler))
+        else:
+            announceStartup(store, port)
+            gameLoop(serverSocket, library, store, account_interpreter, game_interpreter, profiler)
     except KeyboardInterrupt:
         print("Shutting down.")
         serverSocket.shutdown()
+        if arguments.snapshot:
+            store.snapshot(arguments.snapshot)
     except Exception as ex:
         print("Shutting down due to error.")
         serverSocket.shutdown()
         raise ex 
+    finally:
+        # Make sure every save has made it to disk before we exit.
+        store.close()
 
 
 if __name__ == '__main__':
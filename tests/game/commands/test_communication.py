@@ -77,7 +77,7 @@ def test_Say_to_player_populated_room():
 
     # Check the results
     speakingPlayer.write.assert_called_once_with('You say "Hello"')
-    listeningPlayer.write.assert_called_once_with('Speaker says "Hello"')
+    listeningPlayer.write.assert_called_once_with('Speaker says "Hello"', essential=False)
 
 
 def test_Say_to_npc_populated_room():
@@ -0,0 +1,49 @@
+from unittest.mock import Mock
+
+from game.interpreters.command.command import Command
+from game.interpreters.command.interpreter import CommandInterpreter
+from game.interpreters.command.limiter import TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    """
+    Test that a bucket allows a burst, then refills at its rate.
+    """
+
+    bucket = TokenBucket(2, 3)
+    now = bucket.updated
+
+    assert [bucket.take(now) for i in range(4)] == [True, True, True, False]
+    assert bucket.take(now + 0.25) is False
+    assert bucket.take(now + 0.5) is True
+    assert bucket.take(now + 100) is True
+    assert bucket.tokens == 2
+
+
+def test_interpret_throttles_by_command_class():
+    """
+    Test that commands past their class's limit are refused and counted,
+    without using up the limits of other classes.
+    """
+
+    class Move(Command):
+        RATE_CLASS = 'movement'
+
+    move = Move(None, None)
+    move.execute = Mock()
+    look = Command(None, None)
+    look.execute = Mock()
+
+    interpreter = CommandInterpreter({'north': move, 'look': look}, None, None,
+                                     limits={'movement': (0.001, 2), 'general': (0.001, 1)})
+    player = Mock()
+    player.limiter = None
+
+    for i in range(3):
+        interpreter.interpret(player, 'north')
+    interpreter.interpret(player, 'look')
+
+    assert move.execute.call_count == 2
+    assert look.execute.call_count == 1
+    assert interpreter.throttled == 1
+    player.write.assert_called_once_with("Slow down!  You're trying to do too much at once.")
@@ -3,7 +3,7 @@ from unittest.mock import Mock
 from game.library.library import Library
 from game.store.store import Store
 from game.player import Player
-from game.store.models.character import PlayerCharacter
+from game.store.models.character import Character, PlayerCharacter
 from game.account_menu.menu import AccountMenu
 
 def test_kill():
@@ -320,3 +320,98 @@ def test_adjustEnergy_boundaries():
     assert player.character.reserves.energy == 10000 
     assert success is True
 
+
+def test_drainReserves_matches_adjusting_each_character():
+    """
+    Test that draining reserves for everyone at once has the same effect as
+    adjusting each character's reserves one at a time.
+    """
+
+    positions = [PlayerCharacter.POSITION_STANDING, PlayerCharacter.POSITION_RESTING,
+                 PlayerCharacter.POSITION_SLEEPING]
+    starting = [
+        {'calories': 2400, 'thirst': 4000, 'wind': 30, 'energy': 10000},
+        {'calories': 1, 'thirst': 4100, 'wind': 0, 'energy': 9950},
+        {'calories': -1200, 'thirst': -10, 'wind': 29, 'energy': 0},
+        {'calories': 2, 'thirst': 2, 'wind': 12, 'energy': 50}
+    ]
+
+    def characters():
+        result = []
+        for index, reserves in enumerate(starting * 3):
+            character = PlayerCharacter()
+            character.player = Mock()
+            character.position = positions[index % len(positions)]
+            for name, value in reserves.items():
+                setattr(character.reserves, name, value)
+            result.append(character)
+        return result
+
+    store = Store('test', '')
+    library = Library(store)
+
+    expected = characters()
+    for character in expected:
+        library.character.adjustCalories(character, -2)
+        library.character.adjustThirst(character, -2)
+        if character.position == character.POSITION_STANDING:
+            library.character.adjustWind(character, 3)
+        elif character.position == character.POSITION_RESTING:
+            library.character.adjustWind(character, 5)
+            library.character.adjustEnergy(character, 100)
+
+    actual = characters()
+    library.character.drainReserves(actual)
+
+    assert len(store.reserves) == len(actual)
+    for left, right in zip(expected, actual):
+        assert left.reserves.toJson() == right.reserves.toJson()
+        assert left.attributes.toJson() == right.attributes.toJson()
+        assert left.position == right.position
+
+def test_drainReserves_kills_characters_who_starve():
+    """
+    Test that a character who starves to death when reserves are drained is
+    killed, and stops recovering wind.
+    """
+
+    store = Store('test', '')
+    library = Library(store)
+
+    socket = Mock()
+    player = Player(socket, Mock(), None)
+    player.write = Mock()
+
+    player.character = character = PlayerCharacter()
+    character.player = player
+    character.reserves.calories = -2400 * 10 + 2
+    character.reserves.wind = 0
+
+    library.character.drainReserves([character])
+
+    assert character.attributes.stamina == 0
+    assert character.position == character.POSITION_DEAD
+    assert character.reserves.wind == 0
+    assert player.character is None
+    assert player.status == player.STATUS_ACCOUNT
+
+
+def test_drainReserves_kills_npcs_who_starve():
+    """
+    Test that an NPC, who has no player, can starve to death alongside a
+    player character.
+    """
+
+    store = Store('test', '')
+    library = Library(store)
+
+    npc = Character()
+    npc.reserves.calories = -2400 * 10 + 2
+
+    character = PlayerCharacter()
+    character.player = Mock()
+
+    library.character.drainReserves([npc, character])
+
+    assert npc.position == npc.POSITION_DEAD
+    assert character.position == character.POSITION_STANDING
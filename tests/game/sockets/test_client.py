@@ -0,0 +1,245 @@
+from unittest.mock import Mock
+
+from game.sockets.client import ClientSocket
+from game.sockets.server import ServerSocket
+
+
+def mockServer(**limits):
+    """
+    Build a stand in for the ServerSocket with real backpressure limits.
+    """
+
+    server = Mock()
+    server.outputLowWater = limits.get('outputLowWater', ServerSocket.OUTPUT_LOW_WATER)
+    server.outputHighWater = limits.get('outputHighWater', ServerSocket.OUTPUT_HIGH_WATER)
+    server.outputHardLimit = limits.get('outputHardLimit', ServerSocket.OUTPUT_HARD_LIMIT)
+    server.stallTimeout = limits.get('stallTimeout', ServerSocket.STALL_TIMEOUT)
+    server.stalled = set()
+    server.droppedOutput = 0
+    return server
+
+
+def recordingSend(sent, limit=None):
+    """
+    Build a fake `socket.send` that records what it was given and accepts up
+    to `limit` bytes at a time.
+    """
+
+    def send(data):
+        accepted = bytes(data[:limit]) if limit else bytes(data)
+        sent.append(accepted)
+        return len(accepted)
+    return send
+
+
+def test_write_sends_whole_buffer():
+    """
+    Test write when the socket takes all of the output at once.
+    """
+
+    sent = []
+    socket = Mock()
+    socket.send = Mock(side_effect=recordingSend(sent))
+    server = mockServer()
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), server)
+    client.appendToOutputBuffer("Hello ")
+    client.appendToOutputBuffer("world.")
+
+    server.watchWrite.assert_called_once_with(client)
+
+    client.write()
+
+    assert sent == [b"Hello world."]
+    assert client.hasOutput() is False
+    server.unwatchWrite.assert_called_once_with(client)
+
+
+def test_write_resumes_after_partial_send():
+    """
+    Test write when the socket only takes part of the output.  The remainder
+    should be sent on the next write.
+    """
+
+    sent = []
+    socket = Mock()
+    socket.send = Mock(side_effect=recordingSend(sent, 4))
+    server = mockServer()
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), server)
+    client.appendToOutputBuffer("0123456789")
+
+    client.write()
+    assert client.hasOutput() is True
+    server.unwatchWrite.assert_not_called()
+
+    client.write()
+    client.write()
+
+    assert b"".join(sent) == b"0123456789"
+    assert client.hasOutput() is False
+    server.unwatchWrite.assert_called_once_with(client)
+
+
+def test_write_keeps_output_when_socket_would_block():
+    """
+    Test write when the socket isn't ready to take any output.
+    """
+
+    socket = Mock()
+    socket.send = Mock(side_effect=BlockingIOError)
+    server = mockServer()
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), server)
+    client.appendToOutputBuffer("Hello")
+
+    client.write()
+
+    assert client.hasOutput() is True
+    server.unwatchWrite.assert_not_called()
+
+    sent = []
+    socket.send = Mock(side_effect=recordingSend(sent))
+    client.write()
+
+    assert sent == [b"Hello"]
+    assert client.hasOutput() is False
+
+
+def test_receive_queues_pipelined_lines_in_order():
+    """
+    Test receive with several commands arriving in one packet.
+    """
+
+    client = ClientSocket((Mock(), ('127.0.0.1', 0)), mockServer())
+
+    client.receive(b"look\r\nnorth\r\nsay hello\r\n")
+
+    assert client.popInput() == "look"
+    assert client.popInput() == "north"
+    assert client.popInput() == "say hello"
+    assert not client.hasInput()
+
+
+def test_receive_holds_partial_lines():
+    """
+    Test receive with a line, and a multibyte character, split across reads.
+    """
+
+    client = ClientSocket((Mock(), ('127.0.0.1', 0)), mockServer())
+
+    encoded = "say café\n".encode()
+    client.receive(encoded[:8])
+    assert not client.hasInput()
+
+    client.receive(encoded[8:])
+    assert client.popInput() == "say café"
+
+
+def test_receive_discards_overlong_lines():
+    """
+    Test receive with a line longer than MAX_LINE_LENGTH.
+    """
+
+    client = ClientSocket((Mock(), ('127.0.0.1', 0)), mockServer())
+
+    client.receive(b"x" * (ClientSocket.MAX_LINE_LENGTH + 1))
+    client.receive(b"xxxx\nlook\n")
+
+    assert client.popInput() == "look"
+    assert not client.hasInput()
+
+
+def test_receive_discards_overlong_lines_that_arrive_whole():
+    """
+    Test receive with a 10 KB line that arrives, newline and all, in one read.
+    """
+
+    client = ClientSocket((Mock(), ('127.0.0.1', 0)), mockServer())
+
+    client.receive(b"x" * 10240 + b"\nlook\n")
+
+    assert client.popInput() == "look"
+    assert not client.hasInput()
+    assert client.droppedInput == 1
+    assert b"too long" in bytes(client.outputBuffer)
+
+
+def test_appendToOutputBuffer_drops_non_essential_output_when_congested():
+    """
+    Test that non-essential output is dropped above the high water mark, and
+    resumes once the client drains below the low water mark.
+    """
+
+    sent = []
+    socket = Mock()
+    socket.send = Mock(side_effect=BlockingIOError)
+    server = mockServer(outputLowWater=4, outputHighWater=8, outputHardLimit=16)
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), server)
+    client.appendToOutputBuffer("0123456789")
+    assert client.isCongested is True
+
+    client.appendToOutputBuffer("broadcast", essential=False)
+    client.appendToOutputBuffer("!")
+    assert client.droppedOutput == 1
+    assert server.droppedOutput == 1
+
+    socket.send = Mock(side_effect=recordingSend(sent))
+    client.write()
+    assert client.isCongested is False
+
+    client.appendToOutputBuffer("broadcast", essential=False)
+    client.write()
+    assert sent == [b"0123456789!", b"broadcast"]
+
+
+def test_checkCongestion_tracks_stalled_clients():
+    """
+    Test that a client over the hard limit is tracked as stalled until it
+    drains.
+    """
+
+    socket = Mock()
+    socket.send = Mock(side_effect=BlockingIOError)
+    server = mockServer(outputLowWater=4, outputHighWater=8, outputHardLimit=16)
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), server)
+    client.appendToOutputBuffer("x" * 20)
+    assert client.stalledSince is not None
+    assert client in server.stalled
+
+    socket.send = Mock(side_effect=lambda data: len(data))
+    client.write()
+    assert client.stalledSince is None
+    assert client not in server.stalled
+
+
+def test_input_queue_is_capped():
+    """
+    Test that a client flooding us with input has lines past the queue's cap
+    dropped.
+    """
+
+    client = ClientSocket((Mock(), ('127.0.0.1', 0)), mockServer())
+
+    client.receive(b"north\n" * (ClientSocket.MAX_INPUT_QUEUE + 5))
+
+    assert len(client.inputQueue) == ClientSocket.MAX_INPUT_QUEUE
+    assert client.droppedInput == 5
+
+
+def test_read_closes_on_connection_reset():
+    """
+    Test that a peer resetting the connection closes it rather than raising.
+    """
+
+    socket = Mock()
+    socket.recv = Mock(side_effect=ConnectionResetError())
+    server = mockServer()
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), server)
+    client.read()
+
+    assert client.isClosed
+    server.remove.assert_called_once_with(client)
@@ -0,0 +1,96 @@
+import zlib
+from unittest.mock import Mock
+
+from game.sockets import telnet
+from game.sockets.client import ClientSocket
+from game.sockets.telnet import TelnetProtocol, IAC, SB, SE, WILL, WONT, DO, DONT
+
+from tests.game.sockets.test_client import mockServer, recordingSend
+
+
+def test_feed_strips_commands_split_across_reads():
+    """
+    Test that feed removes telnet commands from the input, even when they
+    arrive split across reads.
+    """
+
+    connection = Mock()
+    protocol = TelnetProtocol(connection)
+
+    text = protocol.feed(b"lo" + bytes((IAC, WONT)))
+    text += protocol.feed(bytes((telnet.ECHO,)) + b"ok\n")
+
+    assert text == b"look\n"
+
+
+def test_feed_keeps_escaped_iac():
+    """
+    Test that an escaped IAC comes through as a data byte.
+    """
+
+    protocol = TelnetProtocol(Mock())
+
+    assert protocol.feed(b"a" + bytes((IAC, IAC)) + b"b") == b"a\xffb"
+
+
+def test_feed_reads_window_size_and_terminal_type():
+    """
+    Test the NAWS and TTYPE negotiations.
+    """
+
+    connection = Mock()
+    protocol = TelnetProtocol(connection)
+
+    protocol.feed(bytes((IAC, WILL, telnet.NAWS)))
+    protocol.feed(bytes((IAC, SB, telnet.NAWS, 0, 120, 0, 40, IAC, SE)))
+    assert protocol.width == 120
+    assert protocol.height == 40
+
+    protocol.feed(bytes((IAC, WILL, telnet.TTYPE)))
+    connection.appendRawOutput.assert_called_with(bytes((IAC, SB, telnet.TTYPE, telnet.TTYPE_SEND, IAC, SE)))
+
+    protocol.feed(bytes((IAC, SB, telnet.TTYPE, telnet.TTYPE_IS)) + b"xterm" + bytes((IAC, SE)))
+    assert protocol.terminal_type == "xterm"
+
+
+def test_feed_refuses_unknown_options():
+    """
+    Test that we refuse options we don't support.
+    """
+
+    connection = Mock()
+    protocol = TelnetProtocol(connection)
+
+    protocol.feed(bytes((IAC, DO, telnet.SGA)))
+    connection.appendRawOutput.assert_called_once_with(bytes((IAC, WONT, telnet.SGA)))
+
+
+def test_output_is_compressed_once_client_agrees_to_mccp2():
+    """
+    Test that all output after the MCCP2 subnegotiation is compressed.
+    """
+
+    sent = []
+    socket = Mock()
+    socket.send = Mock(side_effect=recordingSend(sent))
+
+    client = ClientSocket((socket, ('127.0.0.1', 0)), mockServer())
+    client.open()
+    client.write()
+    assert sent[0].startswith(bytes((IAC, WILL, telnet.COMPRESS2)))
+
+    sent.clear()
+    client.receive(bytes((IAC, DO, telnet.COMPRESS2)))
+    client.appendToOutputBuffer("A Rocky Beach\n" * 10)
+    client.write()
+
+    output = b"".join(sent)
+    start = bytes((IAC, SB, telnet.COMPRESS2, IAC, SE))
+    assert output.startswith(start)
+
+    compressed = output[len(start):]
+    assert len(compressed) < len("A Rocky Beach\n" * 10)
+    assert zlib.decompressobj().decompress(compressed) == b"A Rocky Beach\n" * 10
+
+    client.receive(bytes((IAC, DONT, telnet.COMPRESS2)))
+    assert client.compressor is None
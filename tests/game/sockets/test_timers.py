@@ -0,0 +1,63 @@
+from unittest.mock import Mock
+
+from game.sockets.timers import TimerWheel, ConnectionTimeouts
+
+
+def test_wheel_expires_only_due_timers():
+    """
+    Test that timers expire once they're due, including timers more than a
+    turn of the wheel away and timers we skipped past.
+    """
+
+    wheel = TimerWheel(resolution=1.0, slots=8, now=100.0)
+    wheel.schedule('soon', 102.5)
+    wheel.schedule('later', 112.5)
+    wheel.schedule('cancelled', 101.0)
+    wheel.cancel('cancelled')
+
+    assert wheel.expire(102.0) == []
+    assert wheel.expire(103.0) == ['soon']
+    assert wheel.expire(110.0) == []
+    assert wheel.expire(150.0) == ['later']
+    assert len(wheel) == 0
+
+
+def test_timeouts_reschedule_active_clients():
+    """
+    Test that a client that's been active since its timer was set gets a new
+    timer rather than being closed, and that clients still logging in are held
+    to the login timeout.
+    """
+
+    timeouts = ConnectionTimeouts(idleTimeout=60, loginTimeout=10)
+    now = timeouts.wheel.tick * timeouts.wheel.resolution
+
+    playing = Mock(connectedAt=now, lastActivity=now)
+    playing.player.isLoggingIn.return_value = False
+    loggingIn = Mock(connectedAt=now, lastActivity=now)
+    loggingIn.player.isLoggingIn.return_value = True
+
+    timeouts.add(playing)
+    timeouts.add(loggingIn)
+
+    assert timeouts.expire(now + 30) == [loggingIn]
+
+    playing.lastActivity = now + 50
+    assert timeouts.expire(now + 61) == []
+    assert timeouts.expire(now + 111) == [playing]
+
+
+def test_wheel_covers_the_longest_timeout():
+    """
+    Test that the connection timeouts' wheel is big enough that every timer
+    is hashed into a slot it's due in on the wheel's current turn.
+    """
+
+    timeouts = ConnectionTimeouts(idleTimeout=3600, loginTimeout=300)
+    wheel = timeouts.wheel
+
+    client = Mock(connectedAt=0, lastActivity=wheel.tick * wheel.resolution)
+    client.player.isLoggingIn.return_value = False
+    timeouts.add(client)
+
+    assert wheel.slots[wheel.timers[client]][client] - wheel.tick < len(wheel.slots)
@@ -0,0 +1,129 @@
+import os
+from unittest.mock import Mock
+
+from game.sockets import websocket
+from game.sockets.websocket import WebSocketClientSocket, encodeFrame
+
+from tests.game.sockets.test_client import mockServer, recordingSend
+
+HANDSHAKE = (b"GET / HTTP/1.1\r\n"
+             b"Host: localhost\r\n"
+             b"Upgrade: websocket\r\n"
+             b"Connection: Upgrade\r\n"
+             b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+             b"Sec-WebSocket-Version: 13\r\n\r\n")
+
+
+def clientFrame(opcode, payload, final=True):
+    'Build a masked frame, as a browser would send it.'
+
+    mask = os.urandom(4)
+    masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+    length = len(payload)
+    first = (0x80 if final else 0) | opcode
+    if length < 126:
+        header = bytes((first, 0x80 | length))
+    else:
+        header = bytes((first, 0x80 | 126)) + length.to_bytes(2, 'big')
+    return header + mask + masked
+
+
+def connectedClient(sent):
+    socket = Mock()
+    socket.send = Mock(side_effect=recordingSend(sent))
+
+    client = WebSocketClientSocket((socket, ('127.0.0.1', 0)), mockServer())
+    client.open()
+    client.receive(HANDSHAKE)
+    client.write()
+    return client
+
+
+def test_handshake_accepts_upgrade():
+    """
+    Test the handshake response, using the example key from RFC 6455, and that
+    output waits for it.
+    """
+
+    sent = []
+    socket = Mock()
+    socket.send = Mock(side_effect=recordingSend(sent))
+
+    client = WebSocketClientSocket((socket, ('127.0.0.1', 0)), mockServer())
+    client.appendToOutputBuffer("Welcome to Muddy Reality!\n")
+    client.write()
+    assert sent == []
+
+    client.receive(HANDSHAKE)
+    client.write()
+
+    response = b"".join(sent)
+    assert response.startswith(b"HTTP/1.1 101 Switching Protocols\r\n")
+    assert b"Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=\r\n" in response
+    assert response.endswith(b"\r\n\r\n" + encodeFrame(websocket.OPCODE_TEXT, b"Welcome to Muddy Reality!\n"))
+
+
+def test_handshake_rejects_plain_http():
+    """
+    Test that a request that isn't a WebSocket upgrade is turned away.
+    """
+
+    sent = []
+    socket = Mock()
+    socket.send = Mock(side_effect=recordingSend(sent))
+
+    client = WebSocketClientSocket((socket, ('127.0.0.1', 0)), mockServer())
+    client.receive(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+
+    assert b"".join(sent).startswith(b"HTTP/1.1 400")
+    assert client.isClosed
+
+
+def test_messages_are_lines_of_input():
+    """
+    Test that each text message becomes a line of input, including messages
+    that are fragmented or split across reads.
+    """
+
+    client = connectedClient([])
+
+    data = clientFrame(websocket.OPCODE_TEXT, b"look") + clientFrame(websocket.OPCODE_TEXT, b"say ", final=False)
+    data += clientFrame(websocket.OPCODE_CONTINUATION, "hi ñ".encode())
+    client.receive(data[:5])
+    client.receive(data[5:])
+
+    assert list(client.inputQueue) == ["look", "say hi ñ"]
+
+
+def test_output_is_sent_as_one_frame_per_write():
+    """
+    Test that everything appended between writes goes out in a single frame.
+    """
+
+    sent = []
+    client = connectedClient(sent)
+    sent.clear()
+
+    client.appendToOutputBuffer("A Rocky Beach\n")
+    client.appendToOutputBuffer("You see a rabbit.\n")
+    client.write()
+
+    assert sent == [encodeFrame(websocket.OPCODE_TEXT, b"A Rocky Beach\nYou see a rabbit.\n")]
+
+
+def test_ping_and_close():
+    """
+    Test that we answer pings, and close when the client does.
+    """
+
+    sent = []
+    client = connectedClient(sent)
+    sent.clear()
+
+    client.receive(clientFrame(websocket.OPCODE_PING, b"hello"))
+    client.write()
+    assert sent == [encodeFrame(websocket.OPCODE_PONG, b"hello")]
+
+    client.receive(clientFrame(websocket.OPCODE_CLOSE, b""))
+    assert client.isClosed
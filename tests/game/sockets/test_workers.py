@@ -0,0 +1,98 @@
+import multiprocessing
+import socket
+from unittest.mock import Mock
+
+from game.sockets.workers import ConnectionWorker, PipeReader, PipeWriter, RemoteClientSocket
+
+
+def test_worker_forwards_input_and_writes_world_output():
+    """
+    Test that a worker passes a connection's lines to the world process and
+    writes out the output the world process sends back.
+    """
+
+    world, to_world = multiprocessing.Pipe(duplex=False)
+    from_world, to_worker = multiprocessing.Pipe(duplex=False)
+    writer = PipeWriter(to_worker)
+    worker = ConnectionWorker('127.0.0.1', 0, to_world, PipeReader(from_world))
+    port = worker.server.getsockname()[1]
+
+    client = socket.create_connection(('127.0.0.1', port))
+    client.settimeout(1)
+    try:
+        worker.step(1)
+        events, dropped, evicted = world.recv()
+        assert events[0][0] == 'open'
+        id = events[0][1]
+
+        # The telnet negotiation goes out first.
+        worker.step(1)
+        client.recv(4096)
+        client.sendall(b"look\nsay hi\n")
+        while not world.poll():
+            worker.step(1)
+        events, dropped, evicted = world.recv()
+        assert events == [('input', id, ['look', 'say hi'])]
+
+        writer.send(([(id, "A Rocky Beach\n", True)], []))
+        worker.step(1)
+        worker.step(1)
+        assert client.recv(4096) == b"A Rocky Beach\n"
+
+        # Control messages are applied in order with the output.
+        writer.send(([(id, "Password: ", True), (id, None, 'disableEcho')], []))
+        worker.step(1)
+        worker.step(1)
+        assert client.recv(4096) == b"Password: \xff\xfb\x01"
+
+        writer.send(([], [id]))
+        worker.step(1)
+        assert client.recv(4096) == b""
+        assert worker.clients == []
+    finally:
+        client.close()
+        worker.shutdown()
+        world.close()
+        writer.close()
+
+
+def test_pipe_to_a_worker_never_blocks():
+    """
+    Test that writing more to a worker's pipe than it will hold keeps the rest
+    until the worker reads, rather than blocking.
+    """
+
+    from_world, to_worker = multiprocessing.Pipe(duplex=False)
+    writer = PipeWriter(to_worker)
+    reader = PipeReader(from_world)
+    try:
+        output = [(1, str(index) * 1000, True) for index in range(1000)]
+        writer.send((output, []))
+        writer.send(None)
+        assert writer.hasOutput()
+
+        messages = []
+        while writer.hasOutput() or len(messages) < 2:
+            messages.extend(reader.receive())
+            writer.flush()
+        assert messages == [(output, []), None]
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_remote_client_forwards_echo_with_its_output():
+    """
+    Test that turning echo off or on in the world process is passed to the
+    worker along with the output, in order.
+    """
+
+    worker = Mock(output=[], closed=[])
+    client = RemoteClientSocket(Mock(), worker, 7, ('127.0.0.1', 4000))
+
+    client.appendToOutputBuffer("Password: ")
+    client.disableEcho()
+    client.enableEcho()
+    client.write()
+
+    assert worker.output == [(7, "Password: ", True), (7, None, 'disableEcho'), (7, None, 'enableEcho')]
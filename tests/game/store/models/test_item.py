@@ -0,0 +1,57 @@
+import pytest
+
+from game.store.models.item import Container
+from game.store.models.item import Item
+
+
+def prototype():
+    return Item().fromJson({
+        'name': 'berry bush', 'description': 'a berry bush', 'details': 'A bush covered in berries.',
+        'keywords': 'berry bush', 'length': 1, 'width': 1, 'height': 1, 'weight': 10, 'canPickUp': False,
+        'traits': {
+            'Harvestable': {'products': [{'product': 'berry', 'amount': 5}], 'consumed': False, 'calories': 0,
+                            'time': 10, 'action': 'harvest', 'required_tools': []},
+            'Food': {'calories': 50}
+        }
+    })
+
+
+def test_instances_share_their_prototype():
+    bush = prototype()
+    instance = bush.instance()
+
+    assert instance.prototype is bush
+    assert instance.getId() == 'berry bush'
+    assert instance.description == 'a berry bush'
+    assert instance.traits['Food'] is bush.traits['Food']
+    assert instance.traits['Harvestable'].products is bush.traits['Harvestable'].products
+    assert instance.toJson() == bush.toJson()
+
+    # The instance doesn't hold a copy of its own.
+    with pytest.raises(AttributeError):
+        object.__getattribute__(instance, 'description')
+
+
+def test_changing_an_instance_leaves_the_prototype():
+    bush = prototype()
+    first = bush.instance()
+    second = bush.instance()
+
+    first.description = 'a bare berry bush'
+    first.traits['Harvestable'].harvested = True
+    first.markDirty()
+
+    assert bush.description == second.description == 'a berry bush'
+    assert not bush.traits['Harvestable'].harvested
+    assert not second.traits['Harvestable'].harvested
+    assert not bush.isDirty() and not second.isDirty()
+    assert first.isDirty()
+
+
+def test_container_instances_have_their_own_contents():
+    chest = Container()
+    first = chest.instance()
+    second = chest.instance()
+
+    first.contents.append(Item())
+    assert chest.contents == second.contents == []
@@ -0,0 +1,94 @@
+import pytest
+
+from game.store.backends.backend import StorageError
+from game.store.backends.backend import copyStorage
+from game.store.backends.files import FileBackend
+from game.store.backends.sqlite import SQLiteBackend
+
+
+WORLD = {'name': 'test', 'width': 2, 'roomWidth': 1, 'rooms': [[1, 2]]}
+
+MODELS = {
+    'items': [{'name': 'rock'}, {'name': 'stick'}],
+    'npcs': [{'name': 'deer'}],
+    'characters': [{'name': 'bob'}],
+    'accounts': [{'name': 'bob', 'characters': ['bob']}],
+    'rooms': [{'id': 1, 'title': 'A Clearing'}, {'id': 2, 'title': 'A Meadow'}]
+}
+
+
+def populate(backend):
+    backend.saveWorld(WORLD)
+    for kind, models in MODELS.items():
+        backend.saveMany([(kind, model.get('id', model.get('name')), model) for model in models])
+
+
+def assertPopulated(backend):
+    assert backend.loadWorld() == WORLD
+    for kind, models in MODELS.items():
+        assert sorted(backend.load(kind), key=str) == sorted(models, key=str)
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'file':
+        backend = FileBackend(str(tmp_path), 'test')
+    else:
+        backend = SQLiteBackend(str(tmp_path / 'game.sqlite3'), 'test')
+    yield backend
+    backend.close()
+
+
+def test_saved_models_load(backend):
+    populate(backend)
+    assertPopulated(backend)
+
+
+def test_loadOne_loads_a_single_model(backend):
+    populate(backend)
+    assert backend.loadOne('rooms', 2) == {'id': 2, 'title': 'A Meadow'}
+    assert backend.loadOne('characters', 'bob') == {'name': 'bob'}
+    assert backend.loadOne('rooms', 3) is None
+
+
+def test_files_parse_in_worker_processes(tmp_path):
+    populate(FileBackend(str(tmp_path), 'test'))
+
+    backend = FileBackend(str(tmp_path), 'test', workers=2)
+    assertPopulated(backend)
+    backend.close()
+
+
+def test_saving_again_replaces(backend):
+    backend.save('characters', 'bob', {'name': 'bob', 'version': 1})
+    backend.save('characters', 'bob', {'name': 'bob', 'version': 2})
+
+    assert list(backend.load('characters')) == [{'name': 'bob', 'version': 2}]
+
+
+def test_models_that_cant_be_saved_are_reported(backend):
+    with pytest.raises(StorageError) as error:
+        backend.saveMany([('characters', 'bad', {'name': object()}), ('characters', 'good', {'name': 'good'})])
+
+    assert error.value.failed == [('characters', 'bad')]
+    assert list(backend.load('characters')) == [{'name': 'good'}]
+
+
+def test_import_and_export_round_trip(tmp_path):
+    """
+    Test that copying the data directory into a database and back out again
+    preserves everything.
+    """
+
+    files = FileBackend(str(tmp_path / 'data'), 'test')
+    populate(files)
+
+    database = SQLiteBackend(str(tmp_path / 'game.sqlite3'), 'test')
+    counts = copyStorage(files, database)
+    assert counts == {kind: len(models) for kind, models in MODELS.items()}
+    assertPopulated(database)
+
+    exported = FileBackend(str(tmp_path / 'exported'), 'test')
+    copyStorage(database, exported)
+    database.close()
+    assertPopulated(exported)
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+from game.store.persistence import WriteBehind
+from game.store.backends.files import FileBackend
+
+
+def test_save_writes_json(tmp_path):
+    """
+    Test that a queued save ends up on disk, without leaving the temporary file
+    behind.
+    """
+
+    persistence = WriteBehind(FileBackend(str(tmp_path), 'test', fsync=True))
+
+    persistence.save('characters', 'bob', {'name': 'bob'})
+    persistence.close()
+
+    with open(str(tmp_path / 'characters' / 'bob.json')) as file:
+        assert json.load(file) == {'name': 'bob'}
+    assert os.listdir(str(tmp_path / 'characters')) == ['bob.json']
+    assert persistence.written == 1
+
+
+def test_saves_of_the_same_model_coalesce(tmp_path):
+    """
+    Test that saving a model again before it's been written only writes the
+    latest snapshot.
+    """
+
+    persistence = WriteBehind(FileBackend(str(tmp_path), 'test'))
+
+    # Hold up the writer, so the saves queue up behind the first.
+    blocked = threading.Event()
+    release = threading.Event()
+    write = persistence.write
+
+    def slowWrite(records):
+        blocked.set()
+        release.wait()
+        return write(records)
+    persistence.write = slowWrite
+
+    persistence.save('characters', 'alice', {'name': 'alice'})
+    blocked.wait()
+    for index in range(5):
+        persistence.save('characters', 'bob', {'name': 'bob', 'index': index})
+    release.set()
+    persistence.flush()
+
+    with open(str(tmp_path / 'characters' / 'bob.json')) as file:
+        assert json.load(file) == {'name': 'bob', 'index': 4}
+    assert persistence.written == 2
+    assert persistence.coalesced == 4
+    persistence.close()
+
+
+def test_failed_writes_are_counted(tmp_path):
+    persistence = WriteBehind(FileBackend(str(tmp_path), 'test'))
+    persistence.RETRY_DELAY = 0
+    persistence.save('characters', 'bad', {'not json': object()})
+    persistence.save('characters', 'good', {'name': 'good'})
+    persistence.close()
+
+    assert persistence.retried == WriteBehind.RETRIES - 1
+    assert persistence.errors == 1
+    assert persistence.written == 1
+    assert os.listdir(str(tmp_path / 'characters')) == ['good.json']
+
+
+class BrokenBackend:
+    'A backend whose first batch fails with an unexpected error.'
+
+    def __init__(self):
+        self.batches = []
+
+    def saveMany(self, records):
+        self.batches.append(records)
+        if len(self.batches) == 1:
+            raise RuntimeError("The disk caught fire.")
+
+
+def test_unexpected_errors_dont_stop_the_writer():
+    """
+    Test that a batch that fails with an unexpected error is retried, and the
+    writer goes on to write the next one.
+    """
+
+    backend = BrokenBackend()
+    persistence = WriteBehind(backend)
+    persistence.RETRY_DELAY = 0
+
+    persistence.save('characters', 'bob', {'name': 'bob'})
+    persistence.flush()
+    assert persistence.retried == 1
+    assert persistence.written == 1
+    assert backend.batches[-1] == [('characters', 'bob', {'name': 'bob'})]
+
+    persistence.save('characters', 'alice', {'name': 'alice'})
+    persistence.close()
+
+    assert persistence.errors == 0
+    assert persistence.written == 2
+    assert backend.batches[-1] == [('characters', 'alice', {'name': 'alice'})]
+    assert persistence.attempts == {}
@@ -0,0 +1,186 @@
+import os
+import pickle
+from unittest.mock import Mock
+
+import pytest
+
+from game.store.store import Store
+from game.store.snapshot import Snapshot
+from game.store.snapshot import SnapshotError
+from game.store.backends.files import FileBackend
+from game.store.models.base import slotValues
+from game.store.models.character import PlayerCharacter
+
+
+WORLD = {'name': 'test', 'width': 1, 'roomWidth': 100, 'rooms': [[1]]}
+
+ROOM = {'id': 1, 'title': 'A Clearing', 'description': '', 'color': [], 'waterType': 'none', 'water': 0,
+        'waterVelocity': 0, 'exits': {}, 'items': [], 'occupants': []}
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'game.snapshot')
+    Snapshot('test', WORLD, {'characters': [{'name': 'bob'}]}, {'rooms': []}).write(path)
+
+    snapshot = Snapshot.read(path, 'test')
+    assert snapshot.name == 'test'
+    assert snapshot.loadWorld() == WORLD
+    assert snapshot.load('characters') == [{'name': 'bob'}]
+    assert snapshot.load('accounts') == []
+    assert snapshot.loadLive('rooms') == []
+    assert snapshot.loadLive('items') is None
+
+
+def test_unreadable_snapshots_are_refused(tmp_path):
+    path = str(tmp_path / 'game.snapshot')
+
+    with pytest.raises(SnapshotError):
+        Snapshot.read(path)
+
+    with open(path, 'wb') as file:
+        file.write(b'{"name": "test"}')
+    with pytest.raises(SnapshotError):
+        Snapshot.read(path)
+
+    with open(path, 'wb') as file:
+        file.write(Snapshot.HEADER.pack(Snapshot.MAGIC, Snapshot.VERSION + 1, Snapshot.COMPLETE, 0))
+    with pytest.raises(SnapshotError, match='version'):
+        Snapshot.read(path)
+
+    header = Snapshot.HEADER.pack(Snapshot.MAGIC, Snapshot.VERSION, Snapshot.COMPLETE, 4) + b'test'
+    with open(path, 'wb') as file:
+        file.write(header + b'\x80\x05garbage')
+    with pytest.raises(SnapshotError):
+        Snapshot.read(path)
+
+    # A pickle of something other than a snapshot.
+    with open(path, 'wb') as file:
+        file.write(header + pickle.dumps({'world': {}}))
+    with pytest.raises(SnapshotError, match='damaged'):
+        Snapshot.read(path)
+
+    Snapshot('test', WORLD, {}).write(path)
+    with pytest.raises(SnapshotError, match='world'):
+        Snapshot.read(path, 'base')
+
+
+def test_store_restores_its_snapshot(tmp_path):
+    """
+    Test that a store restored from a snapshot has the state the snapshot was
+    taken from, including the time, and that the backend was brought up to
+    date when it was taken.
+    """
+
+    backend = FileBackend(str(tmp_path / 'data'), 'test')
+    backend.saveWorld(WORLD)
+    backend.save('rooms', 1, ROOM)
+    path = str(tmp_path / 'game.snapshot')
+
+    store = Store('test', '', backend)
+    store.load()
+    store.world.time.loop = 1234
+
+    room = store.rooms.getById(1)
+    room.title = 'A Meadow'
+    store.markRoomDirty(room)
+
+    store.snapshot(path)
+    store.close()
+    assert backend.loadOne('rooms', 1)['title'] == 'A Meadow'
+
+    restored = Store('test', '', FileBackend(str(tmp_path / 'data'), 'test'))
+    assert restored.restore(path)
+    assert restored.world.time.loop == 1234
+    assert restored.rooms.getById(1).title == 'A Meadow'
+    assert not os.path.exists(path)
+
+
+def test_store_falls_back_to_its_backend(tmp_path):
+    backend = FileBackend(str(tmp_path / 'data'), 'test')
+    backend.saveWorld(WORLD)
+    backend.save('rooms', 1, ROOM)
+
+    store = Store('test', '', backend)
+    assert not store.restore(str(tmp_path / 'missing.snapshot'))
+    assert store.rooms.getById(1).title == 'A Clearing'
+    store.close()
+
+
+def test_partial_snapshot_restores_the_missing_rooms(tmp_path):
+    """
+    Test that a snapshot taken while rooms were loaded lazily is marked
+    partial, and that restoring it into a store that isn't lazy loads the
+    rooms that weren't in it from the backend.
+    """
+
+    backend = FileBackend(str(tmp_path / 'data'), 'test')
+    backend.saveWorld(WORLD)
+    backend.save('rooms', 1, ROOM)
+    backend.save('rooms', 2, dict(ROOM, id=2, title='A Meadow'))
+    path = str(tmp_path / 'game.snapshot')
+
+    store = Store('test', '', backend, lazy=True)
+    store.load()
+    store.rooms.getById(1).title = 'A Clearing at Dusk'
+    store.snapshot(path)
+    store.close()
+    assert not Snapshot.read(path).complete
+
+    restored = Store('test', '', FileBackend(str(tmp_path / 'data'), 'test'))
+    assert restored.restore(path)
+    assert sorted(restored.rooms.repo) == [1, 2]
+    assert restored.rooms.getById(1).title == 'A Clearing at Dusk'
+    assert restored.rooms.getById(2).title == 'A Meadow'
+
+
+def test_snapshot_keeps_the_state_of_items(tmp_path):
+    """
+    Test that the items in a room come back from a snapshot as they
+    were, still instances of their prototypes.
+    """
+
+    backend = FileBackend(str(tmp_path / 'data'), 'test')
+    backend.saveWorld(WORLD)
+    harvestable = {'products': [], 'consumed': False, 'calories': 0, 'time': 0, 'action': 'harvest',
+                   'required_tools': []}
+    backend.save('items', 'bush', {'name': 'bush', 'description': 'a bush', 'details': 'A bush grows here.',
+                                   'keywords': 'bush', 'length': 1, 'width': 1, 'height': 1, 'weight': 10,
+                                   'traits': {'Harvestable': harvestable}})
+    backend.save('rooms', 1, dict(ROOM, items=['bush', 'bush']))
+    path = str(tmp_path / 'game.snapshot')
+
+    store = Store('test', '', backend)
+    store.load()
+    room = store.rooms.getById(1)
+    room.items[0].traits['Harvestable'].harvested = True
+
+    # Players' characters aren't part of the room's state.
+    character = PlayerCharacter()
+    character.player = Mock()
+    room.occupants.append(character)
+
+    store.snapshot(path)
+    store.close()
+
+    restored = Store('test', '', FileBackend(str(tmp_path / 'data'), 'test'))
+    assert restored.restore(path)
+    prototype = restored.items.getById('bush')
+    harvested, growing = restored.rooms.getById(1).items
+    assert harvested.prototype is prototype and growing.prototype is prototype
+    assert harvested.traits['Harvestable'].harvested
+    assert not growing.traits['Harvestable'].harvested
+    assert 'description' not in slotValues(harvested)
+    assert restored.rooms.getById(1).occupants == []
+
+
+def test_snapshot_of_another_world_is_refused(tmp_path):
+    backend = FileBackend(str(tmp_path / 'data'), 'test')
+    backend.saveWorld(WORLD)
+    backend.save('rooms', 1, ROOM)
+    path = str(tmp_path / 'game.snapshot')
+    Snapshot('other', dict(WORLD, name='other'), {}, {'rooms': []}).write(path)
+
+    store = Store('test', '', backend)
+    assert not store.restore(path)
+    assert store.rooms.getById(1).title == 'A Clearing'
+    store.close()
@@ -0,0 +1,167 @@
+import json
+import os
+
+from game.library.library import Library
+from game.store.store import Store
+from game.store.backends.files import FileBackend
+from game.store.models.character import PlayerCharacter
+from game.store.models.room import Room
+
+
+def test_saving_marks_models_clean(tmp_path):
+    """
+    Test that a changed model is dirty until it's been saved.
+    """
+
+    store = Store('test', '', FileBackend(str(tmp_path), 'test'))
+
+    character = PlayerCharacter()
+    character.setId('bob')
+    assert not character.isDirty()
+
+    character.markDirty()
+    assert character.isDirty()
+
+    store.saveCharacter(character)
+    assert not character.isDirty()
+
+    store.close()
+    assert os.path.exists(os.path.join(str(tmp_path), 'characters', 'bob.json'))
+
+
+def test_saveRoom_saves_dirty_rooms(tmp_path):
+    """
+    Test that rooms marked dirty are tracked until they're saved to the
+    world's rooms.
+    """
+
+    store = Store('test', '', FileBackend(str(tmp_path), 'test'))
+
+    room = Room()
+    room.setId(1)
+    room.title = 'A Clearing'
+
+    store.markRoomDirty(room)
+    assert room.isDirty()
+    assert store.dirty_rooms == {room}
+
+    store.saveRoom(room)
+    assert not room.isDirty()
+    assert store.dirty_rooms == set()
+
+    store.close()
+    with open(os.path.join(str(tmp_path), 'worlds', 'test', 'rooms', '1.json')) as file:
+        assert json.load(file)['title'] == 'A Clearing'
+
+
+def saveRooms(backend):
+    for id, exits in ((1, {'east': 2}), (2, {'west': 1})):
+        room = Room()
+        room.setId(id)
+        room.title = 'Room %d' % id
+        data = room.toJson()
+        data['exits'] = {direction: {'is_door': False, 'is_open': True, 'direction': direction, 'room_to': to}
+                         for direction, to in exits.items()}
+        backend.save('rooms', id, data)
+
+
+def test_lazy_rooms_load_on_demand(tmp_path):
+    """
+    Test that in lazy mode rooms are loaded the first time they're asked for,
+    and that exits find the rooms they lead to as they're followed.
+    """
+
+    backend = FileBackend(str(tmp_path), 'test')
+    saveRooms(backend)
+
+    store = Store('test', '', backend, lazy=True)
+    assert len(store.rooms.repo) == 0
+
+    room = store.rooms.getById(1)
+    assert room.title == 'Room 1'
+    assert list(store.rooms.repo) == [1]
+
+    exit = room.exits['east']
+    assert exit.room_to_id == 2
+    assert exit.room_to.title == 'Room 2'
+    assert exit.exit_to is exit.room_to.exits['west']
+    assert sorted(store.rooms.repo) == [1, 2]
+
+    assert store.rooms.getById(3) is None
+    assert not store.rooms.hasId(3)
+    store.close()
+
+
+def test_paging_follows_players(tmp_path):
+    """
+    Test that paging loads the chunks around players, and saves and evicts
+    the chunks they've left once they've been idle long enough.
+    """
+
+    backend = FileBackend(str(tmp_path), 'test')
+    for id in range(1, 17):
+        room = Room()
+        room.setId(id)
+        room.title = 'Room %d' % id
+        backend.save('rooms', id, room.toJson())
+
+    store = Store('test', '', backend)
+    store.world.rooms = [[row * 4 + column + 1 for column in range(4)] for row in range(4)]
+    store.rooms.enablePaging(2, 1, 10)
+
+    assert store.rooms.page([store.rooms.getById(1)]) == (3, 0)
+    assert sorted(store.rooms.repo) == [1, 2, 5, 6]
+
+    room = store.rooms.getById(2)
+    room.title = 'A Clearing'
+    store.markRoomDirty(room)
+
+    # Still within a chunk's idle time, so nothing is evicted yet.
+    store.world.time.loop = 5
+    assert store.rooms.page([store.rooms.getById(16)]) == (3, 0)
+
+    store.world.time.loop = 10
+    assert store.rooms.page([store.rooms.getById(16)]) == (0, 4)
+    assert sorted(store.rooms.repo) == [11, 12, 15, 16]
+    assert store.dirty_rooms == set()
+
+    assert store.rooms.getById(2).title == 'A Clearing'
+    store.close()
+    assert backend.loadOne('rooms', 2)['title'] == 'A Clearing'
+
+
+def test_characters_out_of_the_game_survive_paging(tmp_path):
+    """
+    Test that a character who leaves the game holds on to their room's id
+    rather than the room, so that the room can be paged out, and that they
+    come back to the room the store has loaded.
+    """
+
+    backend = FileBackend(str(tmp_path), 'test')
+    for id in range(1, 5):
+        room = Room()
+        room.setId(id)
+        backend.save('rooms', id, room.toJson())
+
+    store = Store('test', '', backend)
+    store.world.rooms = [[1, 2], [3, 4]]
+    store.rooms.enablePaging(1, 0, 10)
+    library = Library(store)
+
+    character = PlayerCharacter()
+    character.setId('bob')
+    library.movement.enter(character, store.rooms.getById(4))
+    library.movement.leaveGame(character)
+
+    assert character.room == 4
+    assert store.rooms.getById(4).occupants == []
+    assert character.toJson()['room'] == 4
+
+    store.world.time.loop = 10
+    assert store.rooms.page([]) == (0, 1)
+    assert 4 not in store.rooms.repo
+
+    library.movement.enterGame(character)
+    assert character.room is store.rooms.getById(4)
+    assert store.rooms.getById(4).occupants == [character]
+    store.close()
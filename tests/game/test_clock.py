@@ -0,0 +1,70 @@
+from game.clock import TickClock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ticks_stay_on_schedule():
+    """
+    Test that ticks are scheduled off of when the last one was due, not when it
+    finished, so the time spent running them doesn't cause drift.
+    """
+
+    now = FakeClock()
+    clock = TickClock(10, now)
+    assert clock.isDue()
+    assert clock.dueTicks() == 1
+
+    now.now = 100.03
+    assert not clock.isDue()
+    assert clock.dueTicks() == 0
+    assert abs(clock.remaining() - 0.07) < 1e-9
+
+    now.now = 100.15
+    assert clock.dueTicks() == 1
+    assert abs(clock.remaining() - 0.05) < 1e-9
+
+
+def test_missed_ticks_are_caught_up():
+    """
+    Test that ticks missed while the loop was behind are all run, so game time
+    keeps up with real time.
+    """
+
+    now = FakeClock()
+    clock = TickClock(10, now)
+    assert clock.dueTicks() == 1
+
+    now.now = 100.35
+    assert abs(clock.lag() - 0.25) < 1e-9
+    assert clock.dueTicks() == 3
+    assert clock.overruns == 1
+    assert clock.caught_up == 2
+    assert clock.dropped == 0
+    assert abs(clock.remaining() - 0.05) < 1e-9
+
+
+def test_ticks_past_the_cap_are_dropped():
+    """
+    Test that when the loop is too far behind, only `max_catch_up` ticks are
+    run, the rest are counted as dropped, and the schedule picks up from now.
+    """
+
+    now = FakeClock()
+    clock = TickClock(10, now, max_catch_up=3)
+    assert clock.dueTicks() == 1
+
+    now.now = 101.05
+    assert clock.dueTicks() == 3
+    assert clock.dropped == 7
+    assert clock.lag() == 0
+    assert abs(clock.remaining() - 0.05) < 1e-9
+
+    now.now = 101.12
+    assert clock.dueTicks() == 1
+    assert clock.dropped == 7
@@ -0,0 +1,95 @@
+import json
+import time
+
+from game.profiler import Histogram, Profiler
+
+
+def test_histogram_buckets_are_within_precision():
+    """
+    Test that every value lands in a bucket whose top is within the
+    histogram's precision of it.
+    """
+
+    histogram = Histogram()
+    for value in list(range(0, 2000)) + [10**6, 123456789, 10**11]:
+        top = histogram.bucketValue(histogram.bucket(value))
+        assert value <= top <= value + value / Histogram.SUB_BUCKETS
+
+
+def test_histogram_percentiles():
+    """
+    Test the percentiles of a known distribution.
+    """
+
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+
+    assert abs(histogram.percentile(0.5) - 500000) <= 500000 / Histogram.SUB_BUCKETS
+    assert abs(histogram.percentile(0.99) - 990000) <= 990000 / Histogram.SUB_BUCKETS
+    assert histogram.percentile(1.0) == 1000000
+    assert histogram.summary()['max'] == 1000000
+
+
+def test_profiler_writes_metrics_file(tmp_path):
+    """
+    Test that the profiler records each phase and writes them out.
+    """
+
+    metrics_file = str(tmp_path / 'metrics.json')
+    profiler = Profiler(metrics_file, metricsInterval=0)
+
+    profiler.start()
+    profiler.mark('poll')
+    profiler.mark('interpret')
+    profiler.finish({'connections': 3})
+
+    with open(metrics_file) as file:
+        metrics = json.load(file)
+
+    assert list(metrics['phases']) == ['poll', 'interpret']
+    assert metrics['loop']['count'] == 1
+    assert metrics['counters'] == {'connections': 3}
+    assert 'interpret' in profiler.report()
+
+
+def test_idle_time_is_left_out_of_the_loop():
+    """
+    Test that time marked idle is recorded as a phase, but not as part of the
+    loop's time.
+    """
+
+    profiler = Profiler()
+
+    profiler.start()
+    profiler.mark('poll')
+    time.sleep(0.05)
+    profiler.idle('wait')
+    profiler.mark('read')
+    profiler.finish()
+
+    assert profiler.phases['wait'].max >= 50000000
+    assert profiler.loop.max < 50000000
+
+
+def test_phases_are_counted_once_a_tick():
+    """
+    Test that a phase marked on several passes between ticks is added up and
+    recorded once, with the loop.
+    """
+
+    profiler = Profiler()
+
+    for _ in range(3):
+        profiler.start()
+        profiler.mark('poll')
+        time.sleep(0.01)
+        profiler.idle('wait')
+        time.sleep(0.01)
+        profiler.mark('read')
+    profiler.mark('tick')
+    profiler.finish()
+
+    assert profiler.phases['read'].count == profiler.loop.count == 1
+    assert profiler.phases['read'].max >= 30000000
+    assert profiler.phases['read'].max <= profiler.loop.max < profiler.phases['read'].max + 30000000
@@ -0,0 +1,69 @@
+from unittest.mock import Mock
+
+from game.scheduler import Scheduler
+
+
+def test_run_only_runs_due_events():
+    """
+    Test that run() runs the events due on or before the loop, in the order
+    they're due, and leaves the rest.
+    """
+
+    scheduler = Scheduler()
+    calls = []
+    scheduler.schedule(5, lambda: calls.append('later'))
+    scheduler.schedule(3, lambda: calls.append('sooner'))
+    scheduler.schedule(10, lambda: calls.append('much later'))
+
+    assert scheduler.run(2) == 0
+    assert scheduler.run(5) == 2
+    assert calls == ['sooner', 'later']
+    assert scheduler.nextDue() == 10
+
+
+def test_recurring_events_keep_their_order():
+    """
+    Test that recurring events due on the same loop always run in the order
+    they were first scheduled.
+    """
+
+    scheduler = Scheduler()
+    calls = []
+    scheduler.every(60, lambda: calls.append('hourly'))
+    scheduler.every(1, lambda: calls.append('minutely'))
+    scheduler.every(60, lambda: calls.append('also hourly'))
+
+    for loop in range(1, 121):
+        scheduler.run(loop)
+
+    assert calls.count('minutely') == 120
+    assert calls[58:62] == ['minutely', 'hourly', 'minutely', 'also hourly']
+    assert calls[-3:] == ['hourly', 'minutely', 'also hourly']
+
+
+def test_late_recurring_event_runs_once():
+    """
+    Test that a recurring event that's fallen behind runs once, and then goes
+    back to its schedule.
+    """
+
+    scheduler = Scheduler()
+    callback = Mock()
+    scheduler.every(10, callback)
+
+    scheduler.run(35)
+    assert callback.call_count == 1
+    assert scheduler.nextDue() == 40
+
+
+def test_cancelled_events_dont_run():
+    scheduler = Scheduler()
+    callback = Mock()
+    event = scheduler.every(10, callback)
+
+    scheduler.run(10)
+    scheduler.cancel(event)
+    scheduler.run(20)
+
+    assert callback.call_count == 1
+    assert scheduler.nextDue() is None
@@ -397,3 +397,132 @@ def test_calculateSleep_character_with_low_reserves_who_is_sleeping():
     assert player.character.reserves.sleep == 2 
     assert player.character.reserves.energy == 625 
     assert player.character.position == player.character.POSITION_SLEEPING
+
+def test_heartbeat_spreads_players_across_the_minute():
+    """
+    Test that the per minute jobs are done for each player once a minute, with
+    the players spread across the minute's loops rather than all on one.
+    """
+
+    store = Store('test', '')
+    store.world = World()
+    library = Library(store)
+
+    heartbeat = Heartbeat(store, library)
+    heartbeat.advanceActions = Mock()
+    heartbeat.calculateReserves = Mock()
+
+    for index in range(20):
+        player = Player(Mock(), None, None)
+        player.phase = index
+        store.players.append(player)
+
+    time = store.world.time
+    for loop in range(time.loops_a_minute):
+        time.loop += 1
+        heartbeat.heartbeat()
+
+    assert heartbeat.calculateReserves.call_count == time.loops_a_minute
+    shards = [call.args[0] for call in heartbeat.calculateReserves.call_args_list]
+    assert sorted(player.phase for shard in shards for player in shard) == list(range(20))
+    assert all(len(shard) == 20 // time.loops_a_minute for shard in shards)
+
+def test_shards_follow_players_joining_and_leaving():
+    """
+    Test that once a shard has been built it's kept up to date as players
+    join and leave, rather than being rebuilt.
+    """
+
+    store = Store('test', '')
+    players = [Player(Mock(), None, None) for index in range(4)]
+    for index, player in enumerate(players):
+        player.phase = index
+        store.players.append(player)
+
+    assert store.players.shard(2, 0) == [players[0], players[2]]
+
+    store.players.remove(players[0])
+    late = Player(Mock(), None, None)
+    late.phase = 6
+    store.players.append(late)
+
+    assert store.players.shard(2, 0) == [players[2], late]
+    assert store.players.shard(2, 1) == [players[1], players[3]]
+    assert list(store.players) == players[1:] + [late]
+
+def test_saveCharacters_only_saves_changed_characters():
+    """
+    Test that saveCharacters skips characters that haven't changed since they
+    were last saved.
+    """
+
+    store = Store('test', '')
+    store.world = World()
+    store.saveCharacter = Mock()
+    library = Library(store)
+
+    heartbeat = Heartbeat(store, library)
+
+    for index in range(2):
+        player = Player(Mock(), None, None)
+        player.character = PlayerCharacter()
+        player.character.player = player
+        store.players.append(player)
+
+    library.character.adjustCalories(store.players[1].character, -2)
+
+    heartbeat.saveCharacters()
+
+    store.saveCharacter.assert_called_once_with(store.players[1].character)
+
+def test_players_can_leave_while_being_iterated():
+    """
+    Test that players joining and leaving part way through iterating over them
+    doesn't disturb the iteration.
+    """
+
+    store = Store('test', '')
+    players = [Player(Mock(), None, None) for index in range(3)]
+    for player in players:
+        store.players.append(player)
+
+    seen = []
+    for player in store.players:
+        seen.append(player)
+        if player is players[0]:
+            store.players.remove(players[1])
+            store.players.append(Player(Mock(), None, None))
+
+    assert seen == players
+    assert store.players[0] is players[0]
+    assert len(store.players) == 3
+
+def test_heartbeat_spreads_room_saves_across_the_hour():
+    """
+    Test that the rooms that have changed are saved a few each loop, and all
+    of them by the end of the game hour.
+    """
+
+    store = Store('test', '')
+    store.world = World()
+    library = Library(store)
+
+    def saveRoom(room):
+        store.dirty_rooms.discard(room)
+    store.saveRoom = Mock(side_effect=saveRoom)
+
+    heartbeat = Heartbeat(store, library)
+
+    time = store.world.time
+    rooms = 2 * time.loops_an_hour + 1
+    store.dirty_rooms.update(Mock() for index in range(rooms))
+
+    saved = []
+    for loop in range(time.loops_an_hour):
+        time.loop += 1
+        heartbeat.heartbeat()
+        saved.append(store.saveRoom.call_count - sum(saved))
+
+    assert store.dirty_rooms == set()
+    assert sum(saved) == rooms
+    assert max(saved) <= 3